@@ -42,6 +42,7 @@ Write-Host "==> Ejecutando PyInstaller" -ForegroundColor Cyan
 pyinstaller --noconfirm `
   --name $AppName `
   --onefile --windowed `
+  --collect-submodules enviador `
   --add-data "config.json;." `
   --add-data "destinatarios.json;." `
   --add-data "respondidos.txt;." `
@@ -0,0 +1,51 @@
+# Motor de envío y auto-respuesta, sin dependencias de la interfaz gráfica.
+# Lo usan tanto la aplicación de escritorio (main.py) como la línea de comandos
+# (python -m enviador).
+#
+# Los submódulos se importan recién cuando se usa alguno de sus nombres: así
+# "import enviador" no arrastra smtplib/ssl/asyncio ni la pila IMAP (imapclient)
+# hasta que hacen falta, y el arranque de la interfaz queda liviano.
+import importlib
+
+_EXPORTADOS = {
+    'configuracion': (
+        'EMAIL_CONFIG', 'CONFIG_FILE', 'RESPONDIDOS_FILE', 'RESPONDIDOS_DB', 'ENVIADOS_FILE', 'DESTINATARIOS_FILE', 'DESTINATARIOS_DB', 'CAMPANIAS_DB',
+        'SIGNATURE_BLOCK', 'SIGNATURE_HTML',
+        'cargar_configuracion', 'guardar_configuracion', 'guardar_configuracion_parcial',
+    ),
+    'historial': (
+        'paginar_respondidos', 'guardar_respondido', 'guardar_enviado', 'limpiar_respondidos',
+        'cargar_destinatarios_guardados', 'guardar_destinatarios_guardados',
+    ),
+    'bitacora': ('BitacoraDiferida', 'obtener_bitacora', 'configurar_bitacoras', 'cerrar_bitacoras', 'configurar_log'),
+    'destinatarios': ('RegistroDestinatarios', 'obtener_registro_destinatarios'),
+    'busqueda': ('IndiceContactos', 'normalizar'),
+    'listas': ('EvaluadorListas', 'ErrorListas', 'ids_a_mapa', 'mapa_a_ids'),
+    'importador': ('FORMATOS_IMPORTACION', 'ErrorImportacion', 'ResultadoImportacion', 'importar_destinatarios', 'guardar_rechazos'),
+    'respondidos': ('RegistroRespondidos', 'obtener_registro_respondidos'),
+    'mensajes': ('PlantillaMensaje', 'PlantillaPersonalizada', 'compilar_plantilla', 'marcadores_plantilla'),
+    'sesiones': ('crear_contexto_ssl', 'conectar_smtp', 'SesionReconectable'),
+    'transporte_async': ('SesionSMTPAsync', 'conectar_smtp_async'),
+    'tasa': ('ControlTasa', 'obtener_control_tasa'),
+    'reintentos': ('clasificar_error', 'ColaReintentos'),
+    'campanias': ('ColaCampania', 'campanias_incompletas', 'descartar_campania', 'listar_rebotados'),
+    'envio': ('MOTORES_ENVIO', 'ErrorEnvio', 'ResultadoEnvio', 'enviar_masivo', 'reanudar_campania'),
+    'autoresponder': ('auto_responder', 'auto_responder_continuo', 'Respondedor'),
+    'demonio': ('DemonioRespuestas',),
+}
+_MODULO_DE = {nombre: modulo for modulo, nombres in _EXPORTADOS.items() for nombre in nombres}
+
+__all__ = list(_MODULO_DE)
+
+
+def __getattr__(nombre):
+    modulo = _MODULO_DE.get(nombre)
+    if modulo is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
+    valor = getattr(importlib.import_module(f'.{modulo}', __name__), nombre)
+    globals()[nombre] = valor
+    return valor
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
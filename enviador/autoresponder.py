@@ -0,0 +1,470 @@
+import time
+import queue
+import logging
+import smtplib
+import threading
+import collections
+from concurrent.futures import ThreadPoolExecutor
+from email import utils
+from email.parser import BytesHeaderParser
+
+import imapclient
+
+from .configuracion import EMAIL_CONFIG
+from .historial import cargar_sincronizacion, guardar_sincronizacion
+from .respondidos import obtener_registro_respondidos
+from .mensajes import PlantillaMensaje
+from .sesiones import crear_contexto_ssl, enviar_datos, SesionReconectable
+from .tasa import CODIGOS_LIMITE, obtener_control_tasa
+from .reintentos import clasificar_error
+
+# Modo continuo: con IDLE el servidor avisa apenas llega un correo. El IDLE se renueva
+# antes de los 29 minutos de la RFC 2177 (y de los cortes por inactividad de los NAT);
+# sin IDLE se revisa cada INTERVALO_SONDEO segundos.
+INTERVALO_SONDEO = 60
+REIDLE_SEGUNDOS = 10 * 60
+ESPERA_IDLE = 5
+REINTENTO_IMAP_BASE = 10
+REINTENTO_IMAP_MAXIMO = 300
+
+# Del mensaje sólo interesa el remitente: se piden esos encabezados (PEEK no marca
+# \Seen) para muchos mensajes por comando FETCH, sin bajar cuerpos ni adjuntos.
+ENCABEZADOS_FETCH = 'BODY.PEEK[HEADER.FIELDS (FROM)]'
+CLAVE_ENCABEZADOS = b'BODY[HEADER.FIELDS (FROM)]'
+MENSAJES_POR_FETCH = 200
+_parser_encabezados = BytesHeaderParser()
+
+# Etapas de cada pasada: la sesión IMAP trae encabezados por tandas, un hilo los analiza
+# y descarta ya respondidos, y un pool de hilos responde por SMTP. Cada cuenta tiene a lo
+# sumo una respuesta en curso por sesión SMTP, así la etapa que se adelanta se frena y
+# un pool compartido entre cuentas no queda bloqueado por una sola; las marcas \Seen
+# vuelven a la sesión IMAP.
+TRABAJADORES_RESPUESTA = 3
+TANDAS_EN_VUELO = 2
+
+def conectar_imap(config, email_account, email_password, context):
+    # Devuelve también la respuesta del SELECT (UIDVALIDITY, UIDNEXT, HIGHESTMODSEQ)
+    imap = imapclient.IMAPClient(config['imap_server'], ssl=True, ssl_context=context)
+    imap.login(email_account, email_password)
+    info = imap.select_folder('INBOX')
+    return imap, info
+
+class PuntoSincronizacion:
+    # Último UID procesado de la bandeja, guardado junto a respondidos.txt. Sólo vale
+    # mientras el servidor mantenga la misma UIDVALIDITY; así cada pasada busca
+    # únicamente los UID nuevos, sin depender de que nadie haya leído el correo.
+    def __init__(self, cuenta, carpeta='INBOX'):
+        self.clave = f"{cuenta.lower()}/{carpeta}"
+        datos = cargar_sincronizacion().get(self.clave, {})
+        self.uidvalidity = datos.get('uidvalidity')
+        self.ultimo_uid = datos.get('ultimo_uid', 0)
+        self.modseq = datos.get('modseq')
+
+    def seleccionar(self, info):
+        # Descarta el punto guardado si la carpeta se recreó (cambió UIDVALIDITY);
+        # devuelve True en ese caso
+        uidvalidity = info.get(b'UIDVALIDITY')
+        if uidvalidity == self.uidvalidity:
+            return False
+        if self.uidvalidity is not None:
+            logging.warning(f"UIDVALIDITY cambió ({self.uidvalidity} → {uidvalidity}), se sincroniza de nuevo")
+        self.uidvalidity = uidvalidity
+        self.ultimo_uid = 0
+        self.modseq = None
+        return True
+
+    def sin_cambios(self, info):
+        # Con CONDSTORE, el mismo HIGHESTMODSEQ indica que nada cambió; si no, alcanza UIDNEXT
+        modseq = info.get(b'HIGHESTMODSEQ')
+        if modseq is not None and self.modseq is not None:
+            return modseq == self.modseq
+        uidnext = info.get(b'UIDNEXT')
+        return uidnext is not None and uidnext - 1 <= self.ultimo_uid
+
+    def guardar(self, ultimo_uid, modseq=None):
+        self.ultimo_uid = max(self.ultimo_uid, ultimo_uid)
+        self.modseq = modseq
+        guardar_sincronizacion(self.clave, {
+            'uidvalidity': self.uidvalidity, 'ultimo_uid': self.ultimo_uid, 'modseq': self.modseq,
+        })
+
+class MarcasPendientes:
+    # Acumula los UIDs a marcar como leídos y los manda en un solo STORE (FLAGS.SILENT)
+    # por tanda y al final de cada pasada. Si el STORE falla, los UIDs vuelven a la cola
+    # y salen con el próximo vaciado, aun en una sesión IMAP nueva.
+    def __init__(self, flags=(imapclient.SEEN,)):
+        self.flags = list(flags)
+        self.uids = []
+
+    def __len__(self):
+        return len(self.uids)
+
+    def agregar(self, uid):
+        self.uids.append(uid)
+
+    def vaciar(self, imap):
+        if not self.uids:
+            return
+        uids, self.uids = self.uids, []
+        try:
+            imap.add_flags(uids, self.flags, silent=True)
+        except Exception:
+            self.uids = uids + self.uids
+            raise
+
+    def descartar(self):
+        # Con otra UIDVALIDITY los UIDs pendientes ya no identifican a los mismos mensajes
+        self.uids.clear()
+
+def _buscar_nuevos(imap, punto, info):
+    # UIDs a procesar y UID tope hasta el que queda sincronizada la carpeta.
+    # info es la respuesta del SELECT en la primera pasada de una sesión, None después.
+    if not punto.ultimo_uid:
+        # Primera sincronización: los no leídos, como antes, y desde ahí por UID
+        mensajes = imap.search('UNSEEN')
+        uidnext = (info or {}).get(b'UIDNEXT')
+        tope = uidnext - 1 if uidnext else max(imap.search('ALL'), default=0)
+        return mensajes, max([tope] + mensajes)
+    if info is not None and punto.sin_cambios(info):
+        return [], punto.ultimo_uid
+    # "n:*" incluye siempre el último UID aunque sea menor que n
+    mensajes = [uid for uid in imap.search(['UID', f'{punto.ultimo_uid + 1}:*']) if uid > punto.ultimo_uid]
+    return mensajes, max([punto.ultimo_uid] + mensajes)
+
+def _codigo_smtp(e):
+    if isinstance(e, smtplib.SMTPRecipientsRefused):
+        return next((codigo for codigo, _ in e.recipients.values()), None)
+    return getattr(e, 'smtp_code', None)
+
+class Respondedor:
+    # Todo lo que usa una cuenta entre pasadas: plantilla, registro de respondidos,
+    # sesiones SMTP (se mantienen abiertas), control de tasa del servidor, la cola de
+    # marcas \Seen pendientes, y su estado y métricas. El pool de respuestas puede ser
+    # propio o compartido entre cuentas (modo demonio).
+    def __init__(self, email_account, email_password, subject, mensaje_auto, servidor, status_callback,
+                 supresion_dias=None, trabajadores=None, context=None, respondidos=None, pool=None):
+        self.config = EMAIL_CONFIG[servidor]
+        self.servidor = servidor
+        self.email_account = email_account
+        self.email_password = email_password
+        self.status_callback = status_callback
+        self.context = context or crear_contexto_ssl(servidor)
+        self.plantilla = PlantillaMensaje(email_account, subject, mensaje_auto)
+        # supresion_dias: no volver a responder al mismo remitente dentro de esa ventana (None: nunca)
+        self.supresion_dias = supresion_dias
+        self.respondidos = obtener_registro_respondidos() if respondidos is None else respondidos
+        self.respondidos.usar_ventana(supresion_dias)
+        self.control = obtener_control_tasa(servidor)
+        trabajadores = trabajadores or TRABAJADORES_RESPUESTA
+        trabajadores = max(1, min(trabajadores, self.config.get('max_conexiones') or trabajadores))
+        self.sesiones = [SesionReconectable(self.config, email_account, email_password, self.context)
+                         for _ in range(trabajadores)]
+        self._sesiones_libres = queue.Queue()
+        for sesion in self.sesiones:
+            self._sesiones_libres.put(sesion)
+        self._cupo = threading.BoundedSemaphore(trabajadores)
+        self._pool_propio = pool is None
+        self.pool = pool or ThreadPoolExecutor(max_workers=trabajadores, thread_name_prefix='respuesta')
+        self.marcas = MarcasPendientes()
+        self.estado = ''
+        self.ultima_actividad = None
+        self.metricas = collections.Counter()
+        self._metricas_lock = threading.Lock()
+
+    def _avisar(self, msg):
+        self.estado = msg
+        self.status_callback(msg)
+
+    def _contar(self, clave, cantidad=1):
+        with self._metricas_lock:
+            self.metricas[clave] += cantidad
+            self.ultima_actividad = time.time()
+
+    def resumen(self):
+        with self._metricas_lock:
+            return {
+                'cuenta': self.email_account,
+                'estado': self.estado,
+                'ultima_actividad': self.ultima_actividad,
+                **{clave: self.metricas[clave] for clave in ('pasadas', 'correos', 'respondidos', 'salteados', 'errores')},
+            }
+
+    def conectar_imap(self):
+        return conectar_imap(self.config, self.email_account, self.email_password, self.context)
+
+    def conectar_smtp(self):
+        # La primera sesión se abre de entrada (y valida la contraseña); el resto al usarlas
+        self.sesiones[0].asegurar()
+
+    def mantener(self):
+        for sesion in self.sesiones:
+            if sesion.smtp is not None and time.monotonic() - sesion.ultimo_uso > INTERVALO_SONDEO:
+                sesion.mantener()
+
+    def cerrar(self):
+        if self._pool_propio:
+            self.pool.shutdown(wait=True)
+        for sesion in self.sesiones:
+            sesion.cerrar()
+        self.respondidos.soltar_ventana(self.supresion_dias)
+
+    def responder_nuevos(self, imap, punto, info=None):
+        # Una pasada sobre los correos llegados desde el último punto de sincronización;
+        # devuelve cuántos se encontraron
+        mensajes, tope = _buscar_nuevos(imap, punto, info)
+        self._contar('pasadas')
+        self._avisar(f'Correos nuevos encontrados: {len(mensajes)}')
+        logging.info(f"[{self.email_account}] Encontrados {len(mensajes)} correos nuevos (UID > {punto.ultimo_uid})")
+
+        if not mensajes:
+            # Sin novedades: HIGHESTMODSEQ del SELECT sirve para saltear la próxima búsqueda
+            punto.guardar(tope, (info or {}).get(b'HIGHESTMODSEQ'))
+            self._avisar("No hay correos nuevos para responder")
+            _vaciar_marcas(imap, self.marcas)
+            return 0
+
+        self._contar('correos', len(mensajes))
+        try:
+            self._responder_mensajes(imap, mensajes)
+        finally:
+            _vaciar_marcas(imap, self.marcas)
+        # Los propios \Seen cambian el MODSEQ: la próxima vez decide UIDNEXT
+        punto.guardar(tope)
+        return len(mensajes)
+
+    def _responder_mensajes(self, imap, mensajes):
+        total = len(mensajes)
+        tandas = queue.Queue(maxsize=TANDAS_EN_VUELO)
+        listos = queue.Queue()
+        futuros = []
+        analizador = threading.Thread(target=self._analizar, args=(tandas, listos, futuros, total), daemon=True)
+        analizador.start()
+        try:
+            # Etapa IMAP (este hilo): encabezados por tandas y marcas de lo ya resuelto
+            for desde in range(0, total, MENSAJES_POR_FETCH):
+                tanda = mensajes[desde:desde + MENSAJES_POR_FETCH]
+                datos = imap.fetch(tanda, [ENCABEZADOS_FETCH])
+                tandas.put([(desde + j, msgid, datos.get(msgid, {}).get(CLAVE_ENCABEZADOS))
+                            for j, msgid in enumerate(tanda, 1)])
+                self._recoger(listos)
+                if len(self.marcas) >= MENSAJES_POR_FETCH:
+                    self.marcas.vaciar(imap)
+        finally:
+            tandas.put(None)
+            while analizador.is_alive() or not all(futuro.done() for futuro in futuros):
+                self._recoger(listos, espera=0.2)
+            self._recoger(listos)
+
+    def _recoger(self, listos, espera=None):
+        try:
+            if espera:
+                self.marcas.agregar(listos.get(timeout=espera))
+            while True:
+                self.marcas.agregar(listos.get_nowait())
+        except queue.Empty:
+            pass
+
+    def _analizar(self, tandas, listos, futuros, total):
+        # Etapa de análisis: remitente, y si ya se le respondió (o aparece repetido en la
+        # misma pasada) no llega al pool de respuestas
+        vistos = set()
+        while True:
+            tanda = tandas.get()
+            if tanda is None:
+                return
+            for i, msgid, raw in tanda:
+                try:
+                    # Como antes con RFC822, todo mensaje procesado queda marcado como leído
+                    if not isinstance(raw, bytes):
+                        logging.warning(f"El mensaje {msgid} no trajo encabezados, se omite")
+                        listos.put(msgid)
+                        continue
+                    sender = utils.parseaddr(_parser_encabezados.parsebytes(raw).get('From') or '')[1]
+                    if not sender:
+                        logging.warning(f"No se pudo obtener el remitente del mensaje {msgid}")
+                        listos.put(msgid)
+                        continue
+                    if sender.lower() in vistos or self.respondidos.respondido(sender, self.supresion_dias):
+                        self._contar('salteados')
+                        self._avisar(f'Ya se respondió a {sender}, salteando.')
+                        listos.put(msgid)
+                        continue
+                    vistos.add(sender.lower())
+                    self._cupo.acquire()
+                    futuros.append(self.pool.submit(self._responder, i, msgid, sender, total, listos))
+                except Exception as e:
+                    logging.error(f"Error procesando mensaje {msgid}: {e}")
+                    self._avisar(f'Error procesando mensaje: {e}')
+
+    def _responder(self, i, msgid, sender, total, listos):
+        # Etapa SMTP: corre en el pool, con una sesión libre de la cuenta
+        sesion = self._sesiones_libres.get()
+        try:
+            self._avisar(f'Enviando respuesta a {sender} ({i}/{total})')
+            if self._enviar(sesion, sender):
+                self.respondidos.agregar(sender)
+                self._contar('respondidos')
+                self._avisar(f'✓ Respuesta enviada a {sender}')
+            else:
+                self._contar('errores')
+                self._avisar(f'✗ Error enviando a {sender}')
+            listos.put(msgid)
+        except Exception as e:
+            logging.error(f"Error procesando mensaje {msgid}: {e}")
+            self._avisar(f'Error procesando mensaje: {e}')
+        finally:
+            self._sesiones_libres.put(sesion)
+            self._cupo.release()
+
+    def _enviar(self, sesion, sender):
+        self.control.esperar()
+        try:
+            enviar_datos(sesion.asegurar(), self.plantilla.remitente, [sender], self.plantilla.renderizar(sender))
+            sesion.registrar_uso()
+        except Exception as e:
+            if clasificar_error(e) == 'conexion':
+                sesion.descartar()
+            if _codigo_smtp(e) in CODIGOS_LIMITE:
+                self.control.limite()
+            logging.error(f"Error enviando respuesta a {sender}: {e}")
+            return False
+        self.control.exito()
+        logging.info(f"Respuesta enviada exitosamente a {sender}")
+        return True
+
+    def _esperar_novedades(self, imap, detener, intervalo):
+        # Bloquea hasta que llega correo nuevo, vence el IDLE o se pide detener.
+        # Mientras tanto mantiene vivas las sesiones SMTP con NOOP.
+        if b'IDLE' not in imap.capabilities():
+            detener.wait(intervalo)
+            return
+        imap.idle()
+        try:
+            inicio = time.monotonic()
+            while not detener.is_set() and time.monotonic() - inicio < REIDLE_SEGUNDOS:
+                respuestas = imap.idle_check(timeout=ESPERA_IDLE)
+                if any(len(r) > 1 and r[1] in (b'EXISTS', b'RECENT') for r in respuestas):
+                    return
+                self.mantener()
+        finally:
+            imap.idle_done()
+
+    def vigilar(self, detener, intervalo=INTERVALO_SONDEO):
+        # Modo continuo con una única sesión IMAP autenticada (IDLE o sondeo) y sesiones
+        # SMTP que se mantienen abiertas entre correos; sólo se reconectan si se cortan.
+        espera_error = REINTENTO_IMAP_BASE
+        while not detener.is_set():
+            imap = None
+            try:
+                self._avisar("Conectando al servidor IMAP...")
+                imap, info = self.conectar_imap()
+                punto = PuntoSincronizacion(self.email_account)
+                if punto.seleccionar(info):
+                    self.marcas.descartar()
+                modo = 'IDLE' if b'IDLE' in imap.capabilities() else f'sondeo cada {intervalo} s'
+                logging.info(f"[{self.email_account}] Conexión IMAP establecida (modo {modo})")
+                self.conectar_smtp()
+                espera_error = REINTENTO_IMAP_BASE
+                while not detener.is_set():
+                    self.responder_nuevos(imap, punto, info)
+                    info = None
+                    if detener.is_set():
+                        break
+                    self._avisar("Esperando correos nuevos...")
+                    self._esperar_novedades(imap, detener, intervalo)
+            except (imapclient.exceptions.LoginError, smtplib.SMTPAuthenticationError):
+                error_msg = "Error de autenticación. Verifica email y contraseña."
+                logging.error(f"[{self.email_account}] {error_msg}")
+                self._avisar(error_msg)
+                return
+            except Exception as e:
+                self._contar('errores')
+                logging.warning(f"[{self.email_account}] Conexión IMAP perdida, reconectando en {espera_error} s: {e}")
+                self._avisar(f"Conexión IMAP perdida, reintentando en {espera_error} s...")
+                detener.wait(espera_error)
+                espera_error = min(espera_error * 2, REINTENTO_IMAP_MAXIMO)
+            finally:
+                try:
+                    if imap:
+                        imap.logout()
+                except Exception:
+                    pass
+
+def _vaciar_marcas(imap, marcas):
+    if not marcas:
+        return
+    try:
+        marcas.vaciar(imap)
+    except Exception as e:
+        logging.error(f"No se pudieron marcar {len(marcas)} mensajes como leídos: {e}")
+
+def auto_responder(email_account, email_password, subject, mensaje_auto, servidor, status_callback, supresion_dias=None):
+    logging.info("Iniciando auto-responder")
+
+    if servidor not in EMAIL_CONFIG:
+        error_msg = f"Servidor '{servidor}' no configurado"
+        logging.error(error_msg)
+        status_callback(error_msg)
+        return
+
+    imap = None
+    respondedor = None
+
+    try:
+        respondedor = Respondedor(email_account, email_password, subject, mensaje_auto, servidor, status_callback,
+                                  supresion_dias=supresion_dias)
+
+        # Conectar IMAP
+        status_callback("Conectando al servidor IMAP...")
+        imap, info = respondedor.conectar_imap()
+        logging.info("Conexión IMAP establecida")
+        punto = PuntoSincronizacion(email_account)
+        punto.seleccionar(info)
+
+        # Conectar SMTP
+        status_callback("Conectando al servidor SMTP...")
+        respondedor.conectar_smtp()
+        logging.info("Conexión SMTP establecida")
+
+        if respondedor.responder_nuevos(imap, punto, info):
+            status_callback('Proceso finalizado exitosamente.')
+            logging.info("Proceso de auto-respuesta completado")
+
+    except imapclient.exceptions.LoginError:
+        error_msg = "Error de autenticación. Verifica email y contraseña."
+        logging.error(error_msg)
+        status_callback(error_msg)
+    except Exception as e:
+        error_msg = f'Error general en la ejecución: {e}'
+        logging.error(error_msg)
+        status_callback(error_msg)
+    finally:
+        # Cerrar conexiones
+        if respondedor is not None:
+            respondedor.cerrar()
+            logging.info("Conexión SMTP cerrada")
+        try:
+            if imap:
+                imap.logout()
+                logging.info("Conexión IMAP cerrada")
+        except:
+            pass
+
+def auto_responder_continuo(email_account, email_password, subject, mensaje_auto, servidor, status_callback,
+                            detener=None, intervalo=INTERVALO_SONDEO, supresion_dias=None):
+    logging.info("Iniciando auto-responder continuo")
+    if servidor not in EMAIL_CONFIG:
+        error_msg = f"Servidor '{servidor}' no configurado"
+        logging.error(error_msg)
+        status_callback(error_msg)
+        return
+    if detener is None:
+        detener = threading.Event()
+
+    respondedor = Respondedor(email_account, email_password, subject, mensaje_auto, servidor, status_callback,
+                              supresion_dias=supresion_dias)
+    try:
+        respondedor.vigilar(detener, intervalo)
+    finally:
+        respondedor.cerrar()
+        logging.info("Auto-responder continuo detenido")
@@ -0,0 +1,185 @@
+import os
+import time
+import queue
+import atexit
+import logging
+import threading
+import logging.handlers
+
+# Bitácoras de texto (enviados.txt, respondidos.txt): las líneas se encolan y un hilo
+# por archivo las escribe de a tandas, con el archivo abierto, cuando se juntan
+# LINEAS_POR_ESCRITURA o pasa INTERVALO_ESCRITURA segundos desde la primera pendiente.
+LINEAS_POR_ESCRITURA = 500
+INTERVALO_ESCRITURA = 1.0
+# 'nunca': el sistema operativo decide cuándo bajar a disco (como antes al cerrar el archivo);
+# 'lote': fsync después de cada tanda, para no perder líneas ante un corte de luz
+POLITICAS_FSYNC = ('nunca', 'lote')
+
+# auto_responder.log rota al llegar a LOG_MAX_BYTES y conserva LOG_RESPALDOS copias
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_RESPALDOS = 3
+FORMATO_LOG = '%(asctime)s - %(levelname)s - %(message)s'
+
+class _Orden:
+    def __init__(self, accion):
+        self.accion = accion
+        self.lista = threading.Event()
+
+class BitacoraDiferida:
+    # Archivo de sólo agregado escrito fuera del camino de envío: escribir() sólo encola.
+    # vaciar() espera a que lo encolado esté en el archivo; cerrar() además termina el hilo
+    # (se llama solo al salir del proceso, ver cerrar_bitacoras).
+    def __init__(self, ruta, lineas_por_escritura=LINEAS_POR_ESCRITURA, intervalo=INTERVALO_ESCRITURA, fsync='nunca'):
+        if fsync not in POLITICAS_FSYNC:
+            raise ValueError(f"Política de fsync desconocida: {fsync} (opciones: {', '.join(POLITICAS_FSYNC)})")
+        self.ruta = ruta
+        self.lineas_por_escritura = lineas_por_escritura
+        self.intervalo = intervalo
+        self.fsync = fsync
+        self._cola = queue.SimpleQueue()
+        self._archivo = None
+        self._hilo = None
+        self._lock = threading.Lock()
+
+    # _lock protege _hilo: se encola con el lock tomado para que el hilo no termine entre
+    # que se lo ve vivo y se encola, y sin hilo las órdenes se ejecutan con el lock tomado
+    # para que escribir() no arranque uno que toque el archivo a la vez
+    def _iniciar(self):
+        if self._hilo is None:
+            self._hilo = threading.Thread(target=self._trabajar, name=f'bitacora-{self.ruta}', daemon=True)
+            self._hilo.start()
+
+    def escribir(self, linea):
+        with self._lock:
+            self._iniciar()
+            self._cola.put(linea)
+
+    def _ordenar(self, accion):
+        with self._lock:
+            if self._hilo is None:
+                self._ejecutar(accion)
+                return
+            orden = _Orden(accion)
+            self._cola.put(orden)
+        orden.lista.wait()
+
+    def vaciar(self):
+        self._ordenar('vaciar')
+
+    def truncar(self):
+        # Descarta lo pendiente y deja el archivo vacío
+        self._ordenar('truncar')
+
+    def cerrar(self):
+        self._ordenar('cerrar')
+
+    def _trabajar(self):
+        pendientes = []
+        vence = None
+        while True:
+            espera = None if vence is None else max(0.0, vence - time.monotonic())
+            try:
+                item = self._cola.get(timeout=espera)
+            except queue.Empty:
+                item = None
+            if isinstance(item, str):
+                pendientes.append(item)
+                if vence is None:
+                    vence = time.monotonic() + self.intervalo
+                if len(pendientes) < self.lineas_por_escritura:
+                    continue
+            if isinstance(item, _Orden) and item.accion == 'truncar':
+                pendientes = []
+            self._volcar(pendientes)
+            pendientes = []
+            vence = None
+            if isinstance(item, _Orden):
+                self._ejecutar(item.accion)
+                item.lista.set()
+                if item.accion == 'cerrar':
+                    with self._lock:
+                        # Lo encolado mientras se cerraba se sigue atendiendo
+                        if self._cola.empty():
+                            self._hilo = None
+                            return
+
+    def _volcar(self, lineas):
+        if not lineas:
+            return
+        try:
+            if self._archivo is None:
+                self._archivo = open(self.ruta, 'a', encoding='utf-8')
+            self._archivo.write(''.join(linea + '\n' for linea in lineas))
+            self._archivo.flush()
+            if self.fsync == 'lote':
+                os.fsync(self._archivo.fileno())
+        except Exception as e:
+            logging.error(f"Error escribiendo {len(lineas)} línea(s) en {self.ruta}: {e}")
+
+    def _ejecutar(self, accion):
+        try:
+            if accion in ('truncar', 'cerrar') and self._archivo is not None:
+                self._archivo.close()
+                self._archivo = None
+            if accion == 'truncar':
+                with open(self.ruta, 'w', encoding='utf-8') as f:
+                    f.write('')
+        except Exception as e:
+            logging.error(f"Error en la bitácora {self.ruta} ({accion}): {e}")
+
+_bitacoras = {}
+_bitacoras_lock = threading.Lock()
+_opciones = {}
+_oyentes = []
+
+def configurar_bitacoras(fsync=None, lineas_por_escritura=None, intervalo=None):
+    # Opciones de config.json; valen para las bitácoras ya abiertas y las siguientes
+    nuevas = {'fsync': fsync, 'lineas_por_escritura': lineas_por_escritura, 'intervalo': intervalo}
+    nuevas = {clave: valor for clave, valor in nuevas.items() if valor is not None}
+    if nuevas.get('fsync', 'nunca') not in POLITICAS_FSYNC:
+        logging.warning(f"fsync_bitacoras desconocido: {nuevas.pop('fsync')}, se usa 'nunca'")
+    with _bitacoras_lock:
+        _opciones.update(nuevas)
+        for bitacora in _bitacoras.values():
+            for clave, valor in nuevas.items():
+                setattr(bitacora, clave, valor)
+
+def obtener_bitacora(ruta):
+    with _bitacoras_lock:
+        if ruta not in _bitacoras:
+            _bitacoras[ruta] = BitacoraDiferida(ruta, **_opciones)
+        return _bitacoras[ruta]
+
+def cerrar_bitacoras():
+    # Al salir, lo encolado llega al archivo antes de que terminen los hilos
+    with _bitacoras_lock:
+        abiertas = list(_bitacoras.values())
+    for bitacora in abiertas:
+        bitacora.cerrar()
+
+def _al_salir():
+    # Primero las bitácoras (pueden loguear errores), después el log de la aplicación
+    cerrar_bitacoras()
+    for oyente in _oyentes:
+        oyente.stop()
+
+atexit.register(_al_salir)
+
+def configurar_log(archivo='auto_responder.log', consola=None):
+    # El log de la aplicación también sale del camino de envío: los hilos que loguean
+    # sólo encolan el registro y un QueueListener escribe en el archivo rotativo
+    # (y en la consola, si se indica un handler)
+    manejadores = [logging.handlers.RotatingFileHandler(archivo, maxBytes=LOG_MAX_BYTES, backupCount=LOG_RESPALDOS, encoding='utf-8')]
+    if consola is not None:
+        manejadores.append(consola)
+    formato = logging.Formatter(FORMATO_LOG)
+    for manejador in manejadores:
+        manejador.setFormatter(formato)
+    cola = queue.SimpleQueue()
+    oyente = logging.handlers.QueueListener(cola, *manejadores, respect_handler_level=True)
+    oyente.start()
+    raiz = logging.getLogger()
+    raiz.setLevel(logging.INFO)
+    raiz.addHandler(logging.handlers.QueueHandler(cola))
+    _oyentes.append(oyente)
+    return oyente
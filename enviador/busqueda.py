@@ -0,0 +1,139 @@
+import re
+import array
+import threading
+import unicodedata
+
+# Las búsquedas de 1 o 2 letras usan el índice de prefijos de palabra; las más largas,
+# el de trigramas (cualquier parte del texto)
+LARGO_TRIGRAMA = 3
+# Con más de esta proporción de contactos borrados, el índice se reconstruye
+PROPORCION_COMPACTAR = 0.5
+
+_SEPARADORES = re.compile(r'[\s@._\-+,;<>"\']+')
+
+# Acentos habituales por tabla (rápido); lo que quede fuera de ASCII, por Unicode
+_SIN_ACENTOS = str.maketrans('áéíóúüñàèìòùâêîôûäëïöç', 'aeiouunaeiouaeiouaeioc')
+
+def normalizar(texto):
+    # Minúsculas y sin acentos: "Peña" y "pena" coinciden
+    texto = (texto or '').lower().translate(_SIN_ACENTOS)
+    if texto.isascii():
+        return texto
+    texto = unicodedata.normalize('NFKD', texto)
+    return ''.join(c for c in texto if not unicodedata.combining(c))
+
+def _texto_contacto(contacto):
+    # Nombre visible y email (que ya incluye el dominio)
+    email = contacto['email']
+    nombre = (contacto.get('nombre') or '').strip() or email.split('@')[0]
+    return normalizar(f"{nombre} {email}")
+
+class IndiceContactos:
+    # Índice en memoria para buscar contactos por nombre, email o dominio mientras se
+    # escribe. Cada trigrama y cada prefijo de palabra (1-2 letras) apunta a una lista
+    # compacta (array) de ids; una búsqueda recorre la lista más corta de sus trigramas y
+    # confirma con el texto completo. Altas y bajas son incrementales: una baja sólo
+    # olvida el texto del contacto y las listas se limpian al reconstruir.
+    # Con listas grandes, construir() arma el índice desde otro hilo de a tandas; las
+    # altas y bajas de mientras se respetan, y listo se activa al terminar.
+    def __init__(self, contactos=None):
+        self._lock = threading.Lock()
+        self._textos = {}
+        self._trigramas = {}
+        self._prefijos = {}
+        self._borrados = 0
+        self._descartados = None  # ids borrados durante construir()
+        self._quitados = set()    # ids borrados desde la última reconstrucción
+        self._dudosos = set()     # ids vueltos a agregar después de borrados
+        self.listo = threading.Event()
+        if contactos is not None:
+            self.construir(contactos)
+
+    def construir(self, contactos, tanda=2000):
+        with self._lock:
+            self._descartados = set()
+        for desde in range(0, len(contactos), tanda):
+            # La tanda se corta fuera del lock: entre tandas las búsquedas, altas y bajas pasan
+            contactos_tanda = contactos[desde:desde + tanda]
+            with self._lock:
+                for contacto in contactos_tanda:
+                    i = contacto['id']
+                    if i not in self._textos and i not in self._descartados:
+                        self._indexar(i, _texto_contacto(contacto))
+        with self._lock:
+            self._descartados = None
+        self.listo.set()
+
+    def __len__(self):
+        return len(self._textos)
+
+    def _indexar(self, i, texto):
+        self._textos[i] = texto
+        for trigrama in {texto[j:j + LARGO_TRIGRAMA] for j in range(len(texto) - LARGO_TRIGRAMA + 1)}:
+            lista = self._trigramas.get(trigrama)
+            if lista is None:
+                lista = self._trigramas[trigrama] = array.array('i')
+            lista.append(i)
+        palabras = [p for p in _SEPARADORES.split(texto) if p]
+        for prefijo in {p[:n] for p in palabras for n in range(1, LARGO_TRIGRAMA)}:
+            lista = self._prefijos.get(prefijo)
+            if lista is None:
+                lista = self._prefijos[prefijo] = array.array('i')
+            lista.append(i)
+
+    def agregar(self, contactos):
+        with self._lock:
+            for contacto in contactos:
+                if contacto['id'] in self._textos:
+                    self._quitar(contacto['id'])
+                if contacto['id'] in self._quitados:
+                    self._dudosos.add(contacto['id'])
+                self._indexar(contacto['id'], _texto_contacto(contacto))
+
+    def _quitar(self, i):
+        if self._descartados is not None:
+            self._descartados.add(i)
+        if self._textos.pop(i, None) is not None:
+            self._borrados += 1
+            self._quitados.add(i)
+
+    def quitar(self, ids):
+        with self._lock:
+            for i in ids:
+                self._quitar(i)
+            if self._descartados is None and self._borrados > PROPORCION_COMPACTAR * max(len(self._textos), 1):
+                self._reconstruir()
+
+    def _reconstruir(self):
+        textos = self._textos
+        self._textos, self._trigramas, self._prefijos, self._borrados = {}, {}, {}, 0
+        self._quitados, self._dudosos = set(), set()
+        for i, texto in textos.items():
+            self._indexar(i, texto)
+
+    def buscar(self, consulta):
+        # Ids de los contactos que contienen todas las palabras de la consulta
+        # (las de 1-2 letras, como comienzo de palabra)
+        palabras = [p for p in _SEPARADORES.split(normalizar(consulta)) if p]
+        if not palabras:
+            return set(self._textos)
+        largas = [p for p in palabras if len(p) >= LARGO_TRIGRAMA]
+        cortas = [p for p in palabras if len(p) < LARGO_TRIGRAMA]
+        with self._lock:
+            textos = self._textos
+            conjuntos = [set(self._prefijos.get(p, ())) for p in cortas]
+            if largas:
+                # Los trigramas acotan; la palabra completa se confirma con el texto
+                candidatos = min((self._trigramas.get(p[j:j + LARGO_TRIGRAMA], ()) for p in largas
+                                  for j in range(len(p) - LARGO_TRIGRAMA + 1)), key=len)
+                resultado = {i for i in candidatos if i in textos and all(p in textos[i] for p in largas)}
+            else:
+                resultado = {i for i in conjuntos.pop() if i in textos}
+            for conjunto in conjuntos:
+                resultado &= conjunto
+            # Un id reutilizado puede arrastrar prefijos del contacto anterior
+            for i in resultado & self._dudosos:
+                palabras_texto = [p for p in _SEPARADORES.split(textos[i]) if p]
+                if not all(any(w.startswith(p) for w in palabras_texto) for p in cortas):
+                    resultado.discard(i)
+            return resultado
@@ -0,0 +1,197 @@
+import time
+import uuid
+import logging
+import sqlite3
+import threading
+
+from .configuracion import CAMPANIAS_DB
+
+class ColaCampania:
+    # Estado de cada destinatario de cada campaña en SQLite (WAL). Los cambios de
+    # estado se acumulan y se confirman en lotes para no hacer un commit por envío.
+    ESTADOS = ('pendiente', 'enviando', 'enviado', 'fallido', 'cancelado')
+
+    def __init__(self, ruta=CAMPANIAS_DB, lote_commit=200, intervalo_commit=1.0):
+        self.lote_commit = lote_commit
+        self.intervalo_commit = intervalo_commit
+        self._lock = threading.Lock()
+        self._pendientes_commit = []
+        self._ultimo_commit = time.monotonic()
+        self.conn = sqlite3.connect(ruta, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS campanias (
+                id TEXT PRIMARY KEY,
+                creada REAL NOT NULL,
+                servidor TEXT NOT NULL,
+                subject TEXT NOT NULL,
+                mensaje TEXT NOT NULL,
+                is_html INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS envios (
+                campania_id TEXT NOT NULL REFERENCES campanias(id),
+                email TEXT NOT NULL,
+                estado TEXT NOT NULL DEFAULT 'pendiente',
+                actualizado REAL,
+                error TEXT,
+                PRIMARY KEY (campania_id, email)
+            );
+            CREATE INDEX IF NOT EXISTS envios_estado ON envios (campania_id, estado);
+            CREATE TABLE IF NOT EXISTS rebotados (
+                email TEXT NOT NULL,
+                campania_id TEXT NOT NULL,
+                codigo INTEGER,
+                error TEXT,
+                fecha REAL NOT NULL
+            );
+        """)
+        self.conn.commit()
+
+    def crear(self, servidor, subject, mensaje, is_html, destinatarios):
+        campania_id = time.strftime('%Y%m%d-%H%M%S-') + uuid.uuid4().hex[:6]
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO campanias (id, creada, servidor, subject, mensaje, is_html) VALUES (?, ?, ?, ?, ?, ?)",
+                (campania_id, time.time(), servidor, subject, mensaje, int(bool(is_html)))
+            )
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO envios (campania_id, email) VALUES (?, ?)",
+                ((campania_id, d) for d in destinatarios)
+            )
+        logging.info(f"Campaña {campania_id} creada con {len(destinatarios)} destinatarios")
+        return campania_id
+
+    def obtener(self, campania_id):
+        fila = self.conn.execute(
+            "SELECT id, creada, servidor, subject, mensaje, is_html FROM campanias WHERE id = ?",
+            (campania_id,)
+        ).fetchone()
+        if fila is None:
+            return None
+        return dict(zip(('id', 'creada', 'servidor', 'subject', 'mensaje', 'is_html'), fila))
+
+    def pendientes(self, campania_id):
+        # Lo que quedó 'enviando' tras una caída no tiene confirmación: se vuelve a enviar
+        with self._lock, self.conn:
+            cur = self.conn.execute(
+                "UPDATE envios SET estado = 'pendiente' WHERE campania_id = ? AND estado = 'enviando'",
+                (campania_id,)
+            )
+            if cur.rowcount:
+                logging.warning(f"Campaña {campania_id}: {cur.rowcount} envíos sin confirmar vuelven a pendiente")
+            filas = self.conn.execute(
+                "SELECT email FROM envios WHERE campania_id = ? AND estado = 'pendiente' ORDER BY rowid",
+                (campania_id,)
+            ).fetchall()
+        return [f[0] for f in filas]
+
+    def marcar(self, campania_id, emails, estado, error=None):
+        ahora = time.time()
+        with self._lock:
+            self._pendientes_commit.extend((estado, ahora, error, campania_id, e) for e in emails)
+            if (len(self._pendientes_commit) >= self.lote_commit
+                    or time.monotonic() - self._ultimo_commit >= self.intervalo_commit):
+                self._confirmar()
+
+    def confirmar(self):
+        with self._lock:
+            self._confirmar()
+
+    def _confirmar(self):
+        if self._pendientes_commit:
+            with self.conn:
+                self.conn.executemany(
+                    "UPDATE envios SET estado = ?, actualizado = ?, error = ? WHERE campania_id = ? AND email = ?",
+                    self._pendientes_commit
+                )
+            self._pendientes_commit = []
+        self._ultimo_commit = time.monotonic()
+
+    def rebotar(self, campania_id, rechazados):
+        # Fallas definitivas: quedan 'fallido' y pasan a la lista de rebotados
+        ahora = time.time()
+        errores = {}
+        for email, (codigo, error) in rechazados.items():
+            if isinstance(error, bytes):
+                error = error.decode('utf-8', 'replace')
+            errores[email] = (codigo, str(error))
+        with self._lock:
+            self._pendientes_commit.extend(
+                ('fallido', ahora, error, campania_id, email) for email, (_, error) in errores.items()
+            )
+            self._confirmar()
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT INTO rebotados (email, campania_id, codigo, error, fecha) VALUES (?, ?, ?, ?, ?)",
+                    ((email, campania_id, codigo, error, ahora) for email, (codigo, error) in errores.items())
+                )
+
+    def rebotados(self, limite=1000):
+        return self.conn.execute(
+            "SELECT email, campania_id, codigo, error, fecha FROM rebotados ORDER BY fecha DESC LIMIT ?",
+            (limite,)
+        ).fetchall()
+
+    def limpiar_rebotados(self):
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM rebotados")
+
+    def resumen(self, campania_id):
+        self.confirmar()
+        filas = dict(self.conn.execute(
+            "SELECT estado, COUNT(*) FROM envios WHERE campania_id = ? GROUP BY estado",
+            (campania_id,)
+        ).fetchall())
+        return {estado: filas.get(estado, 0) for estado in self.ESTADOS}
+
+    def incompletas(self):
+        # Campañas con destinatarios todavía sin enviar, de la más reciente a la más antigua
+        self.confirmar()
+        return self.conn.execute("""
+            SELECT c.id, COUNT(*) FROM campanias c JOIN envios e ON e.campania_id = c.id
+            WHERE e.estado IN ('pendiente', 'enviando')
+            GROUP BY c.id ORDER BY c.creada DESC
+        """).fetchall()
+
+    def descartar(self, campania_id):
+        # Abandona lo que quedó sin enviar: pasa a 'cancelado' y la campaña deja de
+        # figurar entre las incompletas. Devuelve cuántos destinatarios se cancelaron.
+        with self._lock:
+            self._confirmar()
+            with self.conn:
+                cur = self.conn.execute(
+                    "UPDATE envios SET estado = 'cancelado', actualizado = ? "
+                    "WHERE campania_id = ? AND estado IN ('pendiente', 'enviando')",
+                    (time.time(), campania_id)
+                )
+        if cur.rowcount:
+            logging.info(f"Campaña {campania_id} descartada: {cur.rowcount} destinatario(s) cancelados")
+        return cur.rowcount
+
+    def cerrar(self):
+        try:
+            self.confirmar()
+        finally:
+            self.conn.close()
+
+def listar_rebotados(limite=1000):
+    campania = ColaCampania()
+    try:
+        return campania.rebotados(limite)
+    finally:
+        campania.cerrar()
+
+def campanias_incompletas():
+    campania = ColaCampania()
+    try:
+        return campania.incompletas()
+    finally:
+        campania.cerrar()
+
+def descartar_campania(campania_id):
+    campania = ColaCampania()
+    try:
+        return campania.descartar(campania_id)
+    finally:
+        campania.cerrar()
@@ -0,0 +1,269 @@
+import os
+import sys
+import json
+import logging
+import argparse
+
+from .configuracion import cargar_configuracion, SIGNATURE_BLOCK
+from .bitacora import configurar_log, configurar_bitacoras
+from .envio import MOTORES_ENVIO, ErrorEnvio, enviar_masivo, reanudar_campania
+from .campanias import campanias_incompletas, descartar_campania
+
+def configurar_logging(verbose=False, archivo='auto_responder.log'):
+    # Al archivo va todo; a la consola sólo avisos (el progreso se imprime aparte)
+    consola = logging.StreamHandler()
+    consola.setLevel(logging.INFO if verbose else logging.WARNING)
+    configurar_log(archivo, consola)
+
+def leer_archivo_destinatarios(ruta):
+    # .json con el formato de destinatarios.json, o texto con una línea "email[,nombre]"
+    with open(ruta, 'r', encoding='utf-8') as f:
+        if ruta.lower().endswith('.json'):
+            return [r['email'] for r in json.load(f) if r.get('selected', True)]
+        destinatarios = []
+        for linea in f:
+            email_txt = linea.split(',')[0].strip()
+            if '@' in email_txt and '.' in email_txt:
+                destinatarios.append(email_txt)
+        return destinatarios
+
+def _imprimir(msg):
+    print(msg, flush=True)
+
+def _credenciales(conf):
+    email_account = conf.get('email', '').strip()
+    email_password = conf.get('password', '')
+    if not email_account or not email_password:
+        raise SystemExit("Configura email y contraseña en config.json.")
+    return email_account, email_password
+
+def _opciones_envio(args, conf):
+    return {
+        'conexiones': args.conexiones or conf.get('conexiones'),
+        'motor': args.motor or conf.get('motor_envio', 'hilos'),
+        'lote_rcpt': args.lote_rcpt or conf.get('lote_rcpt'),
+    }
+
+def cmd_enviar(args, conf):
+    email_account, email_password = _credenciales(conf)
+    subject = args.asunto or conf.get('subject', '')
+    if args.mensaje_archivo:
+        with open(args.mensaje_archivo, 'r', encoding='utf-8') as f:
+            mensaje = f.read()
+    else:
+        mensaje = args.mensaje or conf.get('mensaje', '')
+    if not args.sin_firma and not args.html and 'Rocío Rodríguez' not in mensaje:
+        mensaje = mensaje.rstrip() + SIGNATURE_BLOCK
+    if not subject or not mensaje.strip():
+        raise SystemExit("Completa asunto y mensaje.")
+    if args.destinatarios:
+        destinatarios = leer_archivo_destinatarios(args.destinatarios)
+    elif args.listas:
+        destinatarios = _emails_listas(args.listas)
+    else:
+        # Sin archivo, los tildados en la lista de la interfaz (destinatarios.db)
+        from .destinatarios import obtener_registro_destinatarios
+        destinatarios = obtener_registro_destinatarios().seleccionados()
+    if not destinatarios:
+        raise SystemExit("No hay destinatarios válidos.")
+    resultado = enviar_masivo(email_account, email_password, subject, mensaje, args.servidor or conf.get('servidor', 'migusto'),
+                              destinatarios, _imprimir, is_html=args.html, **_opciones_envio(args, conf))
+    print(f"Campaña: {resultado.campania_id}")
+    return 0 if resultado.fallidos == 0 else 2
+
+def _emails_listas(expresion):
+    from .listas import EvaluadorListas, ErrorListas
+    try:
+        return EvaluadorListas().emails(expresion)
+    except ErrorListas as e:
+        raise SystemExit(str(e))
+
+def cmd_listas(args, conf):
+    from .destinatarios import obtener_registro_destinatarios
+    registro = obtener_registro_destinatarios()
+    if args.borrar:
+        registro.borrar_lista(args.borrar)
+        print(f"Lista '{args.borrar}' borrada (los contactos siguen guardados).")
+    elif args.expresion:
+        emails = _emails_listas(args.expresion)
+        if args.emails:
+            print("\n".join(emails))
+        print(f"{len(emails)} destinatario(s) en {args.expresion}")
+    else:
+        listas = registro.listas()
+        if not listas:
+            print("No hay listas de distribución.")
+        for nombre, cantidad in listas:
+            print(f"{nombre}\t{cantidad} contacto(s)")
+        print(f"({len(registro)} contacto(s) guardados en total)")
+    return 0
+
+def cmd_importar(args, conf):
+    from .importador import ErrorImportacion, importar_destinatarios, guardar_rechazos
+    from .listas import NOMBRES_RESERVADOS
+    if args.lista and args.lista.strip().lower() in NOMBRES_RESERVADOS:
+        raise SystemExit(f"'{args.lista}' es un nombre reservado para las expresiones de listas.")
+    try:
+        resultado = importar_destinatarios(args.archivo, lista=args.lista,
+                                           progreso=lambda fraccion, filas: _imprimir(f"{filas} filas ({fraccion:.0%})"))
+    except (ErrorImportacion, OSError) as e:
+        raise SystemExit(f"No se pudo importar {args.archivo}: {e}")
+    print(resultado.resumen)
+    if resultado.rechazados and args.rechazos:
+        guardar_rechazos(resultado, args.rechazos)
+        print(f"Detalle de rechazados en {args.rechazos}")
+    return 0
+
+def cmd_reanudar(args, conf):
+    email_account, email_password = _credenciales(conf)
+    resultado = reanudar_campania(email_account, email_password, args.campania, _imprimir, **_opciones_envio(args, conf))
+    return 0 if resultado.fallidos == 0 else 2
+
+def cmd_campanias(args, conf):
+    incompletas = campanias_incompletas()
+    if not incompletas:
+        print("No hay campañas con envíos pendientes.")
+    for campania_id, pendientes in incompletas:
+        print(f"{campania_id}\t{pendientes} pendiente(s)")
+    return 0
+
+def cmd_descartar(args, conf):
+    cancelados = descartar_campania(args.campania)
+    if not cancelados:
+        print(f"La campaña {args.campania} no tiene envíos pendientes (o no existe).")
+        return 1
+    print(f"Campaña {args.campania} descartada: {cancelados} destinatario(s) no se enviarán.")
+    return 0
+
+def cmd_responder(args, conf):
+    # La pila IMAP sólo se carga para este comando
+    from .autoresponder import auto_responder, auto_responder_continuo
+    email_account, email_password = _credenciales(conf)
+    subject = conf.get('subject', '').strip()
+    mensaje = conf.get('mensaje', '')
+    if not subject or not mensaje.strip():
+        raise SystemExit("Completa asunto y mensaje en config.json.")
+    servidor = conf.get('servidor', 'migusto')
+    if not args.continuo:
+        auto_responder(email_account, email_password, subject, mensaje, servidor, _imprimir,
+                       supresion_dias=conf.get('supresion_dias'))
+        return 0
+    logging.info("Auto-responder en modo continuo (línea de comandos)")
+    try:
+        auto_responder_continuo(email_account, email_password, subject, mensaje, servidor, _imprimir,
+                                intervalo=args.intervalo, supresion_dias=conf.get('supresion_dias'))
+    except KeyboardInterrupt:
+        print("Modo continuo detenido.")
+    return 0
+
+# Claves de config.json que heredan las entradas de "cuentas" que no las definen
+CLAVES_HEREDADAS_CUENTA = ('servidor', 'subject', 'mensaje', 'supresion_dias')
+
+def _cuentas_demonio(conf):
+    base = {clave: conf[clave] for clave in CLAVES_HEREDADAS_CUENTA if clave in conf}
+    cuentas = conf.get('cuentas')
+    if not cuentas:
+        # Sin lista de cuentas, la cuenta principal de config.json
+        cuentas = [{'email': conf.get('email', ''), 'password': conf.get('password', '')}]
+    return [{**base, **cuenta} for cuenta in cuentas]
+
+def _imprimir_resumen(resumen):
+    for r in resumen:
+        print(f"{r['cuenta']}: {r['respondidos']} respondido(s), {r['salteados']} salteado(s), "
+              f"{r['errores']} error(es) en {r['pasadas']} pasada(s) | {r['estado']}", flush=True)
+
+def cmd_demonio(args, conf):
+    from .demonio import DemonioRespuestas, validar_cuentas
+    cuentas = _cuentas_demonio(conf)
+    errores = validar_cuentas(cuentas)
+    if errores:
+        raise SystemExit("Revisa \"cuentas\" en config.json:\n" + "\n".join(errores))
+    demonio = DemonioRespuestas(cuentas, lambda cuenta, msg: _imprimir(f"[{cuenta}] {msg}"),
+                                trabajadores=args.trabajadores, intervalo=args.intervalo,
+                                principal=conf.get('email'))
+    demonio.iniciar()
+    try:
+        while not demonio.esperar(timeout=args.informe or None):
+            _imprimir_resumen(demonio.resumen())
+    except KeyboardInterrupt:
+        print("Deteniendo demonio...")
+    demonio.parar()
+    _imprimir_resumen(demonio.resumen())
+    return 0
+
+def crear_parser():
+    parser = argparse.ArgumentParser(prog='python -m enviador', description="Envío masivo y auto-respuesta sin interfaz gráfica")
+    parser.add_argument('--config', default='config.json', help="Ruta a config.json (credenciales y opciones)")
+    parser.add_argument('--directorio', help="Carpeta de trabajo con los archivos de datos (por defecto, la actual)")
+    parser.add_argument('-v', '--verbose', action='store_true', help="Mostrar también el log INFO en consola")
+    sub = parser.add_subparsers(dest='comando', required=True)
+
+    def opciones_envio(p):
+        p.add_argument('--conexiones', type=int, help="Sesiones SMTP simultáneas")
+        p.add_argument('--motor', choices=MOTORES_ENVIO, help="Motor de envío")
+        p.add_argument('--lote-rcpt', type=int, help="Destinatarios por transacción (modo lote, en copia oculta)")
+
+    p = sub.add_parser('enviar', help="Enviar una campaña a los destinatarios de un archivo")
+    origen = p.add_mutually_exclusive_group()
+    origen.add_argument('destinatarios', nargs='?', help="Archivo .txt (email[,nombre] por línea) o .json; sin archivo, los tildados en la interfaz")
+    origen.add_argument('--listas', help="Expresión de listas de distribución, p. ej. \"Sucursales ∪ Gerentes − Bajas\"")
+    p.add_argument('--asunto', help="Asunto (por defecto, el de config.json)")
+    grupo = p.add_mutually_exclusive_group()
+    grupo.add_argument('--mensaje', help="Texto del mensaje")
+    grupo.add_argument('--mensaje-archivo', help="Archivo con el texto (o HTML) del mensaje")
+    p.add_argument('--html', action='store_true', help="El mensaje es HTML")
+    p.add_argument('--sin-firma', action='store_true', help="No agregar la firma automática")
+    p.add_argument('--servidor', help="Servidor de EMAIL_CONFIG (por defecto, el de config.json)")
+    opciones_envio(p)
+    p.set_defaults(func=cmd_enviar)
+
+    p = sub.add_parser('listas', help="Ver las listas de distribución o resolver una expresión")
+    p.add_argument('expresion', nargs='?', help="Expresión a resolver (∪ + unión, ∩ & intersección, − - resta, paréntesis)")
+    p.add_argument('--emails', action='store_true', help="Imprimir las direcciones de la expresión")
+    p.add_argument('--borrar', metavar='LISTA', help="Borrar una lista (no sus contactos)")
+    p.set_defaults(func=cmd_listas)
+
+    p = sub.add_parser('importar', help="Importar contactos de un .csv, .xlsx o .txt a destinatarios.db")
+    p.add_argument('archivo', help="Archivo a importar")
+    p.add_argument('--lista', help="Agregar además los contactos del archivo a esta lista de distribución")
+    p.add_argument('--rechazos', default='rechazados_importacion.csv', help="CSV con el detalle de lo que no se importó")
+    p.set_defaults(func=cmd_importar)
+
+    p = sub.add_parser('reanudar', help="Reanudar una campaña interrumpida")
+    p.add_argument('campania', help="Identificador de la campaña")
+    opciones_envio(p)
+    p.set_defaults(func=cmd_reanudar)
+
+    p = sub.add_parser('campanias', help="Listar campañas con envíos pendientes")
+    p.set_defaults(func=cmd_campanias)
+
+    p = sub.add_parser('descartar', help="Abandonar una campaña interrumpida (sus pendientes no se envían)")
+    p.add_argument('campania', help="Identificador de la campaña")
+    p.set_defaults(func=cmd_descartar)
+
+    p = sub.add_parser('responder', help="Responder los correos no leídos")
+    p.add_argument('--continuo', action='store_true', help="Quedarse esperando correos nuevos (demonio)")
+    p.add_argument('--intervalo', type=int, default=60, help="Segundos entre revisiones si el servidor no admite IDLE")
+    p.set_defaults(func=cmd_responder)
+
+    p = sub.add_parser('demonio', help="Auto-respuesta continua para todas las cuentas de config.json")
+    p.add_argument('--intervalo', type=int, default=60, help="Segundos entre revisiones si el servidor no admite IDLE")
+    p.add_argument('--trabajadores', type=int, help="Hilos de envío compartidos entre cuentas")
+    p.add_argument('--informe', type=int, default=300, help="Segundos entre resúmenes por cuenta (0: sólo al terminar)")
+    p.set_defaults(func=cmd_demonio)
+    return parser
+
+def main(argv=None):
+    args = crear_parser().parse_args(argv)
+    if args.directorio:
+        os.chdir(args.directorio)
+    configurar_logging(args.verbose)
+    conf = cargar_configuracion(args.config)
+    configurar_bitacoras(fsync=conf.get('fsync_bitacoras'))
+    try:
+        return args.func(args, conf)
+    except ErrorEnvio:
+        return 1
+
+if __name__ == '__main__':
+    sys.exit(main())
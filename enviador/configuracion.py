@@ -0,0 +1,97 @@
+import os
+import json
+import logging
+
+RESPONDIDOS_FILE = 'respondidos.txt'
+RESPONDIDOS_DB = 'respondidos.db'
+ENVIADOS_FILE = 'enviados.txt'
+CONFIG_FILE = 'config.json'
+DESTINATARIOS_FILE = 'destinatarios.json'
+DESTINATARIOS_DB = 'destinatarios.db'
+CAMPANIAS_DB = 'campanias.db'
+SINCRONIZACION_FILE = 'sincronizacion.json'
+SIGNATURE_BLOCK = "\n\nRocío Rodríguez\nRecursos Humanos"
+SIGNATURE_HTML = "<br/><br/><span style=\"font-weight:600; font-size:90%\">Rocío Rodríguez<br/>Recursos Humanos</span>"
+
+# Configuración de servidores de email
+EMAIL_CONFIG = {
+    'migusto': {
+        'imap_server': 'mail.migusto.com.ar',
+        'smtp_server': 'mail.migusto.com.ar',
+        'smtp_port': 465,
+        'max_conexiones': 4,
+        'max_rcpt': 50,
+        'max_por_conexion': 100,
+        'max_por_segundo': 5,
+        'max_por_hora': None
+    },
+    'gmail': {
+        'imap_server': 'imap.gmail.com',
+        'smtp_server': 'smtp.gmail.com',
+        'smtp_port': 587,
+        'max_conexiones': 5,
+        'max_rcpt': 100,
+        'max_por_conexion': 100,
+        'max_por_segundo': 5,
+        'max_por_hora': None
+    },
+    'outlook': {
+        'imap_server': 'outlook.office365.com',
+        'smtp_server': 'smtp-mail.outlook.com',
+        'smtp_port': 587,
+        'max_conexiones': 5,
+        'max_rcpt': 100,
+        'max_por_conexion': 100,
+        'max_por_segundo': 5,
+        'max_por_hora': None
+    }
+}
+
+# ------------------- Configuración persistente -------------------
+def guardar_configuracion(email, password, subject, mensaje, servidor='migusto'):
+    config = {
+        'email': email,
+        'password': password,
+        'subject': subject,
+        'mensaje': mensaje,
+        'servidor': servidor
+    }
+    try:
+        with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
+            json.dump(config, f, ensure_ascii=False, indent=2)
+        logging.info("Configuración guardada exitosamente")
+    except Exception as e:
+        logging.error(f"Error guardando configuración: {e}")
+        raise
+
+def cargar_configuracion(ruta=CONFIG_FILE):
+    if os.path.exists(ruta):
+        try:
+            with open(ruta, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+                # Asegurar compatibilidad con versiones anteriores
+                if 'servidor' not in config:
+                    config['servidor'] = 'migusto'
+                return config
+        except Exception as e:
+            logging.error(f"Error cargando configuración: {e}")
+    return {'email': '', 'password': '', 'subject': '', 'mensaje': '', 'servidor': 'migusto'}
+
+def guardar_configuracion_parcial(subject, mensaje, servidor='migusto'):
+    try:
+        actual = cargar_configuracion()
+        # Conservar claves opcionales (motor_envio, conexiones, ...) que no se editan en la UI
+        config = dict(actual)
+        config.update({
+            'email': actual.get('email', ''),
+            'password': actual.get('password', ''),
+            'subject': subject,
+            'mensaje': mensaje,
+            'servidor': 'migusto'
+        })
+        with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
+            json.dump(config, f, ensure_ascii=False, indent=2)
+        logging.info("Configuración (parcial) guardada exitosamente")
+    except Exception as e:
+        logging.error(f"Error guardando configuración parcial: {e}")
+        raise
@@ -0,0 +1,113 @@
+import re
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .configuracion import EMAIL_CONFIG, RESPONDIDOS_FILE, RESPONDIDOS_DB
+from .respondidos import obtener_registro_respondidos
+from .sesiones import crear_contexto_ssl
+from .autoresponder import INTERVALO_SONDEO, TRABAJADORES_RESPUESTA, Respondedor
+
+# Tope del pool de respuestas compartido, sumando las sesiones SMTP de todas las cuentas
+MAX_TRABAJADORES_DEMONIO = 16
+
+def _sufijo_cuenta(email_account):
+    return re.sub(r'[^a-z0-9]+', '_', email_account.lower()).strip('_')
+
+def rutas_respondidos(cuenta, principal=None):
+    # Cada cuenta deduplica por separado: respondidos-<cuenta>.db y su bitácora .txt,
+    # salvo que la entrada de config.json indique otra base con "respondidos".
+    # La cuenta principal (principal = email de config.json) sigue con respondidos.db
+    # y respondidos.txt, los mismos que usa el auto-respondedor de la interfaz
+    base = cuenta.get('respondidos')
+    if not base and principal and cuenta['email'].strip().lower() == principal.strip().lower():
+        return RESPONDIDOS_DB, RESPONDIDOS_FILE
+    if not base:
+        raiz = RESPONDIDOS_DB.rsplit('.', 1)[0]
+        base = f"{raiz}-{_sufijo_cuenta(cuenta['email'])}.db"
+    bitacora = base.rsplit('.', 1)[0] + '.' + RESPONDIDOS_FILE.rsplit('.', 1)[1]
+    return base, bitacora
+
+def validar_cuentas(cuentas):
+    # Devuelve la lista de problemas (vacía si todas las cuentas están completas)
+    errores = []
+    vistas = set()
+    for n, cuenta in enumerate(cuentas, 1):
+        email_account = (cuenta.get('email') or '').strip()
+        nombre = email_account or f'cuenta #{n}'
+        if not email_account or not cuenta.get('password'):
+            errores.append(f"{nombre}: falta email o contraseña")
+        if not (cuenta.get('subject') or '').strip() or not (cuenta.get('mensaje') or '').strip():
+            errores.append(f"{nombre}: falta asunto o mensaje")
+        if cuenta.get('servidor', 'migusto') not in EMAIL_CONFIG:
+            errores.append(f"{nombre}: servidor '{cuenta.get('servidor')}' no configurado")
+        if email_account.lower() in vistas:
+            errores.append(f"{nombre}: cuenta repetida")
+        vistas.add(email_account.lower())
+    return errores
+
+class DemonioRespuestas:
+    # Vigila varias cuentas desde un solo proceso: un hilo IMAP por cuenta (IDLE o
+    # sondeo), cada una con su servidor, asunto, mensaje y registro de respondidos.
+    # Se comparten un contexto SSL por servidor y el pool de hilos que envía las
+    # respuestas; el estado y las métricas se consultan por cuenta con resumen().
+    def __init__(self, cuentas, status_callback, trabajadores=None, intervalo=INTERVALO_SONDEO,
+                 principal=None):
+        self.intervalo = intervalo
+        self.detener = threading.Event()
+        self.hilos = []
+        contextos = {}
+        self.respondedores = []
+        for cuenta in cuentas:
+            servidor = cuenta.get('servidor', 'migusto')
+            if servidor not in contextos:
+                contextos[servidor] = crear_contexto_ssl(servidor)
+            email_account = cuenta['email'].strip()
+            ruta, bitacora = rutas_respondidos(cuenta, principal)
+            self.respondedores.append(Respondedor(
+                email_account, cuenta['password'], cuenta['subject'].strip(), cuenta['mensaje'], servidor,
+                lambda msg, c=email_account: status_callback(c, msg),
+                supresion_dias=cuenta.get('supresion_dias'),
+                trabajadores=cuenta.get('trabajadores'),
+                context=contextos[servidor],
+                respondidos=obtener_registro_respondidos(ruta, bitacora),
+                pool=self,
+            ))
+        sesiones = sum(len(r.sesiones) for r in self.respondedores)
+        trabajadores = trabajadores or min(sesiones, MAX_TRABAJADORES_DEMONIO) or TRABAJADORES_RESPUESTA
+        self._pool = ThreadPoolExecutor(max_workers=trabajadores, thread_name_prefix='respuesta')
+        self.trabajadores = trabajadores
+
+    def submit(self, *args, **kwargs):
+        # Los respondedores encolan sus envíos en el pool compartido
+        return self._pool.submit(*args, **kwargs)
+
+    def iniciar(self):
+        logging.info(f"Demonio de auto-respuesta: {len(self.respondedores)} cuenta(s), {self.trabajadores} hilo(s) de envío")
+        for respondedor in self.respondedores:
+            hilo = threading.Thread(target=respondedor.vigilar, args=(self.detener, self.intervalo),
+                                    name=f'imap-{respondedor.email_account}', daemon=True)
+            hilo.start()
+            self.hilos.append(hilo)
+
+    def activo(self):
+        return any(hilo.is_alive() for hilo in self.hilos)
+
+    def esperar(self, timeout=None):
+        # True si terminaron todas las cuentas (detenidas o con error de autenticación)
+        limite = None if timeout is None else time.monotonic() + timeout
+        for hilo in self.hilos:
+            hilo.join(None if limite is None else max(0, limite - time.monotonic()))
+        return not self.activo()
+
+    def parar(self):
+        self.detener.set()
+        self.esperar()
+        self._pool.shutdown(wait=True)
+        for respondedor in self.respondedores:
+            respondedor.cerrar()
+        logging.info("Demonio de auto-respuesta detenido")
+
+    def resumen(self):
+        return [respondedor.resumen() for respondedor in self.respondedores]
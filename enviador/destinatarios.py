@@ -0,0 +1,237 @@
+import os
+import json
+import time
+import logging
+import sqlite3
+import threading
+
+from .configuracion import DESTINATARIOS_DB, DESTINATARIOS_FILE
+
+class RegistroDestinatarios:
+    # La lista de destinatarios de la interfaz en SQLite (WAL): tildar, agregar o borrar
+    # un contacto es una fila en una transacción, sin reescribir la lista entera.
+    # Cada contacto tiene un id entero estable que además fija el orden de la lista, y
+    # opcionalmente campos extra (columnas de un CSV/XLSX importado) guardados como JSON.
+    # destinatarios.json (versiones anteriores) se importa una sola vez al crear la base.
+    # Las listas con nombre sólo guardan ids de contactos (cada contacto existe una vez,
+    # aunque esté en varias listas); version cambia con cada alta, baja o cambio de
+    # pertenencia, así quien guarde conjuntos calculados sabe cuándo rehacerlos.
+    def __init__(self, ruta=DESTINATARIOS_DB, json_anterior=DESTINATARIOS_FILE):
+        self.json_anterior = json_anterior
+        self.version = 0
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(ruta, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS destinatarios (
+                id INTEGER PRIMARY KEY,
+                email TEXT NOT NULL,
+                clave TEXT NOT NULL UNIQUE,
+                nombre TEXT NOT NULL DEFAULT '',
+                seleccionado INTEGER NOT NULL DEFAULT 1,
+                campos TEXT
+            );
+            CREATE TABLE IF NOT EXISTS listas (
+                id INTEGER PRIMARY KEY,
+                nombre TEXT NOT NULL,
+                clave TEXT NOT NULL UNIQUE
+            );
+            CREATE TABLE IF NOT EXISTS miembros (
+                lista_id INTEGER NOT NULL,
+                contacto_id INTEGER NOT NULL,
+                PRIMARY KEY (lista_id, contacto_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS miembros_contacto ON miembros (contacto_id);
+            CREATE TABLE IF NOT EXISTS meta (
+                clave TEXT PRIMARY KEY,
+                valor TEXT
+            );
+        """)
+        columnas = {fila[1] for fila in self.conn.execute("PRAGMA table_info(destinatarios)")}
+        if 'campos' not in columnas:
+            self.conn.execute("ALTER TABLE destinatarios ADD COLUMN campos TEXT")
+        self.conn.commit()
+        self._importar_json()
+
+    def _importar_json(self):
+        with self._lock, self.conn:
+            if self.conn.execute("SELECT 1 FROM meta WHERE clave = 'json_importado'").fetchone():
+                return
+            importados = 0
+            if os.path.exists(self.json_anterior):
+                try:
+                    with open(self.json_anterior, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                    filas = [(r['email'], r['email'].lower(), r.get('nombre') or '', int(r.get('selected', True)))
+                             for r in data if isinstance(r, dict) and r.get('email')]
+                    importados = self.conn.executemany(
+                        "INSERT OR IGNORE INTO destinatarios (email, clave, nombre, seleccionado) VALUES (?, ?, ?, ?)", filas
+                    ).rowcount
+                except Exception as e:
+                    logging.error(f"Error importando {self.json_anterior}: {e}")
+            self.conn.execute("INSERT INTO meta (clave, valor) VALUES ('json_importado', ?)", (str(time.time()),))
+        if importados:
+            logging.info(f"Importados {importados} destinatarios desde {self.json_anterior}")
+
+    def todos(self):
+        # [{"id", "email", "nombre", "selected", "campos"}] en el orden en que se agregaron
+        return [{'id': i, 'email': email, 'nombre': nombre, 'selected': bool(sel), 'campos': json.loads(campos) if campos else {}}
+                for i, email, nombre, sel, campos in self.conn.execute(
+                    "SELECT id, email, nombre, seleccionado, campos FROM destinatarios ORDER BY id"
+                )]
+
+    def seleccionados(self):
+        return [fila[0] for fila in self.conn.execute(
+            "SELECT email FROM destinatarios WHERE seleccionado ORDER BY id"
+        )]
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM destinatarios").fetchone()[0]
+
+    def agregar(self, email, nombre='', seleccionado=True):
+        # Devuelve el contacto nuevo, o None si la dirección ya estaba
+        nuevos = self.agregar_varios([(email, nombre)], seleccionado)
+        return nuevos[0] if nuevos else None
+
+    def agregar_varios(self, filas, seleccionado=True):
+        # filas: [(email, nombre)] o [(email, nombre, campos)]; las direcciones repetidas
+        # se ignoran. Todo en una transacción.
+        nuevos = []
+        with self._lock, self.conn:
+            for email, nombre, *resto in filas:
+                campos = resto[0] if resto else {}
+                cursor = self.conn.execute(
+                    "INSERT OR IGNORE INTO destinatarios (email, clave, nombre, seleccionado, campos) VALUES (?, ?, ?, ?, ?)",
+                    (email, email.lower(), nombre or '', int(seleccionado), json.dumps(campos, ensure_ascii=False) if campos else None)
+                )
+                if cursor.rowcount:
+                    nuevos.append({'id': cursor.lastrowid, 'email': email, 'nombre': nombre or '', 'selected': seleccionado, 'campos': campos})
+            self.version += 1
+        return nuevos
+
+    def ids_por_email(self, emails):
+        # {email en minúsculas: id} de las direcciones que ya están
+        claves = [e.lower() for e in emails]
+        ids = {}
+        for desde in range(0, len(claves), 500):
+            tanda = claves[desde:desde + 500]
+            ids.update(self.conn.execute(
+                f"SELECT clave, id FROM destinatarios WHERE clave IN ({','.join('?' * len(tanda))})", tanda
+            ).fetchall())
+        return ids
+
+    def contactos_por_email(self, emails):
+        # {email en minúsculas: {"nombre", "campos"}} de las direcciones guardadas (combinación)
+        claves = [e.lower() for e in emails]
+        contactos = {}
+        for desde in range(0, len(claves), 500):
+            tanda = claves[desde:desde + 500]
+            for clave, nombre, campos in self.conn.execute(
+                f"SELECT clave, nombre, campos FROM destinatarios WHERE clave IN ({','.join('?' * len(tanda))})", tanda
+            ):
+                contactos[clave] = {'nombre': nombre, 'campos': json.loads(campos) if campos else {}}
+        return contactos
+
+    def ids(self, seleccionados=False):
+        consulta = "SELECT id FROM destinatarios" + (" WHERE seleccionado" if seleccionados else "")
+        return [fila[0] for fila in self.conn.execute(consulta)]
+
+    def emails(self, ids):
+        # Direcciones de los ids dados, en el orden de la lista
+        ids = set(ids)
+        return [email for i, email in self.conn.execute("SELECT id, email FROM destinatarios ORDER BY id") if i in ids]
+
+    def seleccionar(self, ids, seleccionado=True):
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "UPDATE destinatarios SET seleccionado = ? WHERE id = ?",
+                ((int(seleccionado), i) for i in ids)
+            )
+
+    def borrar(self, ids):
+        ids = list(ids)
+        with self._lock, self.conn:
+            self.conn.executemany("DELETE FROM destinatarios WHERE id = ?", ((i,) for i in ids))
+            self.conn.executemany("DELETE FROM miembros WHERE contacto_id = ?", ((i,) for i in ids))
+            self.version += 1
+
+    def reemplazar(self, lista):
+        # Reemplaza la lista completa (formato de destinatarios.json)
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM destinatarios")
+            self.conn.execute("DELETE FROM miembros")
+            self.version += 1
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO destinatarios (email, clave, nombre, seleccionado, campos) VALUES (?, ?, ?, ?, ?)",
+                ((r['email'], r['email'].lower(), r.get('nombre') or '', int(r.get('selected', True)),
+                  json.dumps(r['campos'], ensure_ascii=False) if r.get('campos') else None) for r in lista)
+            )
+
+    # ---- Listas con nombre ----
+
+    def listas(self):
+        # [(nombre, cantidad de contactos)] por orden alfabético
+        return self.conn.execute(
+            "SELECT l.nombre, COUNT(m.contacto_id) FROM listas l LEFT JOIN miembros m ON m.lista_id = l.id "
+            "GROUP BY l.id ORDER BY l.clave"
+        ).fetchall()
+
+    def _id_lista(self, nombre, crear=False):
+        fila = self.conn.execute("SELECT id FROM listas WHERE clave = ?", (nombre.strip().lower(),)).fetchone()
+        if fila:
+            return fila[0]
+        if crear:
+            return self.conn.execute(
+                "INSERT INTO listas (nombre, clave) VALUES (?, ?)", (nombre.strip(), nombre.strip().lower())
+            ).lastrowid
+        return None
+
+    def miembros(self, nombre):
+        # Ids de la lista, o None si no existe
+        lista_id = self._id_lista(nombre)
+        if lista_id is None:
+            return None
+        return [fila[0] for fila in self.conn.execute("SELECT contacto_id FROM miembros WHERE lista_id = ?", (lista_id,))]
+
+    def agregar_a_lista(self, nombre, ids, reemplazar=False):
+        # Crea la lista si no existe; con reemplazar, la lista queda exactamente con ids
+        with self._lock, self.conn:
+            lista_id = self._id_lista(nombre, crear=True)
+            if reemplazar:
+                self.conn.execute("DELETE FROM miembros WHERE lista_id = ?", (lista_id,))
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO miembros (lista_id, contacto_id) VALUES (?, ?)", ((lista_id, i) for i in ids)
+            )
+            self.version += 1
+
+    def quitar_de_lista(self, nombre, ids):
+        with self._lock, self.conn:
+            lista_id = self._id_lista(nombre)
+            if lista_id is not None:
+                self.conn.executemany(
+                    "DELETE FROM miembros WHERE lista_id = ? AND contacto_id = ?", ((lista_id, i) for i in ids)
+                )
+                self.version += 1
+
+    def borrar_lista(self, nombre):
+        # Los contactos quedan; sólo se borra el grupo
+        with self._lock, self.conn:
+            lista_id = self._id_lista(nombre)
+            if lista_id is not None:
+                self.conn.execute("DELETE FROM miembros WHERE lista_id = ?", (lista_id,))
+                self.conn.execute("DELETE FROM listas WHERE id = ?", (lista_id,))
+                self.version += 1
+
+    def cerrar(self):
+        with self._lock:
+            self.conn.close()
+
+_registros = {}
+_registros_lock = threading.Lock()
+
+def obtener_registro_destinatarios(ruta=DESTINATARIOS_DB):
+    with _registros_lock:
+        if ruta not in _registros:
+            _registros[ruta] = RegistroDestinatarios(ruta)
+        return _registros[ruta]
@@ -0,0 +1,367 @@
+import asyncio
+import logging
+import smtplib
+import threading
+
+from .configuracion import EMAIL_CONFIG
+from .historial import guardar_enviado
+from .mensajes import compilar_plantilla, marcadores_plantilla
+from .sesiones import crear_contexto_ssl, enviar_datos, SesionReconectable, INTERVALO_NOOP
+from .transporte_async import SesionReconectableAsync
+from .tasa import CODIGOS_LIMITE, obtener_control_tasa
+from .reintentos import MAX_REINTENTOS, clasificar_error, demora_reintento, Entrega, ColaReintentos
+from .campanias import ColaCampania
+
+def _resultado_lote(lote, rechazados):
+    # Clasifica los RCPT rechazados: 4xx se reintentan, 5xx rebotan
+    reintentar = []
+    definitivos = {}
+    limite = False
+    for destinatario, (code, resp) in rechazados.items():
+        if 400 <= code < 500:
+            logging.warning(f"Destinatario {destinatario} demorado por el servidor: {code} {resp}")
+            reintentar.append(destinatario)
+            limite = limite or code in CODIGOS_LIMITE
+        else:
+            logging.error(f"Destinatario rechazado {destinatario}: {code} {resp}")
+            definitivos[destinatario] = (code, resp)
+    aceptados = [d for d in lote if d not in rechazados]
+    if len(lote) == 1 and aceptados:
+        logging.info(f"Respuesta enviada exitosamente a {lote[0]}")
+    elif len(lote) > 1:
+        logging.info(f"Lote de {len(lote)} destinatarios enviado ({len(aceptados)} aceptados)")
+    return Entrega(aceptados, reintentar, definitivos, limite)
+
+def _resultado_error(lote, e):
+    tipo = clasificar_error(e)
+    code = getattr(e, 'smtp_code', None)
+    if tipo == 'permanente':
+        logging.error(f"Error enviando a {', '.join(lote)}: {e}")
+        return Entrega(rechazados={d: (code, str(e)) for d in lote})
+    logging.warning(f"Envío a {len(lote)} destinatario(s) demorado ({tipo}): {e}")
+    return Entrega(reintentar=lote, limite=code in CODIGOS_LIMITE,
+                   error_conexion=e if tipo == 'conexion' else None)
+
+def entregar_lote(smtp_conn, lote, plantilla, modo_lote):
+    # Un único DATA para el lote (o un mensaje individual si no es modo lote)
+    datos = plantilla.renderizar_lote() if modo_lote else plantilla.renderizar(lote[0])
+    try:
+        rechazados = enviar_datos(smtp_conn, plantilla.remitente, lote, datos)
+    except smtplib.SMTPRecipientsRefused as e:
+        rechazados = e.recipients
+    except Exception as e:
+        return _resultado_error(lote, e)
+    return _resultado_lote(lote, rechazados)
+
+class ConexionEnvio:
+    # Contadores de una de las sesiones SMTP del pool
+    def __init__(self, numero):
+        self.numero = numero
+        self.exitosos = 0
+        self.fallidos = 0
+        self.reconexiones = 0
+
+def _dividir_en_lotes(destinatarios, tamanio):
+    return [destinatarios[i:i + tamanio] for i in range(0, len(destinatarios), tamanio)]
+
+def _procesar_entrega(conexion, lote, intentos, entrega, estado, cola):
+    if entrega.limite:
+        estado['control'].limite()
+    elif entrega.aceptados:
+        estado['control'].exito()
+
+    rechazados = dict(entrega.rechazados)
+    if entrega.reintentar:
+        if intentos + 1 >= MAX_REINTENTOS:
+            logging.error(f"{len(entrega.reintentar)} destinatario(s) agotaron {MAX_REINTENTOS} intentos")
+            for destinatario in entrega.reintentar:
+                rechazados[destinatario] = (None, f"Sin éxito tras {MAX_REINTENTOS} intentos")
+        else:
+            cola.programar(entrega.reintentar, intentos + 1, demora_reintento(intentos))
+            with estado['lock']:
+                estado['procesados'] -= len(entrega.reintentar)
+
+    for destinatario in entrega.aceptados:
+        guardar_enviado(destinatario)
+    conexion.exitosos += len(entrega.aceptados)
+    conexion.fallidos += len(rechazados)
+    estado['campania'].marcar(estado['campania_id'], entrega.aceptados, 'enviado')
+    if rechazados:
+        estado['campania'].rebotar(estado['campania_id'], rechazados)
+
+def _anunciar_lote(lote, estado, status_callback):
+    with estado['lock']:
+        estado['procesados'] += len(lote)
+        i = estado['procesados']
+    estado['campania'].marcar(estado['campania_id'], lote, 'enviando')
+    if estado['modo_lote']:
+        status_callback(f"Enviando lote de {len(lote)} destinatarios ({i}/{estado['total']})")
+    else:
+        status_callback(f"Enviando a {lote[0]} ({i}/{estado['total']})")
+
+def _devolver_lote(lote, intentos, estado, cola):
+    # El lote no llegó a intentarse (no hubo sesión): vuelve a la cola sin contar intento
+    cola.programar(lote, intentos)
+    with estado['lock']:
+        estado['procesados'] -= len(lote)
+
+# Lo que sigue es común a los dos motores (hilos y asyncio): cada trabajador sólo hace
+# sus llamadas de red (con o sin await) y delega aquí el estado compartido, la
+# contabilidad de cada entrega y el cierre, para que ambos motores no se desfasen.
+
+def _preparar_pool(destinatarios, tamanio_lote, n_conexiones, campania, campania_id, control):
+    cola = ColaReintentos(_dividir_en_lotes(destinatarios, tamanio_lote))
+    estado = {'lock': threading.Lock(), 'procesados': 0, 'total': len(destinatarios),
+              'errores_conexion': [], 'modo_lote': tamanio_lote > 1,
+              'campania': campania, 'campania_id': campania_id, 'control': control}
+    pool = [ConexionEnvio(n) for n in range(1, n_conexiones + 1)]
+    return cola, estado, pool
+
+def _conexion_fallida(conexion, estado, e):
+    logging.error(f"No se pudo abrir la conexión SMTP #{conexion.numero}: {e}")
+    with estado['lock']:
+        estado['errores_conexion'].append(e)
+
+def _sin_reconexion(conexion, lote, intentos, estado, cola, e):
+    logging.error(f"Conexión SMTP #{conexion.numero} sin poder reconectar: {e}")
+    _devolver_lote(lote, intentos, estado, cola)
+
+def _registrar_entrega(conexion, sesion, lote, intentos, entrega, estado, cola):
+    sesion.registrar_uso()
+    _procesar_entrega(conexion, lote, intentos, entrega, estado, cola)
+
+def _revisar_conexion(conexion, sesion, entrega):
+    # Tras un corte, la sesión se descarta y el próximo lote reconecta
+    if entrega.error_conexion is not None:
+        logging.warning(f"Conexión SMTP #{conexion.numero} perdida, reconectando: {entrega.error_conexion}")
+        sesion.descartar()
+
+def _terminar_pool(pool, cola, estado, destinatarios):
+    # Si ninguna conexión pudo abrirse, informar el error original
+    if len(estado['errores_conexion']) == len(pool):
+        raise estado['errores_conexion'][0]
+    return _resumir_pool(pool, cola, destinatarios)
+
+def _trabajador_envio(conexion, cola, estado, config, email_account, email_password, context,
+                      plantilla, status_callback):
+    sesion = SesionReconectable(config, email_account, email_password, context)
+    try:
+        sesion.asegurar()
+        logging.info(f"Conexión SMTP #{conexion.numero} establecida para envío masivo")
+    except Exception as e:
+        _conexion_fallida(conexion, estado, e)
+        return
+
+    try:
+        while True:
+            item = cola.tomar(timeout=INTERVALO_NOOP)
+            if item is None:
+                break
+            if item is ColaReintentos.ESPERANDO:
+                sesion.mantener()
+                continue
+            lote, intentos = item
+            try:
+                _anunciar_lote(lote, estado, status_callback)
+                estado['control'].esperar(len(lote))
+                try:
+                    smtp = sesion.asegurar()
+                except Exception as e:
+                    _sin_reconexion(conexion, lote, intentos, estado, cola, e)
+                    break
+                entrega = entregar_lote(smtp, lote, plantilla, estado['modo_lote'])
+                _registrar_entrega(conexion, sesion, lote, intentos, entrega, estado, cola)
+            finally:
+                cola.terminar()
+            _revisar_conexion(conexion, sesion, entrega)
+    finally:
+        conexion.reconexiones = sesion.reconexiones
+        sesion.cerrar()
+
+def _enviar_con_hilos(config, email_account, email_password, context, plantilla,
+                      destinatarios, status_callback, n_conexiones, tamanio_lote, campania, campania_id, control):
+    cola, estado, pool = _preparar_pool(destinatarios, tamanio_lote, n_conexiones, campania, campania_id, control)
+    hilos = [
+        threading.Thread(
+            target=_trabajador_envio,
+            args=(conexion, cola, estado, config, email_account, email_password, context,
+                  plantilla, status_callback),
+            daemon=True
+        )
+        for conexion in pool
+    ]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    return _terminar_pool(pool, cola, estado, destinatarios)
+
+def _resumir_pool(pool, cola, destinatarios):
+    for conexion in pool:
+        logging.info(f"Conexión #{conexion.numero}: {conexion.exitosos} exitosos, {conexion.fallidos} fallidos, "
+                     f"{conexion.reconexiones} reconexiones")
+    sin_enviar = cola.sin_enviar()
+    if sin_enviar:
+        # Quedan pendientes en la campaña: se pueden reanudar más tarde
+        logging.warning(f"{len(sin_enviar)} destinatario(s) quedaron sin enviar por falta de conexiones")
+
+    exitosos = sum(c.exitosos for c in pool)
+    # Lo que quedó en la cola (conexiones caídas) también cuenta como fallido
+    return exitosos, len(destinatarios) - exitosos
+
+MOTORES_ENVIO = ('hilos', 'asyncio')
+
+class ErrorEnvio(Exception):
+    # Falla que impide el envío completo; el mensaje ya fue informado por status_callback
+    pass
+
+class ResultadoEnvio:
+    def __init__(self, campania_id, exitosos, fallidos):
+        self.campania_id = campania_id
+        self.exitosos = exitosos
+        self.fallidos = fallidos
+
+    @property
+    def resumen(self):
+        return f"Envío finalizado. Exitosos: {self.exitosos} | Fallidos: {self.fallidos}"
+
+def _fallar(error_msg, status_callback):
+    logging.error(error_msg)
+    status_callback(error_msg)
+    return ErrorEnvio(error_msg)
+
+def enviar_masivo(email_account, email_password, subject, mensaje_auto, servidor, destinatarios, status_callback, is_html=False, conexiones=None, motor='hilos', lote_rcpt=None, campania_id=None):
+    if servidor not in EMAIL_CONFIG:
+        raise _fallar(f"Servidor '{servidor}' no configurado", status_callback)
+    if motor not in MOTORES_ENVIO:
+        raise _fallar(f"Motor de envío '{motor}' desconocido", status_callback)
+
+    config = EMAIL_CONFIG[servidor]
+    campania = None
+    try:
+        context = crear_contexto_ssl(servidor)
+
+        # Cada envío queda registrado como campaña para poder reanudarlo si se corta
+        campania = ColaCampania()
+        if campania_id is None:
+            campania_id = campania.crear(servidor, subject, mensaje_auto, is_html, destinatarios)
+        destinatarios = campania.pendientes(campania_id)
+        if not destinatarios:
+            status_callback(f"La campaña {campania_id} no tiene destinatarios pendientes")
+            return ResultadoEnvio(campania_id, 0, 0)
+
+        # Modo lote: varios RCPT TO por DATA, sin superar el límite del servidor
+        tamanio_lote = max(1, min(lote_rcpt or 1, config.get('max_rcpt', 1)))
+
+        # El mensaje se codifica (o compila, si tiene marcadores como {nombre}) una sola
+        # vez para toda la campaña; los datos de combinación salen de destinatarios.db
+        contactos = None
+        if marcadores_plantilla(subject, mensaje_auto):
+            from .destinatarios import obtener_registro_destinatarios
+            contactos = obtener_registro_destinatarios().contactos_por_email(destinatarios)
+        plantilla = compilar_plantilla(email_account, subject, mensaje_auto, is_html, contactos)
+        if plantilla.personalizada and tamanio_lote > 1:
+            # Cada destinatario recibe su propio texto: un DATA por destinatario
+            logging.info(f"Mensaje personalizado ({', '.join(sorted(plantilla.campos))}): se ignora lote_rcpt={tamanio_lote}")
+            tamanio_lote = 1
+
+        total = len(destinatarios)
+        # Cantidad de sesiones simultáneas: la pedida, o la que admite el servidor
+        n_lotes = -(-total // tamanio_lote)
+        n_conexiones = max(1, min(conexiones or config.get('max_conexiones', 1), n_lotes or 1))
+
+        status_callback(f"Conectando al servidor SMTP ({n_conexiones} conexiones, motor {motor})...")
+        if motor == 'asyncio':
+            exitosos, fallidos = asyncio.run(_enviar_con_asyncio(
+                config, email_account, email_password, context, plantilla,
+                destinatarios, status_callback, n_conexiones, tamanio_lote, campania, campania_id,
+                obtener_control_tasa(servidor)))
+        else:
+            exitosos, fallidos = _enviar_con_hilos(
+                config, email_account, email_password, context, plantilla,
+                destinatarios, status_callback, n_conexiones, tamanio_lote, campania, campania_id,
+                obtener_control_tasa(servidor))
+
+        resultado = ResultadoEnvio(campania_id, exitosos, fallidos)
+        logging.info(f"Campaña {campania_id}: {campania.resumen(campania_id)}")
+        status_callback(resultado.resumen)
+        return resultado
+    except smtplib.SMTPAuthenticationError as e:
+        raise _fallar("Error de autenticación SMTP. Verifica email y contraseña.", status_callback) from e
+    except Exception as e:
+        raise _fallar(f"Error en envío masivo: {e}", status_callback) from e
+    finally:
+        if campania is not None:
+            campania.cerrar()
+
+def reanudar_campania(email_account, email_password, campania_id, status_callback, conexiones=None, motor='hilos', lote_rcpt=None):
+    # Reenvía sólo lo que quedó pendiente de una campaña interrumpida
+    campania = ColaCampania()
+    try:
+        datos = campania.obtener(campania_id)
+    finally:
+        campania.cerrar()
+    if datos is None:
+        raise _fallar(f"Campaña '{campania_id}' no encontrada", status_callback)
+    logging.info(f"Reanudando campaña {campania_id}")
+    return enviar_masivo(email_account, email_password, datos['subject'], datos['mensaje'], datos['servidor'], [],
+                         status_callback, is_html=bool(datos['is_html']), conexiones=conexiones, motor=motor,
+                         lote_rcpt=lote_rcpt, campania_id=campania_id)
+
+async def entregar_lote_async(sesion, lote, plantilla, modo_lote):
+    datos = plantilla.renderizar_lote() if modo_lote else plantilla.renderizar(lote[0])
+    try:
+        rechazados = await sesion.enviar(plantilla.remitente, lote, datos)
+    except smtplib.SMTPRecipientsRefused as e:
+        rechazados = e.recipients
+    except Exception as e:
+        return _resultado_error(lote, e)
+    return _resultado_lote(lote, rechazados)
+
+async def _trabajador_envio_async(conexion, cola, estado, config, email_account, email_password, context,
+                                  plantilla, status_callback):
+    # Mismo recorrido que _trabajador_envio, con las llamadas de red en el event loop
+    sesion = SesionReconectableAsync(config, email_account, email_password, context)
+    try:
+        await sesion.asegurar()
+        logging.info(f"Conexión SMTP asíncrona #{conexion.numero} establecida para envío masivo")
+    except Exception as e:
+        _conexion_fallida(conexion, estado, e)
+        return
+
+    try:
+        while True:
+            item = await cola.tomar_async(timeout=INTERVALO_NOOP)
+            if item is None:
+                break
+            if item is ColaReintentos.ESPERANDO:
+                await sesion.mantener()
+                continue
+            lote, intentos = item
+            try:
+                _anunciar_lote(lote, estado, status_callback)
+                await estado['control'].esperar_async(len(lote))
+                try:
+                    smtp = await sesion.asegurar()
+                except Exception as e:
+                    _sin_reconexion(conexion, lote, intentos, estado, cola, e)
+                    break
+                entrega = await entregar_lote_async(smtp, lote, plantilla, estado['modo_lote'])
+                _registrar_entrega(conexion, sesion, lote, intentos, entrega, estado, cola)
+            finally:
+                cola.terminar()
+            _revisar_conexion(conexion, sesion, entrega)
+    finally:
+        conexion.reconexiones = sesion.reconexiones
+        await sesion.cerrar()
+
+async def _enviar_con_asyncio(config, email_account, email_password, context, plantilla,
+                              destinatarios, status_callback, n_conexiones, tamanio_lote, campania, campania_id, control):
+    # Todas las sesiones comparten un único hilo y event loop
+    cola, estado, pool = _preparar_pool(destinatarios, tamanio_lote, n_conexiones, campania, campania_id, control)
+    await asyncio.gather(*(
+        _trabajador_envio_async(conexion, cola, estado, config, email_account, email_password, context,
+                                plantilla, status_callback)
+        for conexion in pool
+    ))
+    return _terminar_pool(pool, cola, estado, destinatarios)
@@ -0,0 +1,78 @@
+import os
+import json
+import logging
+import threading
+
+from .configuracion import ENVIADOS_FILE, SINCRONIZACION_FILE
+from .respondidos import obtener_registro_respondidos
+from .destinatarios import obtener_registro_destinatarios
+from .bitacora import obtener_bitacora
+
+def paginar_respondidos(despues_de='', cantidad=100):
+    # Historial ordenado por dirección, de a una página por vez
+    try:
+        return obtener_registro_respondidos().pagina(despues_de, cantidad)
+    except Exception as e:
+        logging.error(f"Error cargando respondidos: {e}")
+        return []
+
+def guardar_respondido(email):
+    try:
+        obtener_registro_respondidos().agregar(email)
+        logging.info(f"Email {email} agregado al historial")
+    except Exception as e:
+        logging.error(f"Error guardando email respondido: {e}")
+
+def guardar_enviado(email):
+    # Sólo encola: la bitácora escribe enviados.txt de a tandas en su propio hilo
+    try:
+        obtener_bitacora(ENVIADOS_FILE).escribir(email)
+        logging.info(f"Email {email} agregado a enviados")
+    except Exception as e:
+        logging.error(f"Error guardando email enviado: {e}")
+
+def cargar_destinatarios_guardados():
+    try:
+        return obtener_registro_destinatarios().todos()
+    except Exception as e:
+        logging.error(f"Error cargando destinatarios guardados: {e}")
+    return []
+
+def guardar_destinatarios_guardados(lista):
+    # Reemplazo completo; los cambios puntuales van directo al registro (agregar, seleccionar, borrar)
+    try:
+        obtener_registro_destinatarios().reemplazar(lista)
+    except Exception as e:
+        logging.error(f"Error guardando destinatarios: {e}")
+
+def limpiar_respondidos():
+    obtener_registro_respondidos().limpiar()
+    logging.info("Historial limpiado")
+
+_sincronizacion_lock = threading.Lock()
+
+def cargar_sincronizacion():
+    # {"cuenta/carpeta": {"uidvalidity": int, "ultimo_uid": int, "modseq": int|None}}
+    try:
+        with open(SINCRONIZACION_FILE, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+            if isinstance(data, dict):
+                return data
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logging.error(f"Error cargando punto de sincronización: {e}")
+    return {}
+
+def guardar_sincronizacion(clave, datos):
+    # Escritura atómica: un corte a mitad de camino no deja el archivo a medias
+    try:
+        with _sincronizacion_lock:
+            todo = cargar_sincronizacion()
+            todo[clave] = datos
+            temporal = SINCRONIZACION_FILE + '.tmp'
+            with open(temporal, 'w', encoding='utf-8') as f:
+                json.dump(todo, f, indent=2)
+            os.replace(temporal, SINCRONIZACION_FILE)
+    except Exception as e:
+        logging.error(f"Error guardando punto de sincronización: {e}")
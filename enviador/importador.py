@@ -0,0 +1,197 @@
+import os
+import re
+import csv
+import logging
+from email import utils
+
+from .destinatarios import obtener_registro_destinatarios
+
+# Filas por transacción al volcar en destinatarios.db
+IMPORTAR_POR_TANDA = 1000
+# Cada cuántas filas se avisa el progreso
+AVISAR_CADA = 2000
+
+FORMATOS_IMPORTACION = ('.csv', '.xlsx', '.txt')
+
+# Encabezados reconocidos (sin distinguir mayúsculas, acentos ni espacios sobrantes)
+COLUMNAS_EMAIL = ('email', 'e-mail', 'mail', 'correo', 'correo electronico', 'direccion')
+COLUMNAS_NOMBRE = ('nombre', 'name', 'nombre completo', 'contacto')
+
+_EMAIL_VALIDO = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+class ErrorImportacion(Exception):
+    pass
+
+class ResultadoImportacion:
+    def __init__(self):
+        self.agregados = []   # contactos nuevos, como los devuelve el registro
+        self.rechazados = []  # [(fila, valor, motivo)]
+        self.filas = 0
+
+    @property
+    def resumen(self):
+        return (f"Filas leídas: {self.filas}\n"
+                f"Agregados: {len(self.agregados)}\n"
+                f"Rechazados: {len(self.rechazados)}")
+
+def _normalizar_encabezado(texto):
+    texto = str(texto or '').strip().lower()
+    for con, sin in (('á', 'a'), ('é', 'e'), ('í', 'i'), ('ó', 'o'), ('ú', 'u')):
+        texto = texto.replace(con, sin)
+    return ' '.join(texto.replace('_', ' ').split())
+
+def _mapear_encabezado(celdas):
+    # {"email": columna, "nombre": columna|None, "extras": {columna: nombre}} si la fila
+    # es un encabezado reconocible, o None si ya son datos
+    normalizadas = [_normalizar_encabezado(c) for c in celdas]
+    email = next((i for i, c in enumerate(normalizadas) if c in COLUMNAS_EMAIL), None)
+    if email is None:
+        return None
+    nombre = next((i for i, c in enumerate(normalizadas) if c in COLUMNAS_NOMBRE), None)
+    extras = {i: str(celdas[i]).strip() for i, c in enumerate(normalizadas) if c and i not in (email, nombre)}
+    return {'email': email, 'nombre': nombre, 'extras': extras}
+
+_MAPA_SIN_ENCABEZADO = {'email': 0, 'nombre': 1, 'extras': {}}
+
+def _lineas(f, contador):
+    # Decodifica línea por línea desde binario: lleva la cuenta de bytes leídos (progreso)
+    # y tolera archivos guardados por Excel en Windows (cp1252) además de UTF-8
+    for crudo in f:
+        contador[0] += len(crudo)
+        try:
+            yield crudo.decode('utf-8')
+        except UnicodeDecodeError:
+            yield crudo.decode('cp1252', errors='replace')
+
+def _filas_texto(ruta, contador):
+    # .txt: "email[,nombre]" por línea (como siempre) o "Nombre <email>"
+    with open(ruta, 'rb') as f:
+        for n, linea in enumerate(_lineas(f, contador), 1):
+            linea = linea.lstrip('\ufeff').strip()
+            if linea:
+                yield n, [p.strip() for p in linea.split(',', 1)], _MAPA_SIN_ENCABEZADO
+
+def _filas_csv(ruta, contador):
+    with open(ruta, 'rb') as f:
+        muestra = f.read(64 * 1024).decode('utf-8', errors='replace').lstrip('\ufeff')
+        f.seek(0)
+        try:
+            dialecto = csv.Sniffer().sniff(muestra, delimiters=',;\t|')
+        except csv.Error:
+            dialecto = csv.excel
+        mapa = None
+        for n, celdas in enumerate(csv.reader(_lineas(f, contador), dialecto), 1):
+            if n == 1 and celdas:
+                celdas[0] = celdas[0].lstrip('\ufeff')
+                mapa = _mapear_encabezado(celdas)
+                if mapa is not None:
+                    continue
+            if any(c.strip() for c in celdas):
+                yield n, celdas, mapa or _MAPA_SIN_ENCABEZADO
+
+def _filas_xlsx(ruta, contador):
+    # openpyxl es opcional: sólo hace falta para importar planillas de Excel
+    try:
+        import openpyxl
+    except ImportError:
+        raise ErrorImportacion("Para importar archivos .xlsx instalá openpyxl (pip install openpyxl).")
+    libro = openpyxl.load_workbook(ruta, read_only=True, data_only=True)
+    try:
+        hoja = libro.active
+        total = hoja.max_row or 0
+        mapa = None
+        for n, valores in enumerate(hoja.iter_rows(values_only=True), 1):
+            # En planillas el progreso se mide en filas sobre el total declarado
+            if total:
+                contador[0] = n * contador[1] // total
+            celdas = ['' if v is None else str(v) for v in valores]
+            if n == 1:
+                mapa = _mapear_encabezado(celdas)
+                if mapa is not None:
+                    continue
+            if any(c.strip() for c in celdas):
+                yield n, celdas, mapa or _MAPA_SIN_ENCABEZADO
+    finally:
+        libro.close()
+
+_LECTORES = {'.txt': _filas_texto, '.csv': _filas_csv, '.xlsx': _filas_xlsx}
+
+def _contacto(celdas, mapa):
+    def celda(i):
+        return celdas[i].strip() if i is not None and i < len(celdas) else ''
+    email, nombre = celda(mapa['email']), ''
+    if '<' in email:
+        # "Nombre <email>"
+        nombre, email = utils.parseaddr(email)
+    nombre = celda(mapa['nombre']) or nombre
+    campos = {clave: celda(i) for i, clave in mapa['extras'].items() if celda(i)}
+    return email.strip(), nombre, campos
+
+def importar_destinatarios(ruta, progreso=None, detener=None, registro=None, tanda=IMPORTAR_POR_TANDA, lista=None):
+    # Lee el archivo en streaming y agrega los contactos nuevos a destinatarios.db de a
+    # tandas (una transacción cada una). Las direcciones repetidas se detectan con el índice
+    # único del registro; las del mismo archivo, con un conjunto de lo ya leído.
+    # Con lista, todos los contactos válidos del archivo (nuevos o ya guardados) quedan
+    # además en esa lista con nombre, sin duplicar el contacto.
+    # progreso(fraccion, filas) se llama cada AVISAR_CADA filas y al terminar.
+    extension = os.path.splitext(ruta)[1].lower()
+    lector = _LECTORES.get(extension)
+    if lector is None:
+        raise ErrorImportacion(f"Formato no admitido: {extension or ruta} (se aceptan {', '.join(FORMATOS_IMPORTACION)})")
+    if registro is None:
+        registro = obtener_registro_destinatarios()
+    resultado = ResultadoImportacion()
+    contador = [0, max(os.path.getsize(ruta), 1)]  # [leído, total] en bytes
+    vistos = set()
+    pendientes = []
+
+    def volcar():
+        nuevos = registro.agregar_varios([(email, nombre, campos) for _, email, nombre, campos in pendientes])
+        agregados = {r['email'].lower() for r in nuevos}
+        for fila, email, _, _ in pendientes:
+            if email.lower() not in agregados:
+                motivo = f"ya estaba guardado; agregado a '{lista}'" if lista else 'ya estaba en la lista'
+                resultado.rechazados.append((fila, email, motivo))
+        resultado.agregados.extend(nuevos)
+        if lista:
+            ids = [r['id'] for r in nuevos]
+            if len(nuevos) < len(pendientes):
+                existentes = registro.ids_por_email([email for _, email, _, _ in pendientes if email.lower() not in agregados])
+                ids.extend(existentes.values())
+            registro.agregar_a_lista(lista, ids)
+        pendientes.clear()
+
+    for fila, celdas, mapa in lector(ruta, contador):
+        if detener is not None and detener.is_set():
+            logging.info(f"Importación de {ruta} cancelada en la fila {fila}")
+            break
+        resultado.filas += 1
+        email, nombre, campos = _contacto(celdas, mapa)
+        clave = email.lower()
+        if not email:
+            resultado.rechazados.append((fila, ','.join(celdas), 'sin email'))
+        elif not _EMAIL_VALIDO.match(email):
+            resultado.rechazados.append((fila, email, 'email inválido'))
+        elif clave in vistos:
+            resultado.rechazados.append((fila, email, 'repetido en el archivo'))
+        else:
+            vistos.add(clave)
+            pendientes.append((fila, email, nombre, campos))
+            if len(pendientes) >= tanda:
+                volcar()
+        if progreso and resultado.filas % AVISAR_CADA == 0:
+            progreso(min(contador[0] / contador[1], 1.0), resultado.filas)
+    if pendientes:
+        volcar()
+    if progreso:
+        progreso(1.0, resultado.filas)
+    logging.info(f"Importación de {ruta}: {resultado.filas} filas, {len(resultado.agregados)} agregados, "
+                 f"{len(resultado.rechazados)} rechazados")
+    return resultado
+
+def guardar_rechazos(resultado, ruta):
+    # Informe fila por fila de lo que no se importó (CSV, se abre con Excel)
+    with open(ruta, 'w', encoding='utf-8-sig', newline='') as f:
+        escritor = csv.writer(f)
+        escritor.writerow(['fila', 'valor', 'motivo'])
+        escritor.writerows(resultado.rechazados)
@@ -0,0 +1,226 @@
+import re
+import html
+import logging
+import time
+import binascii
+from email import utils
+from email.header import Header
+from email.mime.text import MIMEText
+
+from .busqueda import normalizar
+
+_EOLS_RE = re.compile(rb'\r\n|\r|\n')
+_PUNTO_INICIAL_RE = re.compile(rb'(?m)^\.')
+
+def _preparar_datos(mensaje):
+    # Normaliza a CRLF y duplica los puntos iniciales (RFC 5321, 4.5.2) para DATA
+    if isinstance(mensaje, str):
+        mensaje = mensaje.encode('ascii')
+    datos = _PUNTO_INICIAL_RE.sub(b'..', _EOLS_RE.sub(b'\r\n', mensaje))
+    if not datos.endswith(b'\r\n'):
+        datos += b'\r\n'
+    return datos
+
+_fecha_cache = (None, '')
+
+def _fecha_actual():
+    # formatdate() por segundo, no por mensaje
+    global _fecha_cache
+    segundo = int(time.time())
+    if _fecha_cache[0] != segundo:
+        _fecha_cache = (segundo, utils.formatdate(segundo, localtime=True))
+    return _fecha_cache[1]
+
+def _linea_encabezado(nombre, valor):
+    valor = valor.replace('\r', ' ').replace('\n', ' ')
+    if not valor.isascii():
+        # Header pliega las líneas largas; en DATA el pliegue tiene que ser CRLF
+        valor = Header(valor, 'utf-8').encode(linesep='\r\n')
+    return f"{nombre}: {valor}\r\n".encode('ascii')
+
+def _linea_asunto(valor):
+    # Subject combinado por destinatario: RFC 2047 (base64) armado a mano en palabras de
+    # hasta 45 bytes sin partir caracteres; Header().encode() es mucho más lento
+    valor = valor.replace('\r', ' ').replace('\n', ' ')
+    if valor.isascii():
+        return f"Subject: {valor}\r\n".encode('ascii')
+    datos = valor.encode('utf-8')
+    palabras = []
+    desde = 0
+    while desde < len(datos):
+        hasta = min(desde + 45, len(datos))
+        while hasta < len(datos) and datos[hasta] & 0xC0 == 0x80:
+            hasta -= 1
+        palabras.append(b'=?utf-8?b?' + binascii.b2a_base64(datos[desde:hasta], newline=False) + b'?=')
+        desde = hasta
+    return b'Subject: ' + b'\r\n '.join(palabras) + b'\r\n'
+
+class PlantillaMensaje:
+    # Cuerpo y encabezados fijos se codifican y preparan para DATA una sola vez por
+    # campaña; por destinatario sólo se anteponen To, Date y Message-ID.
+    personalizada = False
+
+    def __init__(self, email_account, subject, mensaje_auto, is_html=False):
+        subtype = 'html' if is_html else 'plain'
+        mensaje = MIMEText(mensaje_auto, subtype, 'utf-8')
+        mensaje['Subject'] = subject
+        mensaje['From'] = email_account
+        self.remitente = email_account
+        self.subject = subject
+        self.mensaje_auto = mensaje_auto
+        self.dominio = email_account.rpartition('@')[2] or None
+        self.datos_fijos = _preparar_datos(mensaje.as_bytes())
+
+    def renderizar(self, destinatario):
+        return b''.join((
+            _linea_encabezado('To', destinatario),
+            _linea_encabezado('Date', _fecha_actual()),
+            _linea_encabezado('Message-ID', utils.make_msgid(domain=self.dominio)),
+            self.datos_fijos
+        ))
+
+    def renderizar_lote(self):
+        # Envío con semántica Bcc: los destinatarios sólo viajan en el sobre (RCPT TO)
+        return self.renderizar('undisclosed-recipients:;')
+
+# Marcadores de combinación: {nombre}, {email}, {Ciudad} (columna importada) o, con un
+# valor para cuando el contacto no lo tiene, {nombre|cliente}
+_MARCADOR_RE = re.compile(r'\{\s*([^{}|\s][^{}|]*?)\s*(?:\|([^{}]*))?\}')
+
+# Campos que tienen todos los contactos; el resto sale de sus columnas importadas
+CAMPOS_BASICOS = ('nombre', 'email')
+
+def clave_campo(nombre):
+    # "Razón  Social" y "razon social" son el mismo campo
+    return ' '.join(normalizar(nombre).split())
+
+def marcadores_plantilla(*textos):
+    # Claves de los marcadores que aparecen en los textos (asunto, mensaje)
+    return {clave_campo(m.group(1)) for texto in textos for m in _MARCADOR_RE.finditer(texto or '')}
+
+_PUNTO_QP_RE = re.compile(rb'(?m)^\.')
+
+def _segmento_qp(datos):
+    # Quoted-printable de un trozo del cuerpo, terminado en salto suave ("=\r\n"): el
+    # trozo siguiente empieza en línea nueva, así cada trozo se codifica por separado y
+    # ninguna línea pasa de 76 caracteres. Un punto al principio de línea va como =2E,
+    # sin duplicarlo para DATA.
+    if not datos:
+        return b''
+    codificado = binascii.b2a_qp(datos.replace(b'\r\n', b'\n'), istext=True)
+    return _PUNTO_QP_RE.sub(b'=2E', codificado).replace(b'\n', b'\r\n') + b'=\r\n'
+
+def _sin_codificar(datos):
+    return datos
+
+class _TextoCompilado:
+    # Texto partido una sola vez en partes fijas y huecos para los campos; las partes
+    # quedan en UTF-8 y ya pasadas por codificar (la del cuerpo del mensaje), así
+    # combinar sólo codifica los valores del destinatario y une bytes. Los marcadores
+    # que no son campos conocidos se dejan tal cual (un texto con llaves sigue igual).
+    def __init__(self, texto, campos_conocidos, escapar=False, codificar=_sin_codificar):
+        self.partes = []
+        self.huecos = []  # (posición en partes, clave, valor por defecto ya codificado)
+        self.desconocidos = set()
+        self.escapar = escapar
+        self.codificar = codificar
+        desde = 0
+        for m in _MARCADOR_RE.finditer(texto):
+            clave = clave_campo(m.group(1))
+            if clave not in campos_conocidos:
+                self.desconocidos.add(m.group(1))
+                continue
+            self.partes.append(codificar(texto[desde:m.start()].encode('utf-8')))
+            self.huecos.append((len(self.partes), clave, codificar((m.group(2) or '').strip().encode('utf-8'))))
+            self.partes.append(b'')
+            desde = m.end()
+        self.partes.append(codificar(texto[desde:].encode('utf-8')))
+
+    def combinar(self, valores):
+        if not self.huecos:
+            return self.partes[0]
+        partes = self.partes.copy()
+        for posicion, clave, defecto in self.huecos:
+            valor = valores.get(clave)
+            if valor:
+                partes[posicion] = self.codificar((html.escape(valor) if self.escapar else valor).encode('utf-8'))
+            else:
+                partes[posicion] = defecto
+        return b''.join(partes)
+
+class PlantillaPersonalizada:
+    # Mensaje con marcadores en el asunto y/o el cuerpo. Se compila una vez por campaña:
+    # los encabezados fijos quedan listos para DATA y las partes fijas del cuerpo, ya en
+    # quoted-printable. Por destinatario sólo se codifican sus valores (escapados si el
+    # mensaje es HTML) y se intercalan, sin armar un objeto MIME por mensaje.
+    # contactos: {email en minúsculas: {"nombre", "campos"}} (ver RegistroDestinatarios);
+    # un destinatario que no está sólo aporta su email.
+    personalizada = True
+
+    def __init__(self, email_account, subject, mensaje_auto, contactos, is_html=False):
+        self.remitente = email_account
+        self.subject = subject
+        self.mensaje_auto = mensaje_auto
+        self.dominio = email_account.rpartition('@')[2] or None
+        self.contactos = contactos
+        self._claves = {}
+        conocidos = set(CAMPOS_BASICOS)
+        for contacto in contactos.values():
+            conocidos.update(self._clave(k) for k in contacto['campos'])
+        self.asunto = _TextoCompilado(subject, conocidos)
+        self.cuerpo = _TextoCompilado(mensaje_auto, conocidos, escapar=is_html, codificar=_segmento_qp)
+        for desconocido in sorted(self.asunto.desconocidos | self.cuerpo.desconocidos):
+            logging.warning(f"El marcador {{{desconocido}}} no coincide con ningún campo de los destinatarios; se envía tal cual")
+        fijos = [
+            _linea_encabezado('Content-Type', f'text/{"html" if is_html else "plain"}; charset="utf-8"'),
+            _linea_encabezado('MIME-Version', '1.0'),
+            _linea_encabezado('Content-Transfer-Encoding', 'quoted-printable'),
+        ]
+        if not self.asunto.huecos:
+            fijos.append(_linea_encabezado('Subject', subject))
+        fijos.append(_linea_encabezado('From', email_account))
+        self.encabezados_fijos = b''.join(fijos) + b'\r\n'
+
+    @property
+    def campos(self):
+        return {clave for _, clave, _ in self.asunto.huecos + self.cuerpo.huecos}
+
+    def _clave(self, nombre):
+        clave = self._claves.get(nombre)
+        if clave is None:
+            clave = self._claves[nombre] = clave_campo(nombre)
+        return clave
+
+    def valores(self, destinatario):
+        contacto = self.contactos.get(destinatario.lower())
+        if contacto is None:
+            return {'email': destinatario}
+        valores = {self._clave(k): v for k, v in contacto['campos'].items()}
+        valores['nombre'] = contacto['nombre']
+        valores['email'] = destinatario
+        return valores
+
+    def renderizar(self, destinatario):
+        valores = self.valores(destinatario)
+        partes = [
+            _linea_encabezado('To', destinatario),
+            _linea_encabezado('Date', _fecha_actual()),
+            _linea_encabezado('Message-ID', utils.make_msgid(domain=self.dominio)),
+        ]
+        if self.asunto.huecos:
+            partes.append(_linea_asunto(self.asunto.combinar(valores).decode('utf-8')))
+        partes.append(self.encabezados_fijos)
+        partes.append(self.cuerpo.combinar(valores))
+        return b''.join(partes)
+
+    def renderizar_lote(self):
+        raise ValueError("Un mensaje personalizado no puede enviarse en lote (un DATA por destinatario)")
+
+def compilar_plantilla(email_account, subject, mensaje_auto, is_html=False, contactos=None):
+    # Con marcadores que coinciden con campos de los contactos, una plantilla
+    # personalizada; si no, la de siempre (idéntica para todos)
+    if contactos is not None and marcadores_plantilla(subject, mensaje_auto):
+        plantilla = PlantillaPersonalizada(email_account, subject, mensaje_auto, contactos, is_html)
+        if plantilla.campos:
+            return plantilla
+    return PlantillaMensaje(email_account, subject, mensaje_auto, is_html)
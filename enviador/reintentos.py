@@ -0,0 +1,107 @@
+import time
+import heapq
+import random
+import asyncio
+import smtplib
+import threading
+
+MAX_REINTENTOS = 5
+REINTENTO_BASE = 10
+REINTENTO_MAXIMO = 300
+
+def clasificar_error(e):
+    # 'transitorio' (4xx), 'permanente' (5xx u otro error del mensaje) o 'conexion' (sesión caída)
+    if isinstance(e, smtplib.SMTPServerDisconnected):
+        return 'conexion'
+    if isinstance(e, smtplib.SMTPResponseException):
+        if e.smtp_code == 421:
+            return 'conexion'
+        return 'transitorio' if 400 <= e.smtp_code < 500 else 'permanente'
+    if isinstance(e, (OSError, asyncio.TimeoutError)):
+        return 'conexion'
+    return 'permanente'
+
+def demora_reintento(intentos):
+    # Backoff exponencial con jitter para que los reintentos no lleguen todos juntos
+    return min(REINTENTO_MAXIMO, REINTENTO_BASE * 2 ** intentos) * random.uniform(0.5, 1.5)
+
+class Entrega:
+    # Resultado de un DATA: quién quedó aceptado, qué se reintenta y qué rebotó
+    __slots__ = ('aceptados', 'reintentar', 'rechazados', 'limite', 'error_conexion')
+
+    def __init__(self, aceptados=(), reintentar=(), rechazados=None, limite=False, error_conexion=None):
+        self.aceptados = list(aceptados)
+        self.reintentar = list(reintentar)
+        self.rechazados = rechazados or {}
+        self.limite = limite
+        self.error_conexion = error_conexion
+
+class ColaReintentos:
+    # Lotes listos para enviar ordenados por momento de disponibilidad. Los reintentos
+    # se programan a futuro y el resto de la campaña sigue fluyendo mientras tanto.
+    # La cola termina cuando no queda nada programado ni en curso.
+    ESPERANDO = object()
+
+    def __init__(self, lotes):
+        self._heap = [(0.0, n, lote, 0) for n, lote in enumerate(lotes)]
+        heapq.heapify(self._heap)
+        self._secuencia = len(self._heap)
+        self._en_curso = 0
+        self._cond = threading.Condition()
+
+    def _tomar(self):
+        # (lote, intentos) si hay algo listo; si no, (None, segundos a esperar o None si terminó)
+        if self._heap:
+            espera = self._heap[0][0] - time.monotonic()
+            if espera <= 0:
+                _, _, lote, intentos = heapq.heappop(self._heap)
+                self._en_curso += 1
+                return (lote, intentos), 0
+            return None, espera
+        if self._en_curso:
+            return None, 1.0
+        return None, None
+
+    def tomar(self, timeout=None):
+        # Con timeout devuelve ESPERANDO si no hubo nada que hacer en ese lapso
+        limite = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                item, espera = self._tomar()
+                if item is not None or espera is None:
+                    return item
+                if limite is not None:
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        return self.ESPERANDO
+                    espera = min(espera, restante)
+                self._cond.wait(espera)
+
+    async def tomar_async(self, timeout=None):
+        limite = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._cond:
+                item, espera = self._tomar()
+            if item is not None or espera is None:
+                return item
+            if limite is not None:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    return self.ESPERANDO
+                espera = min(espera, restante)
+            await asyncio.sleep(min(espera, 1.0))
+
+    def programar(self, lote, intentos, demora=0):
+        with self._cond:
+            heapq.heappush(self._heap, (time.monotonic() + demora, self._secuencia, lote, intentos))
+            self._secuencia += 1
+            self._cond.notify_all()
+
+    def terminar(self):
+        with self._cond:
+            self._en_curso -= 1
+            self._cond.notify_all()
+
+    def sin_enviar(self):
+        with self._cond:
+            return [d for _, _, lote, _ in self._heap for d in lote]
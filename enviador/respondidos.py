@@ -0,0 +1,175 @@
+import os
+import time
+import logging
+import sqlite3
+import threading
+import collections
+
+from .configuracion import RESPONDIDOS_DB, RESPONDIDOS_FILE
+from .bitacora import obtener_bitacora
+
+# Direcciones consultadas recientemente que se recuerdan en memoria (LRU)
+CACHE_RESPONDIDOS = 10000
+# Con ventana de supresión, las respuestas vencidas se borran a lo sumo una vez por hora
+PURGA_CADA = 3600
+
+class RegistroRespondidos:
+    # Remitentes ya respondidos, indexados en SQLite por dirección: la pertenencia es
+    # una búsqueda por clave primaria, las altas son incrementales y el historial se
+    # recorre por páginas, así nada crece en memoria ni se relee entero por ciclo.
+    # respondidos.txt sigue como bitácora legible; se importa una sola vez al crear la base.
+    # La ventana de supresión va en cada consulta (respondido(email, dias)), porque varios
+    # respondedores con ventanas distintas pueden compartir el registro; cada uno declara
+    # la suya con usar_ventana y la purga sólo borra lo vencido para la más larga.
+    def __init__(self, ruta=RESPONDIDOS_DB, bitacora=RESPONDIDOS_FILE, capacidad_cache=CACHE_RESPONDIDOS):
+        self.bitacora = bitacora
+        self.capacidad_cache = capacidad_cache
+        self._cache = collections.OrderedDict()  # email -> fecha de la última respuesta (0: nunca)
+        self._ultima_purga = 0.0
+        self._ventanas = collections.Counter()  # segundos (None: permanente) -> respondedores que la usan
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(ruta, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS respondidos (
+                email TEXT PRIMARY KEY,
+                fecha REAL NOT NULL
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS respondidos_fecha ON respondidos (fecha);
+            CREATE TABLE IF NOT EXISTS meta (
+                clave TEXT PRIMARY KEY,
+                valor TEXT
+            );
+        """)
+        self.conn.commit()
+        self._importar_bitacora()
+
+    def usar_ventana(self, dias):
+        # Un respondedor empieza a consultar con esa ventana (None: supresión permanente).
+        # No se purga acá: otro respondedor del mismo registro puede declarar una más larga
+        # enseguida; la próxima respuesta registrada purga con todas las ventanas a la vista
+        with self._lock:
+            self._ventanas[dias * 86400 if dias else None] += 1
+            self._ultima_purga = 0.0
+
+    def soltar_ventana(self, dias):
+        with self._lock:
+            ventana = dias * 86400 if dias else None
+            self._ventanas[ventana] -= 1
+            if self._ventanas[ventana] <= 0:
+                del self._ventanas[ventana]
+
+    def _ventana_purga(self):
+        # La más larga en uso; con alguna permanente (o ninguna declarada) no vence nada
+        if not self._ventanas or None in self._ventanas:
+            return None
+        return max(self._ventanas)
+
+    def _importar_bitacora(self):
+        with self._lock, self.conn:
+            if self.conn.execute("SELECT 1 FROM meta WHERE clave = 'bitacora_importada'").fetchone():
+                return
+            importados = 0
+            if os.path.exists(self.bitacora):
+                ahora = time.time()
+                with open(self.bitacora, 'r', encoding='utf-8') as f:
+                    filas = ((linea.strip().lower(), ahora) for linea in f if linea.strip())
+                    importados = self.conn.executemany(
+                        "INSERT OR IGNORE INTO respondidos (email, fecha) VALUES (?, ?)", filas
+                    ).rowcount
+            self.conn.execute("INSERT INTO meta (clave, valor) VALUES ('bitacora_importada', ?)", (str(time.time()),))
+        if importados:
+            logging.info(f"Importados {importados} respondidos desde {self.bitacora}")
+
+    def _recordar(self, email, fecha):
+        with self._lock:
+            self._cache[email] = fecha
+            self._cache.move_to_end(email)
+            if len(self._cache) > self.capacidad_cache:
+                self._cache.popitem(last=False)
+
+    def ultima_respuesta(self, email):
+        # Fecha (epoch) de la última respuesta a la dirección, o 0 si nunca se le respondió
+        email = email.lower()
+        with self._lock:
+            if email in self._cache:
+                self._cache.move_to_end(email)
+                return self._cache[email]
+        fila = self.conn.execute(
+            "SELECT fecha FROM respondidos WHERE email = ?", (email,)
+        ).fetchone()
+        fecha = fila[0] if fila else 0.0
+        self._recordar(email, fecha)
+        return fecha
+
+    def respondido(self, email, dias=None):
+        # Si ya se le respondió dentro de los últimos dias (None: alguna vez)
+        fecha = self.ultima_respuesta(email)
+        if not fecha:
+            return False
+        return not dias or time.time() - fecha < dias * 86400
+
+    def __contains__(self, email):
+        return self.respondido(email)
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM respondidos").fetchone()[0]
+
+    def agregar(self, email):
+        # Registra una respuesta; si la dirección ya estaba, renueva su fecha
+        email = email.lower()
+        ahora = time.time()
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO respondidos (email, fecha) VALUES (?, ?) "
+                "ON CONFLICT (email) DO UPDATE SET fecha = excluded.fecha",
+                (email, ahora)
+            )
+        self._recordar(email, ahora)
+        obtener_bitacora(self.bitacora).escribir(email)
+        if ahora - self._ultima_purga > PURGA_CADA:
+            self.purgar()
+
+    def purgar(self):
+        # Borra las respuestas fuera de todas las ventanas en uso; sin ventana no vence ninguna
+        with self._lock:
+            ventana = self._ventana_purga()
+        if ventana is None:
+            return 0
+        limite = time.time() - ventana
+        with self._lock, self.conn:
+            borrados = self.conn.execute("DELETE FROM respondidos WHERE fecha <= ?", (limite,)).rowcount
+            for email in [e for e, fecha in self._cache.items() if 0 < fecha <= limite]:
+                del self._cache[email]
+            self._ultima_purga = time.time()
+        if borrados:
+            logging.info(f"Supresión vencida para {borrados} remitente(s)")
+        return borrados
+
+    def pagina(self, despues_de='', cantidad=100):
+        # Paginado por clave (WHERE email > último visto): cada página cuesta lo mismo
+        return [fila[0] for fila in self.conn.execute(
+            "SELECT email FROM respondidos WHERE email > ? ORDER BY email LIMIT ?",
+            (despues_de, cantidad)
+        )]
+
+    def limpiar(self):
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM respondidos")
+            self._cache.clear()
+        obtener_bitacora(self.bitacora).truncar()
+
+    def cerrar(self):
+        with self._lock:
+            self.conn.close()
+
+_registros = {}
+_registros_lock = threading.Lock()
+
+def obtener_registro_respondidos(ruta=RESPONDIDOS_DB, bitacora=RESPONDIDOS_FILE):
+    # Uno por base y por proceso: se abre una vez y lo comparten la interfaz y el motor
+    with _registros_lock:
+        if ruta not in _registros:
+            _registros[ruta] = RegistroRespondidos(ruta, bitacora)
+        return _registros[ruta]
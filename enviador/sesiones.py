@@ -0,0 +1,155 @@
+import ssl
+import time
+import logging
+import smtplib
+
+def enviar_datos(smtp_conn, remitente, destinatarios, datos):
+    # Equivalente a smtp_conn.sendmail() para datos ya preparados: smtplib no vuelve
+    # a normalizar ni a recorrer el cuerpo completo en cada envío
+    smtp_conn.ehlo_or_helo_if_needed()
+    code, resp = smtp_conn.mail(remitente)
+    if code != 250:
+        _rset_silencioso(smtp_conn)
+        raise smtplib.SMTPSenderRefused(code, resp, remitente)
+    rechazados = {}
+    for destinatario in destinatarios:
+        code, resp = smtp_conn.rcpt(destinatario)
+        if code not in (250, 251):
+            rechazados[destinatario] = (code, resp)
+    if len(rechazados) == len(destinatarios):
+        _rset_silencioso(smtp_conn)
+        raise smtplib.SMTPRecipientsRefused(rechazados)
+    smtp_conn.putcmd("data")
+    code, resp = smtp_conn.getreply()
+    if code != 354:
+        _rset_silencioso(smtp_conn)
+        raise smtplib.SMTPDataError(code, resp)
+    smtp_conn.send(datos + b'.\r\n')
+    code, resp = smtp_conn.getreply()
+    if code != 250:
+        _rset_silencioso(smtp_conn)
+        raise smtplib.SMTPDataError(code, resp)
+    return rechazados
+
+def _rset_silencioso(smtp_conn):
+    try:
+        smtp_conn.rset()
+    except smtplib.SMTPServerDisconnected:
+        pass
+
+def crear_contexto_ssl(servidor):
+    context = ssl.create_default_context()
+    if servidor == 'migusto':
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+    return context
+
+def conectar_smtp(config, email_account, email_password, context):
+    if config['smtp_port'] == 587:
+        smtp = smtplib.SMTP(config['smtp_server'], config['smtp_port'])
+        smtp.starttls(context=context)
+    else:
+        smtp = smtplib.SMTP_SSL(config['smtp_server'], config['smtp_port'], context=context)
+    smtp.login(email_account, email_password)
+    return smtp
+
+# Una sesión inactiva más de este tiempo se verifica con NOOP antes de usarla
+INTERVALO_NOOP = 30
+MAX_RECONEXIONES = 3
+
+class PoliticaSesion:
+    # Estado y reglas de una sesión SMTP reconectable, sin E/S: cuándo rotarla (tras
+    # max_por_conexion mensajes), cuándo verificarla con NOOP (inactiva más de
+    # INTERVALO_NOOP), cuánto esperar entre reintentos de conexión y los contadores.
+    # SesionReconectable (smtplib) y SesionReconectableAsync (asyncio) la extienden con
+    # sus propias llamadas de red; ninguna hereda E/S de la otra.
+    def __init__(self, config, email_account, email_password, context):
+        self.config = config
+        self.email_account = email_account
+        self.email_password = email_password
+        self.context = context
+        self.max_por_conexion = config.get('max_por_conexion')
+        self.smtp = None
+        self.enviados = 0
+        self.ultimo_uso = 0.0
+        self.reconexiones = 0
+
+    def debe_rotar(self):
+        return self.smtp is not None and bool(self.max_por_conexion) and self.enviados >= self.max_por_conexion
+
+    def debe_verificar(self):
+        return self.smtp is not None and time.monotonic() - self.ultimo_uso > INTERVALO_NOOP
+
+    def _conectada(self, smtp):
+        # La primera conexión no cuenta como reconexión
+        if self.ultimo_uso != 0.0:
+            self.reconexiones += 1
+        self.smtp = smtp
+        self.enviados = 0
+        self.ultimo_uso = time.monotonic()
+
+    def _espera_reintento(self, intento, error):
+        logging.warning(f"Reconexión SMTP fallida (intento {intento + 1}/{MAX_RECONEXIONES}): {error}")
+        return 2 ** intento
+
+    def _verificada(self, code):
+        if code != 250:
+            raise smtplib.SMTPServerDisconnected(f"NOOP respondió {code}")
+        self.ultimo_uso = time.monotonic()
+
+    def registrar_uso(self):
+        self.enviados += 1
+        self.ultimo_uso = time.monotonic()
+
+class SesionReconectable(PoliticaSesion):
+    # Sesión SMTP autenticada que se rearma sola: verifica con NOOP si estuvo inactiva,
+    # se rota tras max_por_conexion mensajes y se reconecta (con el mismo contexto SSL)
+    # si el servidor la cortó.
+    def _conectar(self):
+        ultimo_error = None
+        for intento in range(MAX_RECONEXIONES):
+            try:
+                self._conectada(conectar_smtp(self.config, self.email_account, self.email_password, self.context))
+                return
+            except smtplib.SMTPAuthenticationError:
+                raise
+            except Exception as e:
+                ultimo_error = e
+                time.sleep(self._espera_reintento(intento, e))
+        raise ultimo_error
+
+    def asegurar(self):
+        if self.debe_rotar():
+            logging.info(f"Rotando sesión SMTP tras {self.enviados} mensajes")
+            self.cerrar()
+        if self.debe_verificar():
+            self.mantener()
+        if self.smtp is None:
+            self._conectar()
+        return self.smtp
+
+    def mantener(self):
+        # NOOP de salud sobre una sesión ociosa; si no responde se descarta
+        if self.smtp is None:
+            return
+        try:
+            self._verificada(self.smtp.noop()[0])
+        except Exception as e:
+            logging.info(f"Sesión SMTP inactiva descartada: {e}")
+            self.descartar()
+
+    def descartar(self):
+        if self.smtp is not None:
+            try:
+                self.smtp.close()
+            except Exception:
+                pass
+        self.smtp = None
+
+    def cerrar(self):
+        if self.smtp is not None:
+            try:
+                self.smtp.quit()
+            except Exception:
+                pass
+        self.descartar()
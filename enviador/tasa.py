@@ -0,0 +1,89 @@
+import time
+import asyncio
+import logging
+import threading
+import collections
+
+from .configuracion import EMAIL_CONFIG
+
+# Respuestas con las que el servidor pide bajar el ritmo: no son fallas del destinatario
+CODIGOS_LIMITE = (421, 450, 451)
+
+class ControlTasa:
+    # Token bucket (implementado como GCRA) con cupo por hora y ajuste AIMD: cada
+    # envío aceptado sube la tasa de a poco y cada respuesta de límite la reduce a
+    # la mitad y pausa los envíos, hasta encontrar el ritmo que tolera el servidor.
+    def __init__(self, max_por_segundo, max_por_hora=None, rafaga=1, minimo_por_segundo=0.1,
+                 incremento=0.05, factor=0.5, reloj=time.monotonic):
+        self.tasa_maxima = max_por_segundo
+        self.tasa = max_por_segundo
+        self.max_por_hora = max_por_hora
+        self.rafaga = max(1, rafaga)
+        self.minimo_por_segundo = minimo_por_segundo
+        self.incremento = incremento
+        self.factor = factor
+        self._reloj = reloj
+        self._lock = threading.Lock()
+        self._tat = 0.0
+        self._pausa_hasta = 0.0
+        self._limites_seguidos = 0
+        self._ultima_hora = collections.deque()
+
+    def reservar(self, destinatarios=1):
+        # Reserva un turno de envío y devuelve cuántos segundos hay que esperar antes de usarlo
+        with self._lock:
+            ahora = self._reloj()
+            inicio = max(ahora, self._pausa_hasta)
+            if self.tasa:
+                intervalo = 1.0 / self.tasa
+                tat = max(self._tat, inicio)
+                inicio = max(inicio, tat - (self.rafaga - 1) * intervalo)
+                self._tat = tat + intervalo
+            if self.max_por_hora:
+                while self._ultima_hora and self._ultima_hora[0] <= inicio - 3600:
+                    self._ultima_hora.popleft()
+                exceso = len(self._ultima_hora) + destinatarios - self.max_por_hora
+                if exceso > 0 and self._ultima_hora:
+                    inicio = max(inicio, self._ultima_hora[min(exceso, len(self._ultima_hora)) - 1] + 3600)
+                self._ultima_hora.extend([inicio] * destinatarios)
+            return inicio - ahora
+
+    def esperar(self, destinatarios=1):
+        espera = self.reservar(destinatarios)
+        if espera > 0:
+            time.sleep(espera)
+
+    async def esperar_async(self, destinatarios=1):
+        espera = self.reservar(destinatarios)
+        if espera > 0:
+            await asyncio.sleep(espera)
+
+    def exito(self):
+        with self._lock:
+            self._limites_seguidos = 0
+            if self.tasa and self.tasa < self.tasa_maxima:
+                self.tasa = min(self.tasa_maxima, self.tasa + self.incremento)
+
+    def limite(self):
+        with self._lock:
+            self._limites_seguidos += 1
+            if self.tasa:
+                self.tasa = max(self.minimo_por_segundo, self.tasa * self.factor)
+            pausa = min(60, 2 ** self._limites_seguidos)
+            self._pausa_hasta = max(self._pausa_hasta, self._reloj() + pausa)
+            logging.warning(f"El servidor pidió bajar el ritmo: {self.tasa or 'sin límite'} msg/s, pausa de {pausa}s")
+
+_controles_tasa = {}
+_controles_tasa_lock = threading.Lock()
+
+def obtener_control_tasa(servidor):
+    # Uno por servidor y por proceso, así el cupo por hora se respeta entre envíos
+    with _controles_tasa_lock:
+        if servidor not in _controles_tasa:
+            config = EMAIL_CONFIG[servidor]
+            _controles_tasa[servidor] = ControlTasa(
+                config.get('max_por_segundo'),
+                max_por_hora=config.get('max_por_hora'),
+                rafaga=config.get('rafaga', 1)
+            )
+        return _controles_tasa[servidor]
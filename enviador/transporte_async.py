@@ -0,0 +1,201 @@
+import base64
+import socket
+import asyncio
+import logging
+import smtplib
+
+from .sesiones import PoliticaSesion, MAX_RECONEXIONES
+
+_nombre_local_cache = None
+
+def _nombre_local():
+    # socket.getfqdn() puede tardar (DNS): resolverlo una sola vez por proceso
+    global _nombre_local_cache
+    if _nombre_local_cache is None:
+        _nombre_local_cache = socket.getfqdn()
+    return _nombre_local_cache
+
+class SesionSMTPAsync:
+    # Cliente SMTP mínimo sobre asyncio: connect, STARTTLS/TLS implícito, AUTH y DATA
+    def __init__(self, host, port, context, timeout=60):
+        self.host = host
+        self.port = port
+        self.context = context
+        self.timeout = timeout
+        self.reader = None
+        self.writer = None
+        self.extensiones = {}
+        self.nombre_local = _nombre_local()
+
+    async def _leer_respuesta(self):
+        lineas = []
+        while True:
+            linea = await asyncio.wait_for(self.reader.readline(), self.timeout)
+            if not linea:
+                raise smtplib.SMTPServerDisconnected("Conexión cerrada por el servidor")
+            lineas.append(linea[4:].strip())
+            if linea[3:4] != b'-':
+                break
+        try:
+            code = int(linea[:3])
+        except ValueError:
+            code = -1
+        return code, b'\n'.join(lineas)
+
+    async def comando(self, linea):
+        self.writer.write(linea.encode('ascii') + b'\r\n')
+        await self.writer.drain()
+        return await self._leer_respuesta()
+
+    async def _ehlo(self):
+        code, resp = await self.comando(f"EHLO {self.nombre_local}")
+        if code != 250:
+            raise smtplib.SMTPHeloError(code, resp)
+        self.extensiones = {}
+        for linea in resp.decode('latin-1').split('\n')[1:]:
+            partes = linea.split(None, 1)
+            if partes:
+                self.extensiones[partes[0].lower()] = partes[1] if len(partes) > 1 else ''
+
+    async def conectar(self):
+        tls_implicito = self.port != 587
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(
+                self.host, self.port,
+                ssl=self.context if tls_implicito else None,
+                server_hostname=self.host if tls_implicito else None
+            ),
+            self.timeout
+        )
+        code, resp = await self._leer_respuesta()
+        if code != 220:
+            raise smtplib.SMTPConnectError(code, resp)
+        await self._ehlo()
+        if not tls_implicito:
+            code, resp = await self.comando("STARTTLS")
+            if code != 220:
+                raise smtplib.SMTPNotSupportedError("El servidor no acepta STARTTLS")
+            await self.writer.start_tls(self.context, server_hostname=self.host)
+            await self._ehlo()
+
+    async def login(self, usuario, password):
+        mecanismos = self.extensiones.get('auth', '').upper().split()
+        if 'PLAIN' in mecanismos or not mecanismos:
+            token = base64.b64encode(f"\0{usuario}\0{password}".encode('utf-8')).decode('ascii')
+            code, resp = await self.comando(f"AUTH PLAIN {token}")
+        else:
+            code, resp = await self.comando("AUTH LOGIN")
+            if code == 334:
+                code, resp = await self.comando(base64.b64encode(usuario.encode('utf-8')).decode('ascii'))
+            if code == 334:
+                code, resp = await self.comando(base64.b64encode(password.encode('utf-8')).decode('ascii'))
+        # Sólo 235 es un login válido (503 es "secuencia incorrecta", no una sesión autenticada)
+        if code != 235:
+            raise smtplib.SMTPAuthenticationError(code, resp)
+
+    async def _rset_silencioso(self):
+        # Como sesiones._rset_silencioso: si el servidor ya cortó, el error que se informa
+        # es el rechazo original (5xx rebota, no se confunde con una conexión caída)
+        try:
+            await self.comando("RSET")
+        except Exception:
+            pass
+
+    async def enviar(self, remitente, destinatarios, datos):
+        # Devuelve los RCPT rechazados, igual que smtplib.SMTP.sendmail
+        code, resp = await self.comando(f"MAIL FROM:<{remitente}>")
+        if code != 250:
+            await self._rset_silencioso()
+            raise smtplib.SMTPSenderRefused(code, resp, remitente)
+        rechazados = {}
+        for destinatario in destinatarios:
+            code, resp = await self.comando(f"RCPT TO:<{destinatario}>")
+            if code not in (250, 251):
+                rechazados[destinatario] = (code, resp)
+        if len(rechazados) == len(destinatarios):
+            await self._rset_silencioso()
+            raise smtplib.SMTPRecipientsRefused(rechazados)
+        code, resp = await self.comando("DATA")
+        if code != 354:
+            await self._rset_silencioso()
+            raise smtplib.SMTPDataError(code, resp)
+        self.writer.write(datos + b'.\r\n')
+        await self.writer.drain()
+        code, resp = await self._leer_respuesta()
+        if code != 250:
+            await self._rset_silencioso()
+            raise smtplib.SMTPDataError(code, resp)
+        return rechazados
+
+    def descartar(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    async def cerrar(self):
+        if self.writer is None:
+            return
+        try:
+            await self.comando("QUIT")
+        except Exception:
+            pass
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except Exception:
+            pass
+        self.writer = None
+
+async def conectar_smtp_async(config, email_account, email_password, context):
+    sesion = SesionSMTPAsync(config['smtp_server'], config['smtp_port'], context)
+    try:
+        await sesion.conectar()
+        await sesion.login(email_account, email_password)
+    except Exception:
+        await sesion.cerrar()
+        raise
+    return sesion
+
+class SesionReconectableAsync(PoliticaSesion):
+    # Misma política que SesionReconectable (PoliticaSesion) sobre el transporte asyncio
+    async def _conectar(self):
+        ultimo_error = None
+        for intento in range(MAX_RECONEXIONES):
+            try:
+                self._conectada(await conectar_smtp_async(self.config, self.email_account, self.email_password, self.context))
+                return
+            except smtplib.SMTPAuthenticationError:
+                raise
+            except Exception as e:
+                ultimo_error = e
+                await asyncio.sleep(self._espera_reintento(intento, e))
+        raise ultimo_error
+
+    async def asegurar(self):
+        if self.debe_rotar():
+            logging.info(f"Rotando sesión SMTP tras {self.enviados} mensajes")
+            await self.cerrar()
+        if self.debe_verificar():
+            await self.mantener()
+        if self.smtp is None:
+            await self._conectar()
+        return self.smtp
+
+    async def mantener(self):
+        if self.smtp is None:
+            return
+        try:
+            self._verificada((await self.smtp.comando("NOOP"))[0])
+        except Exception as e:
+            logging.info(f"Sesión SMTP inactiva descartada: {e}")
+            self.descartar()
+
+    def descartar(self):
+        if self.smtp is not None:
+            self.smtp.descartar()
+        self.smtp = None
+
+    async def cerrar(self):
+        if self.smtp is not None:
+            await self.smtp.cerrar()
+        self.smtp = None
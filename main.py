@@ -1,16 +1,15 @@
 import sys
 import os
+import time
+import bisect
 import logging
 
-# Configurar logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('auto_responder.log'),
-        logging.StreamHandler()
-    ]
-)
+# Referencia para el informe de tiempos de arranque
+_T_INICIO = time.perf_counter()
+
+# Configurar logging (archivo rotativo escrito por un hilo aparte, ver enviador.bitacora)
+from enviador import configurar_log
+configurar_log('auto_responder.log', logging.StreamHandler())
 
 # Asegurar que los archivos se creen/lean en la carpeta del script o del .exe
 if getattr(sys, 'frozen', False):
@@ -22,338 +21,56 @@ import tkinter as tk
 from tkinter import messagebox, Listbox, Scrollbar, filedialog, colorchooser, simpledialog
 import tkinter.font as tkfont
 import threading
-import imapclient
-import email
-import smtplib
-import json
-from email.mime.text import MIMEText
-from email import utils
-import ssl
-import time
-
-RESPONDIDOS_FILE = 'respondidos.txt'
-ENVIADOS_FILE = 'enviados.txt'
-CONFIG_FILE = 'config.json'
-DESTINATARIOS_FILE = 'destinatarios.json'
-SIGNATURE_BLOCK = "\n\nRocío Rodríguez\nRecursos Humanos"
-SIGNATURE_HTML = "<br/><br/><span style=\"font-weight:600; font-size:90%\">Rocío Rodríguez<br/>Recursos Humanos</span>"
-
-# Configuración de servidores de email
-EMAIL_CONFIG = {
-    'migusto': {
-        'imap_server': 'mail.migusto.com.ar',
-        'smtp_server': 'mail.migusto.com.ar',
-        'smtp_port': 465
-    },
-    'gmail': {
-        'imap_server': 'imap.gmail.com',
-        'smtp_server': 'smtp.gmail.com',
-        'smtp_port': 587
-    },
-    'outlook': {
-        'imap_server': 'outlook.office365.com',
-        'smtp_server': 'smtp-mail.outlook.com',
-        'smtp_port': 587
-    }
-}
-
-# ------------------- Configuración persistente -------------------
-def guardar_configuracion(email, password, subject, mensaje, servidor='migusto'):
-    config = {
-        'email': email,
-        'password': password,
-        'subject': subject,
-        'mensaje': mensaje,
-        'servidor': servidor
-    }
-    try:
-        with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
-            json.dump(config, f, ensure_ascii=False, indent=2)
-        logging.info("Configuración guardada exitosamente")
-    except Exception as e:
-        logging.error(f"Error guardando configuración: {e}")
-        messagebox.showerror("Error", f"No se pudo guardar la configuración: {e}")
-
-def cargar_configuracion():
-    if os.path.exists(CONFIG_FILE):
-        try:
-            with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-                config = json.load(f)
-                # Asegurar compatibilidad con versiones anteriores
-                if 'servidor' not in config:
-                    config['servidor'] = 'migusto'
-                return config
-        except Exception as e:
-            logging.error(f"Error cargando configuración: {e}")
-            messagebox.showerror("Error", f"No se pudo cargar la configuración: {e}")
-    return {'email': '', 'password': '', 'subject': '', 'mensaje': '', 'servidor': 'migusto'}
-
-def guardar_configuracion_parcial(subject, mensaje, servidor='migusto'):
-    try:
-        actual = cargar_configuracion()
-        config = {
-            'email': actual.get('email', ''),
-            'password': actual.get('password', ''),
-            'subject': subject,
-            'mensaje': mensaje,
-            'servidor': 'migusto'
-        }
-        with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
-            json.dump(config, f, ensure_ascii=False, indent=2)
-        logging.info("Configuración (parcial) guardada exitosamente")
-    except Exception as e:
-        logging.error(f"Error guardando configuración parcial: {e}")
-        messagebox.showerror("Error", f"No se pudo guardar la configuración: {e}")
 
-# ------------------- Lógica de auto-respuesta -------------------
-def cargar_respondidos():
-    try:
-        with open(RESPONDIDOS_FILE, 'r', encoding='utf-8') as f:
-            return set(line.strip() for line in f.readlines() if line.strip())
-    except FileNotFoundError:
-        logging.info("Archivo de respondidos no encontrado, creando uno nuevo")
-        return set()
-    except Exception as e:
-        logging.error(f"Error cargando respondidos: {e}")
-        return set()
-
-def guardar_respondido(email):
-    try:
-        with open(RESPONDIDOS_FILE, 'a', encoding='utf-8') as f:
-            f.write(email + '\n')
-        logging.info(f"Email {email} agregado al historial")
-    except Exception as e:
-        logging.error(f"Error guardando email respondido: {e}")
+# Sólo configuración e historial al arrancar; el motor SMTP (enviador.envio), la
+# pila IMAP (enviador.autoresponder) y la base de campañas se importan al usarlos.
+from enviador import (
+    SIGNATURE_BLOCK, SIGNATURE_HTML,
+    cargar_configuracion, guardar_configuracion_parcial, configurar_bitacoras,
+    paginar_respondidos, limpiar_respondidos, obtener_registro_destinatarios, IndiceContactos,
+)
 
-def guardar_enviado(email):
-    try:
-        with open(ENVIADOS_FILE, 'a', encoding='utf-8') as f:
-            f.write(email + '\n')
-        logging.info(f"Email {email} agregado a enviados")
-    except Exception as e:
-        logging.error(f"Error guardando email enviado: {e}")
+# ------------------- Tiempos de arranque -------------------
+PRESUPUESTO_ARRANQUE_MS = 1500
+_tiempos_arranque = {}
+
+def _marcar_arranque(etapa):
+    _tiempos_arranque[etapa] = (time.perf_counter() - _T_INICIO) * 1000
+
+def _informar_arranque(presupuesto_ms=PRESUPUESTO_ARRANQUE_MS):
+    # Cada etapa se mide desde el inicio del proceso; el detalle va al log
+    t = _tiempos_arranque
+    detalle = (f"imports {t.get('imports', 0):.0f} ms | "
+               f"interfaz {t.get('interfaz', 0) - t.get('imports', 0):.0f} ms | "
+               f"primer cuadro {t.get('primer_cuadro', 0):.0f} ms | "
+               f"datos {t.get('datos', 0) - t.get('primer_cuadro', 0):.0f} ms")
+    if t.get('primer_cuadro', 0) > presupuesto_ms:
+        logging.warning(f"Arranque lento ({detalle}); presupuesto {presupuesto_ms} ms")
+    else:
+        logging.info(f"Arranque: {detalle}")
 
-def cargar_destinatarios_guardados():
-    try:
-        if os.path.exists(DESTINATARIOS_FILE):
-            with open(DESTINATARIOS_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                if isinstance(data, list):
-                    return data
-    except Exception as e:
-        logging.error(f"Error cargando destinatarios guardados: {e}")
-    return []
+_marcar_arranque('imports')
 
-def guardar_destinatarios_guardados(lista):
-    try:
-        with open(DESTINATARIOS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(lista, f, ensure_ascii=False, indent=2)
-    except Exception as e:
-        logging.error(f"Error guardando destinatarios: {e}")
+# ------------------- Historial -------------------
+HISTORIAL_POR_PAGINA = 500
 
 def actualizar_historial():
     try:
         # Si no existe el listbox (UI sin panel de historial), no hacer nada
         if 'historial_listbox' not in globals():
             return
-        responded = cargar_respondidos()
+        # Sólo la primera página: el historial completo puede tener cientos de miles
         historial_listbox.delete(0, tk.END)
-        for mail in sorted(responded):
+        for mail in paginar_respondidos(cantidad=HISTORIAL_POR_PAGINA):
             historial_listbox.insert(tk.END, mail)
     except Exception as e:
         logging.error(f"Error actualizando historial: {e}")
 
-def enviar_respuesta(smtp_conn, destinatario, email_account, subject, mensaje_auto, is_html=False):
-    try:
-        subtype = 'html' if is_html else 'plain'
-        mensaje = MIMEText(mensaje_auto, subtype, 'utf-8')
-        mensaje['Subject'] = subject
-        mensaje['From'] = email_account
-        mensaje['To'] = destinatario
-        mensaje['Date'] = utils.formatdate(localtime=True)
-        
-        smtp_conn.sendmail(email_account, destinatario, mensaje.as_string())
-        logging.info(f"Respuesta enviada exitosamente a {destinatario}")
-        return True
-    except Exception as e:
-        logging.error(f"Error enviando respuesta a {destinatario}: {e}")
-        return False
-
-def enviar_masivo(email_account, email_password, subject, mensaje_auto, servidor, destinatarios, status_callback, is_html=False):
-    try:
-        if servidor not in EMAIL_CONFIG:
-            error_msg = f"Servidor '{servidor}' no configurado"
-            logging.error(error_msg)
-            status_callback(error_msg)
-            return
-
-        config = EMAIL_CONFIG[servidor]
-        SMTP_SERVER = config['smtp_server']
-        SMTP_PORT = config['smtp_port']
-
-        # Configurar SSL context
-        context = ssl.create_default_context()
-        if servidor == 'migusto':
-            context.check_hostname = False
-            context.verify_mode = ssl.CERT_NONE
-
-        # Conectar SMTP
-        status_callback("Conectando al servidor SMTP...")
-        if SMTP_PORT == 587:
-            smtp = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
-            smtp.starttls(context=context)
-        else:
-            smtp = smtplib.SMTP_SSL(SMTP_SERVER, SMTP_PORT, context=context)
-
-        smtp.login(email_account, email_password)
-        logging.info("Conexión SMTP establecida para envío masivo")
-
-        exitosos = 0
-        fallidos = 0
-        total = len(destinatarios)
-        for i, destinatario in enumerate(destinatarios, 1):
-            status_callback(f"Enviando a {destinatario} ({i}/{total})")
-            ok = enviar_respuesta(smtp, destinatario, email_account, subject, mensaje_auto, is_html=is_html)
-            if ok:
-                exitosos += 1
-                guardar_enviado(destinatario)
-            else:
-                fallidos += 1
-
-        try:
-            smtp.quit()
-        except:
-            pass
-
-        resumen = f"Envío finalizado. Exitosos: {exitosos} | Fallidos: {fallidos}"
-        status_callback(resumen)
-        messagebox.showinfo("Resumen de envío", resumen)
-    except smtplib.SMTPAuthenticationError:
-        error_msg = "Error de autenticación SMTP. Verifica email y contraseña."
-        logging.error(error_msg)
-        status_callback(error_msg)
-        messagebox.showerror("Error", error_msg)
-    except Exception as e:
-        error_msg = f"Error en envío masivo: {e}"
-        logging.error(error_msg)
-        status_callback(error_msg)
-        messagebox.showerror("Error", error_msg)
-
-def auto_responder(email_account, email_password, subject, mensaje_auto, servidor, status_callback):
-    logging.info("Iniciando auto-responder")
-    
-    if servidor not in EMAIL_CONFIG:
-        error_msg = f"Servidor '{servidor}' no configurado"
-        logging.error(error_msg)
-        status_callback(error_msg)
-        return
-    
-    config = EMAIL_CONFIG[servidor]
-    IMAP_SERVER = config['imap_server']
-    SMTP_SERVER = config['smtp_server']
-    SMTP_PORT = config['smtp_port']
-
-    respondidos = cargar_respondidos()
-    imap = None
-    smtp = None
-    
-    try:
-        # Configurar SSL context
-        context = ssl.create_default_context()
-        if servidor == 'migusto':
-            context.check_hostname = False
-            context.verify_mode = ssl.CERT_NONE
-
-        # Conectar IMAP
-        status_callback("Conectando al servidor IMAP...")
-        imap = imapclient.IMAPClient(IMAP_SERVER, ssl=True, ssl_context=context)
-        imap.login(email_account, email_password)
-        imap.select_folder('INBOX')
-        logging.info("Conexión IMAP establecida")
-
-        # Conectar SMTP
-        status_callback("Conectando al servidor SMTP...")
-        if SMTP_PORT == 587:
-            smtp = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
-            smtp.starttls(context=context)
-        else:
-            smtp = smtplib.SMTP_SSL(SMTP_SERVER, SMTP_PORT, context=context)
-        
-        smtp.login(email_account, email_password)
-        logging.info("Conexión SMTP establecida")
-
-        # Buscar mensajes no leídos
-        mensajes = imap.search('UNSEEN')
-        status_callback(f'Correos no leídos encontrados: {len(mensajes)}')
-        logging.info(f"Encontrados {len(mensajes)} correos no leídos")
-
-        if not mensajes:
-            status_callback("No hay correos nuevos para responder")
-            return
-
-        # Procesar cada mensaje
-        for i, msgid in enumerate(mensajes, 1):
-            try:
-                raw = imap.fetch(msgid, ['RFC822'])[msgid][b'RFC822']
-                if isinstance(raw, bytes):
-                    msg = email.message_from_bytes(raw)
-                    sender = utils.parseaddr(msg.get('From') or '')[1]
-                else:
-                    logging.warning(f"El mensaje {msgid} no es de tipo bytes, se omite")
-                    continue
-
-                if not sender:
-                    logging.warning(f"No se pudo obtener el remitente del mensaje {msgid}")
-                    continue
-
-                if sender.lower() in respondidos:
-                    status_callback(f'Ya se respondió a {sender}, salteando.')
-                    imap.add_flags(msgid, [imapclient.SEEN])
-                    continue
-
-                # Enviar respuesta
-                status_callback(f'Enviando respuesta a {sender} ({i}/{len(mensajes)})')
-                if enviar_respuesta(smtp, sender, email_account, subject, mensaje_auto):
-                    guardar_respondido(sender.lower())
-                    imap.add_flags(msgid, [imapclient.SEEN])
-                    status_callback(f'✓ Respuesta enviada a {sender}')
-                else:
-                    status_callback(f'✗ Error enviando a {sender}')
-
-            except Exception as e:
-                logging.error(f"Error procesando mensaje {msgid}: {e}")
-                status_callback(f'Error procesando mensaje: {e}')
-
-        status_callback('Proceso finalizado exitosamente.')
-        logging.info("Proceso de auto-respuesta completado")
-
-    except imapclient.exceptions.LoginError:
-        error_msg = "Error de autenticación. Verifica email y contraseña."
-        logging.error(error_msg)
-        status_callback(error_msg)
-    except Exception as e:
-        error_msg = f'Error general en la ejecución: {e}'
-        logging.error(error_msg)
-        status_callback(error_msg)
-    finally:
-        # Cerrar conexiones
-        try:
-            if smtp:
-                smtp.quit()
-                logging.info("Conexión SMTP cerrada")
-        except:
-            pass
-        try:
-            if imap:
-                imap.logout()
-                logging.info("Conexión IMAP cerrada")
-        except:
-            pass
-
 # ------------------- Interfaz gráfica mejorada -------------------
 animando = False
 modo_continuo = False
 hilo_continuo = None
+detener_continuo = threading.Event()
 
 def iniciar():
     global animando, modo_continuo
@@ -375,7 +92,7 @@ def iniciar():
         messagebox.showerror("Error", "Completa asunto y mensaje.")
         return
     
-    guardar_configuracion_parcial(subject, mensaje_auto, servidor)
+    _guardar_configuracion_ui(subject, mensaje_auto, servidor)
     btn_iniciar.config(state=tk.DISABLED)
     btn_continuo.config(state=tk.DISABLED)
     status_var.set("Procesando...")
@@ -387,7 +104,9 @@ def iniciar():
         actualizar_historial()
     
     def run():
-        auto_responder(email_account, email_password, subject, mensaje_auto, servidor, set_estado_final)
+        from enviador.autoresponder import auto_responder
+        auto_responder(email_account, email_password, subject, mensaje_auto, servidor, set_estado_final,
+                       supresion_dias=conf.get('supresion_dias'))
     
     threading.Thread(target=run, daemon=True).start()
 
@@ -418,7 +137,7 @@ def toggle_continuo():
             btn_iniciar.config(state=tk.NORMAL)
             return
         
-        guardar_configuracion_parcial(subject, mensaje_auto, servidor)
+        _guardar_configuracion_ui(subject, mensaje_auto, servidor)
         status_var.set("Esperando correos nuevos...")
         
         def set_estado_final(msg):
@@ -430,21 +149,17 @@ def toggle_continuo():
         
         def run_continuo():
             global modo_continuo
-            while modo_continuo:
-                try:
-                    status_var.set("Buscando correos...")
-                    auto_responder(email_account, email_password, subject, mensaje_auto, servidor, set_estado_final)
-                    if modo_continuo:
-                        status_var.set("Esperando próximos correos...")
-                    for _ in range(60):
-                        if not modo_continuo:
-                            break
-                        time.sleep(1)
-                except Exception as e:
-                    logging.error(f"Error en modo continuo: {e}")
-                    if modo_continuo:
-                        status_var.set(f"Error: {e}")
-                        time.sleep(10)  # Esperar antes de reintentar
+            from enviador.autoresponder import auto_responder_continuo
+            # Una sola sesión IMAP (IDLE) y SMTP para todo el modo continuo
+            detener_continuo.clear()
+            try:
+                auto_responder_continuo(email_account, email_password, subject, mensaje_auto, servidor,
+                                        set_estado_final, detener=detener_continuo,
+                                        supresion_dias=conf.get('supresion_dias'))
+            except Exception as e:
+                logging.error(f"Error en modo continuo: {e}")
+                status_var.set(f"Error: {e}")
+            modo_continuo = False
             
             status_var.set("Modo continuo detenido.")
             btn_iniciar.config(state=tk.NORMAL)
@@ -454,15 +169,22 @@ def toggle_continuo():
         hilo_continuo.start()
     else:
         modo_continuo = False
+        detener_continuo.set()
         btn_continuo.config(text="Modo Continuo (esperar correos)")
         btn_iniciar.config(state=tk.NORMAL)
         status_var.set("Modo continuo detenido.")
 
+def _guardar_configuracion_ui(subject, mensaje, servidor):
+    # El motor lanza la excepción; la UI solo la muestra
+    try:
+        guardar_configuracion_parcial(subject, mensaje, servidor)
+    except Exception as e:
+        messagebox.showerror("Error", f"No se pudo guardar la configuración: {e}")
+
 def limpiar_historial():
     try:
         if messagebox.askyesno("Confirmar", "¿Estás seguro de que quieres limpiar el historial?"):
-            with open(RESPONDIDOS_FILE, 'w', encoding='utf-8') as f:
-                f.write('')
+            limpiar_respondidos()
             actualizar_historial()
             logging.info("Historial limpiado")
             messagebox.showinfo("Éxito", "Historial limpiado correctamente")
@@ -483,45 +205,61 @@ def on_close():
         logging.error(f"Error al cerrar: {e}")
     root.destroy()
 
+# Informe fila por fila de lo que no se pudo importar
+RECHAZOS_IMPORTACION = 'rechazados_importacion.csv'
+
 def cargar_destinatarios_desde_archivo():
-    try:
-        path = filedialog.askopenfilename(
-            title="Seleccionar archivo de destinatarios",
-            filetypes=[("Text files", "*.txt"), ("All files", "*.*")]
-        )
-        if not path:
+    # La lectura y el guardado corren en otro hilo (enviador.importador); la lista se
+    # actualiza al terminar, de una vez
+    path = filedialog.askopenfilename(
+        title="Seleccionar archivo de destinatarios",
+        filetypes=[("Listas de contactos", "*.csv *.xlsx *.txt"), ("CSV", "*.csv"), ("Excel", "*.xlsx"),
+                   ("Text files", "*.txt"), ("All files", "*.*")]
+    )
+    if not path:
+        return
+    lista = simpledialog.askstring("Lista de distribución",
+                                   "Agregar también a la lista (vacío: ninguna):", parent=root)
+    lista = (lista or "").strip() or None
+    if lista and not _nombre_lista_valido(lista):
+        return
+    btn_importar.config(state=tk.DISABLED)
+    status_var.set("Importando destinatarios…")
+
+    def progreso(fraccion, filas):
+        status_var.set(f"Importando destinatarios… {fraccion:.0%} ({filas} filas)")
+
+    def run():
+        from enviador.importador import importar_destinatarios, guardar_rechazos
+        try:
+            resultado = importar_destinatarios(path, progreso, lista=lista)
+            if resultado.rechazados:
+                guardar_rechazos(resultado, RECHAZOS_IMPORTACION)
+        except Exception as e:
+            logging.error(f"Error cargando archivo de destinatarios: {e}")
+            root.after(0, _fin_importacion, None, str(e))
             return
-        with open(path, 'r', encoding='utf-8') as f:
-            lineas = [l.strip() for l in f.readlines() if l.strip()]
-        for l in lineas:
-            # formato simple: email[,nombre]
-            partes = [p.strip() for p in l.split(',')]
-            email_txt = partes[0]
-            nombre_txt = partes[1] if len(partes) > 1 else ''
-            if '@' in email_txt and '.' in email_txt:
-                if email_txt.lower() not in {r["email"].lower() for r in recipients_list}:
-                    recipients_list.append({"email": email_txt, "nombre": nombre_txt})
-        refresh_dest_list()
-        logging.info(f"Destinatarios cargados desde archivo: {path}")
-    except Exception as e:
-        logging.error(f"Error cargando archivo de destinatarios: {e}")
-        messagebox.showerror("Error", f"No se pudo cargar el archivo: {e}")
+        root.after(0, _fin_importacion, resultado, None)
+
+    threading.Thread(target=run, daemon=True).start()
+
+def _fin_importacion(resultado, error):
+    btn_importar.config(state=tk.NORMAL)
+    if error:
+        status_var.set("")
+        messagebox.showerror("Error", f"No se pudo cargar el archivo: {error}")
+        return
+    _agregar_a_lista(resultado.agregados)
+    aplicar_filtro()
+    status_var.set(f"Importados {len(resultado.agregados)} destinatarios")
+    resumen = resultado.resumen
+    if resultado.rechazados:
+        resumen += f"\n\nEl detalle de los rechazados quedó en {RECHAZOS_IMPORTACION}."
+    messagebox.showinfo("Importación de destinatarios", resumen)
 
 def obtener_lista_destinatarios():
-    seleccionados = []
-    for i, r in enumerate(recipients_list):
-        selected = r.get("selected", True)
-        if i < len(recipient_vars):
-            try:
-                selected = bool(recipient_vars[i].get())
-            except Exception:
-                pass
-        recipients_list[i]["selected"] = selected
-    guardar_destinatarios_guardados(recipients_list)
-    for r in recipients_list:
-        if r.get("selected", True):
-            seleccionados.append(r["email"])
-    return seleccionados
+    # Cada tilde ya quedó guardada al hacer clic (on_toggle)
+    return [r["email"] for r, tildado in zip(recipients_list, seleccion) if tildado]
 
 def _to_html(text_widget: tk.Text) -> str:
     try:
@@ -613,9 +351,32 @@ def on_enviar_destinatarios():
         messagebox.showerror("Error", "Agrega al menos un destinatario (uno por línea).")
         return
 
-    if not messagebox.askyesno("Confirmar envío", f"Se enviará a {len(destinatarios)} destinatario(s). ¿Continuar?"):
+    from enviador.mensajes import marcadores_plantilla
+    marcadores = marcadores_plantilla(subject, mensaje_auto)
+    aviso = f"Se enviará a {len(destinatarios)} destinatario(s)."
+    if marcadores:
+        # Combinación: {nombre}, {email} y columnas importadas, por destinatario
+        aviso += "\nPersonalizado con: " + ", ".join("{" + m + "}" for m in sorted(marcadores))
+    if not messagebox.askyesno("Confirmar envío", aviso + " ¿Continuar?"):
         return
 
+    def run_envio():
+        from enviador.envio import enviar_masivo
+        # Detectar si hay tags ricas para enviar como HTML simple
+        is_html = any(name in entry_mensaje.tag_names() for name in ['bold','italic','underline'])
+        html = mensaje_auto
+        if is_html:
+            # Convertir tags a HTML mínimo
+            html = _to_html(entry_mensaje)
+            if 'Rocío Rodríguez' not in html:
+                html = html.rstrip() + SIGNATURE_HTML
+        return enviar_masivo(email_account, email_password, subject, html if is_html else mensaje_auto, servidor, destinatarios, status_var.set,
+                      is_html=is_html, conexiones=conf.get('conexiones'), motor=conf.get('motor_envio', 'hilos'),
+                      lote_rcpt=conf.get('lote_rcpt'))
+
+    _lanzar_envio(run_envio)
+
+def _lanzar_envio(tarea):
     # Deshabilitar botones durante envío y cambiar texto
     btn_enviar.config(state=tk.DISABLED, text="⏳ Enviando…")
     try:
@@ -624,20 +385,14 @@ def on_enviar_destinatarios():
     except Exception:
         pass
 
-    def set_estado(msg):
-        status_var.set(msg)
-
-    def run_envio():
+    def run():
+        from enviador.envio import ErrorEnvio
         try:
-            # Detectar si hay tags ricas para enviar como HTML simple
-            is_html = any(name in entry_mensaje.tag_names() for name in ['bold','italic','underline'])
-            html = mensaje_auto
-            if is_html:
-                # Convertir tags a HTML mínimo
-                html = _to_html(entry_mensaje)
-                if 'Rocío Rodríguez' not in html:
-                    html = html.rstrip() + SIGNATURE_HTML
-            enviar_masivo(email_account, email_password, subject, html if is_html else mensaje_auto, servidor, destinatarios, set_estado, is_html=is_html)
+            resultado = tarea()
+            if resultado is not None:
+                messagebox.showinfo("Resumen de envío", resultado.resumen)
+        except ErrorEnvio as e:
+            messagebox.showerror("Error", str(e))
         finally:
             btn_enviar.config(state=tk.NORMAL, text="✈ Enviar")
             try:
@@ -646,10 +401,72 @@ def on_enviar_destinatarios():
             except Exception:
                 pass
 
-    threading.Thread(target=run_envio, daemon=True).start()
+    threading.Thread(target=run, daemon=True).start()
+
+def ver_rebotados():
+    from enviador.campanias import listar_rebotados
+    try:
+        filas = listar_rebotados()
+    except Exception as e:
+        logging.error(f"Error cargando rebotados: {e}")
+        messagebox.showerror("Error", f"No se pudo cargar la lista de rebotados: {e}")
+        return
+    ventana = tk.Toplevel(root)
+    ventana.title("Destinatarios rebotados")
+    ventana.geometry("760x420")
+    ventana.configure(bg=DARK_FRAME)
+    lista = Listbox(ventana, font=("Segoe UI", 10), bg=DARK_ENTRY, fg=DARK_LABEL, relief="flat")
+    barra = Scrollbar(ventana, orient="vertical", command=lista.yview)
+    lista.configure(yscrollcommand=barra.set)
+    barra.pack(side="right", fill="y")
+    lista.pack(fill="both", expand=True, padx=8, pady=8)
+    for email_txt, campania_id, codigo, error, fecha in filas:
+        cuando = time.strftime('%Y-%m-%d %H:%M', time.localtime(fecha))
+        lista.insert(tk.END, f"{cuando}  {email_txt}  [{codigo or '-'}] {error}  (campaña {campania_id})")
+    if not filas:
+        lista.insert(tk.END, "No hay destinatarios rebotados.")
+
+def ofrecer_reanudar_campania():
+    from enviador.campanias import campanias_incompletas
+    try:
+        incompletas = campanias_incompletas()
+    except Exception as e:
+        logging.error(f"Error consultando campañas incompletas: {e}")
+        return
+    if not incompletas:
+        return
+    campania_id, pendientes = incompletas[0]
+    respuesta = messagebox.askyesnocancel(
+        "Campaña interrumpida",
+        f"La campaña {campania_id} quedó con {pendientes} destinatario(s) sin enviar.\n\n"
+        "Sí: reanudar ahora\nNo: descartarla (no se envía a los pendientes)\nCancelar: decidir más tarde")
+    if respuesta is None:
+        return
+    if respuesta is False:
+        if messagebox.askyesno("Descartar campaña", f"¿Descartar la campaña {campania_id}? "
+                                                    f"Sus {pendientes} pendiente(s) no se enviarán."):
+            from enviador.campanias import descartar_campania
+            try:
+                descartar_campania(campania_id)
+                status_var.set(f"Campaña {campania_id} descartada")
+            except Exception as e:
+                logging.error(f"Error descartando la campaña {campania_id}: {e}")
+                messagebox.showerror("Error", f"No se pudo descartar la campaña: {e}")
+        return
+    conf = cargar_configuracion()
+    email_account = conf.get('email', '').strip()
+    email_password = conf.get('password', '')
+    if not email_account or not email_password:
+        messagebox.showerror("Error", "Configura email y contraseña en config.json (no se muestran en la UI).")
+        return
+    from enviador.envio import reanudar_campania
+    _lanzar_envio(lambda: reanudar_campania(
+        email_account, email_password, campania_id, status_var.set,
+        conexiones=conf.get('conexiones'), motor=conf.get('motor_envio', 'hilos'), lote_rcpt=conf.get('lote_rcpt')))
 
 # Cargar configuración previa
 config = cargar_configuracion()
+configurar_bitacoras(fsync=config.get('fsync_bitacoras'))
 
 root = tk.Tk()
 root.title("Auto-Responder Email")
@@ -780,46 +597,108 @@ def _clear_placeholder(event, widget, placeholder):
 dest_btn_frame = tk.Frame(dest_input_frame, bg=DARK_FRAME)
 dest_btn_frame.grid(row=0, column=2, sticky="e")
 
-recipients_list = cargar_destinatarios_guardados()  # [{"email": str, "nombre": str, "selected": bool}]
-recipient_vars = []
+# Se completa después del primer cuadro (ver _cargar_datos_diferidos)
+recipients_list = []  # [{"id": int, "email": str, "nombre": str}] (ver enviador.destinatarios)
+seleccion = bytearray()  # seleccion[i]: 1 si recipients_list[i] está tildado
+
+# Lista virtualizada: sólo existen los widgets de las filas visibles (ALTO_FILA cada una)
+# y al desplazarse se reutilizan con los datos de otros contactos
+ALTO_FILA = 52
+_filas = []  # [{"item", "nombre", "email", "var", "indice"}]
+
+# Búsqueda: índice por nombre, email y dominio (se arma en segundo plano al cargar la
+# lista) y la vista filtrada, como posiciones de recipients_list (None: todos)
+indice_busqueda = IndiceContactos()
+vista = None
+_ultima_consulta = ""
+
+def _agregar_a_lista(contactos, indexar=True):
+    for r in contactos:
+        seleccion.append(1 if r.pop("selected", True) else 0)
+        recipients_list.append(r)
+    if indexar:
+        indice_busqueda.agregar(contactos)
+
+def _crear_fila():
+    rowf = tk.Frame(dest_canvas, bg=DARK_FRAME)
+    rowf.grid_columnconfigure(0, weight=1)
+    rowf.grid_columnconfigure(1, weight=0)
+    rowf.grid_columnconfigure(2, weight=0)
+    texto_izq = tk.Frame(rowf, bg=DARK_FRAME)
+    texto_izq.grid(row=0, column=0, sticky="w")
+    lbl_nombre = tk.Label(texto_izq, font=("Segoe UI", 11, "bold"), bg=DARK_FRAME, fg=DARK_LABEL)
+    lbl_nombre.pack(anchor="w")
+    lbl_email = tk.Label(texto_izq, font=("Segoe UI", 10), bg=DARK_FRAME, fg=DARK_LABEL)
+    lbl_email.pack(anchor="w")
+    fila = {"nombre": lbl_nombre, "email": lbl_email, "var": tk.BooleanVar(), "indice": None}
+
+    chk = tk.Checkbutton(rowf, variable=fila["var"], command=lambda: on_toggle(fila), text="Enviar", bg=DARK_FRAME, fg=DARK_LABEL, selectcolor=DARK_FRAME, activebackground=DARK_FRAME)
+    chk.grid(row=0, column=1, padx=8)
+
+    btn_del = tk.Button(rowf, text="🗑", command=lambda: remove_recipient(fila["indice"]), **style["button"])
+    btn_del.configure(padx=6, pady=4, font=("Segoe UI", 12))
+    btn_del.grid(row=0, column=2)
+    create_tooltip(btn_del, "Borrar destinatario")
+    fila["item"] = dest_canvas.create_window(0, -ALTO_FILA, window=rowf, anchor="nw", height=ALTO_FILA)
+    return fila
+
+def on_toggle(fila):
+    i = fila["indice"]
+    if i is None:
+        return
+    try:
+        seleccion[i] = 1 if fila["var"].get() else 0
+        obtener_registro_destinatarios().seleccionar([recipients_list[i]["id"]], bool(seleccion[i]))
+    except Exception:
+        pass
 
 def refresh_dest_list():
-    for w in dest_list_frame.winfo_children():
-        w.destroy()
-    recipient_vars.clear()
-    for idx, r in enumerate(recipients_list):
-        rowf = tk.Frame(dest_list_frame, bg=DARK_FRAME)
-        rowf.pack(fill="x", pady=6)
-        rowf.grid_columnconfigure(0, weight=1)
-        rowf.grid_columnconfigure(1, weight=0)
-        rowf.grid_columnconfigure(2, weight=0)
+    # El alto total sale de la cantidad de contactos; los widgets son siempre los visibles
+    total = len(recipients_list) if vista is None else len(vista)
+    dest_canvas.configure(scrollregion=(0, 0, dest_canvas.winfo_width(), ALTO_FILA * total))
+    _actualizar_filas()
+
+def _actualizar_filas():
+    necesarias = max(dest_canvas.winfo_height(), ALTO_FILA) // ALTO_FILA + 2
+    while len(_filas) < necesarias:
+        _filas.append(_crear_fila())
+    primera = max(0, int(dest_canvas.canvasy(0)) // ALTO_FILA)
+    ancho = dest_canvas.winfo_width()
+    total = len(recipients_list) if vista is None else len(vista)
+    for n, fila in enumerate(_filas):
+        posicion = primera + n
+        if posicion >= total:
+            # Sobrante: fuera de la zona visible
+            fila["indice"] = None
+            dest_canvas.coords(fila["item"], 0, -2 * ALTO_FILA)
+            continue
+        i = posicion if vista is None else vista[posicion]
+        r = recipients_list[i]
         nombre = (r.get("nombre") or "").strip()
-        display_name = nombre if nombre else r["email"].split("@")[0]
-        texto_izq = tk.Frame(rowf, bg=DARK_FRAME)
-        texto_izq.grid(row=0, column=0, sticky="w")
-        tk.Label(texto_izq, text=display_name, font=("Segoe UI", 11, "bold"), bg=DARK_FRAME, fg=DARK_LABEL).pack(anchor="w")
-        tk.Label(texto_izq, text=r["email"], font=("Segoe UI", 10), bg=DARK_FRAME, fg=DARK_LABEL).pack(anchor="w")
-
-        var = tk.BooleanVar(value=r.get("selected", True))
-        recipient_vars.append(var)
-        def on_toggle(i=idx, v=var):
-            try:
-                recipients_list[i]["selected"] = bool(v.get())
-                guardar_destinatarios_guardados(recipients_list)
-            except Exception:
-                pass
-        chk = tk.Checkbutton(rowf, variable=var, command=on_toggle, text="Enviar", bg=DARK_FRAME, fg=DARK_LABEL, selectcolor=DARK_FRAME, activebackground=DARK_FRAME)
-        chk.grid(row=0, column=1, padx=8)
-
-        btn_del = tk.Button(rowf, text="🗑", command=lambda i=idx: remove_recipient(i), **style["button"])
-        btn_del.configure(padx=6, pady=4, font=("Segoe UI", 12))
-        btn_del.grid(row=0, column=2)
-        create_tooltip(btn_del, "Borrar destinatario")
+        fila["nombre"].configure(text=nombre if nombre else r["email"].split("@")[0])
+        fila["email"].configure(text=r["email"])
+        fila["var"].set(bool(seleccion[i]))
+        fila["indice"] = i
+        dest_canvas.coords(fila["item"], 0, posicion * ALTO_FILA)
+        dest_canvas.itemconfigure(fila["item"], width=ancho)
 
 def remove_recipient(index):
+    global vista
+    if index is None:
+        return
     try:
+        obtener_registro_destinatarios().borrar([recipients_list[index]["id"]])
+        indice_busqueda.quitar([recipients_list[index]["id"]])
         del recipients_list[index]
-        guardar_destinatarios_guardados(recipients_list)
+        del seleccion[index]
+        if vista is not None:
+            # La vista se corrige en el lugar, sin volver a buscar: sale el borrado y las
+            # posiciones que venían después bajan uno
+            p = bisect.bisect_left(vista, index)
+            if p < len(vista) and vista[p] == index:
+                del vista[p]
+            vista[p:] = [i - 1 for i in vista[p:]]
+            lbl_coincidencias.config(text=f"{len(vista)} de {len(recipients_list)}")
         refresh_dest_list()
     except Exception:
         pass
@@ -830,21 +709,25 @@ def add_recipient():
     if not email_txt or '@' not in email_txt or '.' not in email_txt:
         messagebox.showerror("Error", "Ingresá un email válido.")
         return
-    existing = {r["email"].lower() for r in recipients_list}
-    if email_txt.lower() in existing:
+    nuevo = obtener_registro_destinatarios().agregar(email_txt, nombre_txt)
+    if nuevo is None:
         messagebox.showinfo("Info", "Ese email ya está en la lista.")
         return
-    recipients_list.append({"email": email_txt, "nombre": nombre_txt, "selected": True})
+    _agregar_a_lista([nuevo])
     entry_dest_email.delete(0, tk.END)
     entry_dest_nombre.delete(0, tk.END)
-    guardar_destinatarios_guardados(recipients_list)
-    refresh_dest_list()
+    aplicar_filtro()
 
 btn_agregar = tk.Button(dest_btn_frame, text="+", command=add_recipient, **style["button"])
 btn_agregar.configure(padx=6, pady=4, font=("Segoe UI", 12, "bold"))
-btn_agregar.pack()
+btn_agregar.pack(side="left")
 create_tooltip(btn_agregar, "Agregar destinatario")
 
+btn_importar = tk.Button(dest_btn_frame, text="📂", command=cargar_destinatarios_desde_archivo, **style["button"])
+btn_importar.configure(padx=6, pady=4, font=("Segoe UI", 12))
+btn_importar.pack(side="left", padx=(4, 0))
+create_tooltip(btn_importar, "Importar destinatarios (CSV, Excel o TXT)")
+
 # Definir fuentes para formatos (se aplican después de crear entry_mensaje)
 default_font = tkfont.nametofont("TkDefaultFont")
 bold_font = default_font.copy(); bold_font.configure(weight="bold")
@@ -854,24 +737,168 @@ italic_font = default_font.copy(); italic_font.configure(slant="italic")
 dest_scroll_container = tk.Frame(form_frame, bg=DARK_FRAME)
 dest_scroll_container.grid(row=row+1, column=1, pady=(0,10), padx=8, sticky="ew")
 
-# Canvas con scrollbar para la lista de destinatarios
-dest_canvas = tk.Canvas(dest_scroll_container, bg=DARK_FRAME, highlightthickness=0, height=240)
-dest_scrollbar = Scrollbar(dest_scroll_container, orient="vertical", command=dest_canvas.yview)
-dest_canvas.configure(yscrollcommand=dest_scrollbar.set)
-dest_canvas.pack(side="left", fill="both", expand=True)
-dest_scrollbar.pack(side="right", fill="y")
+# Búsqueda sobre la lista, con tildado/destildado de todos los que coinciden
+dest_busqueda_frame = tk.Frame(dest_scroll_container, bg=DARK_FRAME)
+dest_busqueda_frame.pack(side="top", fill="x", pady=(0, 6))
+entry_buscar = tk.Entry(dest_busqueda_frame, **style["entry"])
+entry_buscar.pack(side="left", fill="x", expand=True)
+add_placeholder(entry_buscar, "Buscar por nombre, email o dominio")
+entry_buscar.config(state=tk.DISABLED)
+lbl_coincidencias = tk.Label(dest_busqueda_frame, text="", bg=DARK_FRAME, fg=DARK_LABEL, font=("Segoe UI", 10))
+lbl_coincidencias.pack(side="left", padx=8)
+
+def _consulta_busqueda():
+    if getattr(entry_buscar, "_is_placeholder", False):
+        return ""
+    return entry_buscar.get().strip()
+
+def aplicar_filtro(volver_arriba=False):
+    global vista
+    consulta = _consulta_busqueda()
+    if not consulta:
+        vista = None
+        lbl_coincidencias.config(text="")
+    else:
+        ids = indice_busqueda.buscar(consulta)
+        vista = [i for i, r in enumerate(recipients_list) if r["id"] in ids]
+        lbl_coincidencias.config(text=f"{len(vista)} de {len(recipients_list)}")
+    if volver_arriba:
+        dest_canvas.yview_moveto(0)
+    refresh_dest_list()
+
+def _on_buscar(event=None):
+    global _ultima_consulta
+    consulta = _consulta_busqueda()
+    if consulta != _ultima_consulta:
+        _ultima_consulta = consulta
+        aplicar_filtro(volver_arriba=True)
 
-# Frame interno donde se renderizan los destinatarios
-dest_list_frame = tk.Frame(dest_canvas, bg=DARK_FRAME)
-dest_canvas.create_window((0, 0), window=dest_list_frame, anchor="nw")
+entry_buscar.bind("<KeyRelease>", _on_buscar)
 
-def _on_frame_configure(event):
+def tildar_coincidencias(valor):
+    # Todos los contactos de la vista actual (o toda la lista, sin búsqueda), en una transacción
+    posiciones = range(len(recipients_list)) if vista is None else vista
+    if not posiciones:
+        return
     try:
-        dest_canvas.configure(scrollregion=dest_canvas.bbox("all"))
-    except Exception:
-        pass
+        for i in posiciones:
+            seleccion[i] = valor
+        obtener_registro_destinatarios().seleccionar([recipients_list[i]["id"] for i in posiciones], bool(valor))
+        status_var.set(f"{'Tildados' if valor else 'Destildados'} {len(posiciones)} destinatarios")
+    except Exception as e:
+        logging.error(f"Error actualizando selección: {e}")
+    refresh_dest_list()
 
-dest_list_frame.bind("<Configure>", _on_frame_configure)
+btn_tildar = tk.Button(dest_busqueda_frame, text="☑", command=lambda: tildar_coincidencias(1), **style["button"])
+btn_tildar.configure(padx=6, pady=2, font=("Segoe UI", 11))
+btn_tildar.pack(side="left")
+create_tooltip(btn_tildar, "Tildar todos los que coinciden")
+btn_destildar = tk.Button(dest_busqueda_frame, text="☐", command=lambda: tildar_coincidencias(0), **style["button"])
+btn_destildar.configure(padx=6, pady=2, font=("Segoe UI", 11))
+btn_destildar.pack(side="left", padx=(4, 0))
+create_tooltip(btn_destildar, "Destildar todos los que coinciden")
+
+# ---- Listas de distribución (enviador.listas): grupos con nombre sobre los mismos contactos ----
+evaluador_listas = None
+
+def _evaluador_listas():
+    global evaluador_listas
+    if evaluador_listas is None:
+        from enviador.listas import EvaluadorListas
+        evaluador_listas = EvaluadorListas(obtener_registro_destinatarios())
+    return evaluador_listas
+
+def _nombre_lista_valido(nombre):
+    from enviador.listas import NOMBRES_RESERVADOS
+    if nombre.lower() in NOMBRES_RESERVADOS:
+        messagebox.showerror("Listas", f"'{nombre}' es un nombre reservado (se usa en las expresiones).")
+        return False
+    return True
+
+def _resumen_listas():
+    listas = obtener_registro_destinatarios().listas()
+    if not listas:
+        return "Todavía no hay listas."
+    return "\n".join(f"• {nombre} ({cantidad})" for nombre, cantidad in listas)
+
+def guardar_tildados_como_lista():
+    ids = [r["id"] for r, tildado in zip(recipients_list, seleccion) if tildado]
+    if not ids:
+        messagebox.showwarning("Listas", "No hay destinatarios tildados.")
+        return
+    nombre = simpledialog.askstring("Guardar como lista",
+                                    f"Nombre de la lista para los {len(ids)} tildados:\n\n{_resumen_listas()}", parent=root)
+    nombre = (nombre or "").strip()
+    if not nombre or not _nombre_lista_valido(nombre):
+        return
+    registro = obtener_registro_destinatarios()
+    if registro.miembros(nombre) is not None and not messagebox.askyesno(
+            "Listas", f"La lista '{nombre}' ya existe. ¿Reemplazar sus contactos por los tildados?"):
+        return
+    try:
+        registro.agregar_a_lista(nombre, ids, reemplazar=True)
+        status_var.set(f"Lista '{nombre}': {len(ids)} contactos")
+    except Exception as e:
+        logging.error(f"Error guardando la lista {nombre}: {e}")
+        messagebox.showerror("Error", f"No se pudo guardar la lista: {e}")
+
+def tildar_por_listas():
+    # Deja tildados exactamente los contactos de la expresión; el envío usa los tildados
+    from enviador.listas import ErrorListas
+    expresion = simpledialog.askstring(
+        "Tildar según listas",
+        "Expresión (∪ o + une, ∩ o & intersecta, − o - resta; \"todos\" y \"tildados\" también valen):\n"
+        f"p. ej.  Sucursales ∪ Gerentes − Bajas\n\n{_resumen_listas()}", parent=root)
+    if not (expresion or "").strip():
+        return
+    try:
+        ids = set(_evaluador_listas().ids(expresion))
+    except ErrorListas as e:
+        messagebox.showerror("Listas", str(e))
+        return
+    cambios = {1: [], 0: []}
+    for i, r in enumerate(recipients_list):
+        valor = 1 if r["id"] in ids else 0
+        if seleccion[i] != valor:
+            seleccion[i] = valor
+            cambios[valor].append(r["id"])
+    try:
+        registro = obtener_registro_destinatarios()
+        for valor, cambiados in cambios.items():
+            registro.seleccionar(cambiados, bool(valor))
+        status_var.set(f"Tildados {len(ids)} destinatarios ({expresion.strip()})")
+    except Exception as e:
+        logging.error(f"Error actualizando selección: {e}")
+    refresh_dest_list()
+
+btn_guardar_lista = tk.Button(dest_busqueda_frame, text="🗂", command=guardar_tildados_como_lista, **style["button"])
+btn_guardar_lista.configure(padx=6, pady=2, font=("Segoe UI", 11))
+btn_guardar_lista.pack(side="left", padx=(8, 0))
+create_tooltip(btn_guardar_lista, "Guardar los tildados como lista de distribución")
+btn_tildar_listas = tk.Button(dest_busqueda_frame, text="∪", command=tildar_por_listas, **style["button"])
+btn_tildar_listas.configure(padx=6, pady=2, font=("Segoe UI", 11))
+btn_tildar_listas.pack(side="left", padx=(4, 0))
+create_tooltip(btn_tildar_listas, "Tildar según listas (Sucursales ∪ Gerentes − Bajas)")
+
+def _esperar_indice():
+    if indice_busqueda.listo.is_set():
+        entry_buscar.config(state=tk.NORMAL)
+    else:
+        root.after(100, _esperar_indice)
+
+# Canvas con scrollbar para la lista de destinatarios
+# (el desplazamiento avanza de a una fila; cada movimiento reasigna las filas visibles)
+dest_canvas = tk.Canvas(dest_scroll_container, bg=DARK_FRAME, highlightthickness=0, height=240, yscrollincrement=ALTO_FILA)
+dest_scrollbar = Scrollbar(dest_scroll_container, orient="vertical", command=dest_canvas.yview)
+
+def _on_dest_scroll(primero, ultimo):
+    dest_scrollbar.set(primero, ultimo)
+    _actualizar_filas()
+
+dest_canvas.configure(yscrollcommand=_on_dest_scroll)
+dest_canvas.pack(side="left", fill="both", expand=True)
+dest_scrollbar.pack(side="right", fill="y")
+dest_canvas.bind("<Configure>", lambda e: refresh_dest_list())
 
 def _on_mousewheel(event):
     try:
@@ -882,7 +909,6 @@ def _on_mousewheel(event):
 dest_canvas.bind_all("<MouseWheel>", _on_mousewheel)
 
 row += 2
-refresh_dest_list()
 
 # Asunto después de la sección de destinatarios
 tk.Label(form_frame, text="Asunto:", **style["label"]).grid(row=row, column=0, sticky="e", pady=10, padx=8)
@@ -998,6 +1024,12 @@ except Exception:
     pass
 row += 1
 
+btn_rebotados = tk.Button(form_frame, text="⚠ Rebotados", command=ver_rebotados, **style["button"])
+btn_rebotados.configure(padx=SMALL_BTN["padx"], pady=SMALL_BTN["pady"], font=("Segoe UI", 11))
+btn_rebotados.grid(row=row, column=1, sticky="e", pady=(0, 6))
+create_tooltip(btn_rebotados, "Ver destinatarios con errores definitivos")
+row += 1
+
 status_var = tk.StringVar()
 status_label = tk.Label(form_frame, textvariable=status_var, fg=DARK_STATUS, bg=DARK_FRAME, font=("Segoe UI", 12, "italic"))
 status_label.grid(row=row, column=0, columnspan=2, pady=(6, 18), sticky="ew")
@@ -1008,7 +1040,29 @@ row += 1
 # Cerrar guardando
 root.protocol("WM_DELETE_WINDOW", on_close)
 
-# Cargar historial inicial
-actualizar_historial()
+_marcar_arranque('interfaz')
+
+def _cargar_datos_diferidos():
+    # Destinatarios e historial se leen con la ventana ya visible
+    try:
+        _agregar_a_lista(obtener_registro_destinatarios().todos(), indexar=False)
+        refresh_dest_list()
+        # El índice de búsqueda se arma en otro hilo; la caja se habilita al terminar
+        threading.Thread(target=indice_busqueda.construir, args=(list(recipients_list),), daemon=True).start()
+        _esperar_indice()
+        actualizar_historial()
+    except Exception as e:
+        logging.error(f"Error cargando datos iniciales: {e}")
+    _marcar_arranque('datos')
+    _informar_arranque(config.get('presupuesto_arranque_ms') or PRESUPUESTO_ARRANQUE_MS)
+
+def _primer_cuadro():
+    _marcar_arranque('primer_cuadro')
+    root.after(1, _cargar_datos_diferidos)
+
+root.after_idle(_primer_cuadro)
+
+# Ofrecer retomar una campaña que se haya cortado a mitad de camino
+root.after(500, ofrecer_reanudar_campania)
 
 root.mainloop()
@@ -0,0 +1,66 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from enviador.bitacora import BitacoraDiferida
+
+class BitacoraDiferidaTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.ruta = os.path.join(self.dir.name, 'enviados.txt')
+        self.bitacora = BitacoraDiferida(self.ruta, lineas_por_escritura=50, intervalo=0.01)
+
+    def tearDown(self):
+        self.bitacora.cerrar()
+        self.dir.cleanup()
+
+    def lineas(self):
+        with open(self.ruta, encoding='utf-8') as f:
+            return f.read().splitlines()
+
+    def test_vaciar_deja_todo_en_el_archivo(self):
+        for n in range(120):
+            self.bitacora.escribir(f'l{n}@x.com')
+        self.bitacora.vaciar()
+        self.assertEqual(self.lineas(), [f'l{n}@x.com' for n in range(120)])
+
+    def test_truncar_sin_hilo(self):
+        self.bitacora.truncar()
+        self.assertEqual(self.lineas(), [])
+
+    def test_escribir_despues_de_cerrar(self):
+        self.bitacora.escribir('a@x.com')
+        self.bitacora.cerrar()
+        self.bitacora.escribir('b@x.com')
+        self.bitacora.vaciar()
+        self.assertEqual(self.lineas(), ['a@x.com', 'b@x.com'])
+
+    def test_ordenes_y_escrituras_concurrentes(self):
+        # Escritores y cierres a la vez: ninguna orden queda esperando un hilo que ya
+        # terminó y ninguna línea queda en la cola sin escribir
+        escritores, por_escritor = 4, 500
+
+        def escribir(n):
+            for i in range(por_escritor):
+                self.bitacora.escribir(f'{n}-{i}')
+
+        def cerrar():
+            for _ in range(200):
+                self.bitacora.cerrar()
+                self.bitacora.vaciar()
+
+        hilos = [threading.Thread(target=escribir, args=(n,)) for n in range(escritores)]
+        hilos += [threading.Thread(target=cerrar) for _ in range(2)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join(20)
+            self.assertFalse(hilo.is_alive())
+        self.bitacora.vaciar()
+        lineas = self.lineas()
+        self.assertEqual(len(lineas), escritores * por_escritor)
+        self.assertEqual(len(set(lineas)), escritores * por_escritor)
+
+if __name__ == '__main__':
+    unittest.main()
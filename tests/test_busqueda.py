@@ -0,0 +1,128 @@
+import threading
+import unittest
+
+from enviador.busqueda import IndiceContactos, normalizar
+
+def _contacto(i, nombre, email):
+    return {'id': i, 'nombre': nombre, 'email': email}
+
+CONTACTOS = [
+    _contacto(1, 'Ana López', 'ana@acme.com'),
+    _contacto(2, 'Mariana Peña', 'mariana@ejemplo.com.ar'),
+    _contacto(3, 'José Núñez', 'jnunez@acme.com'),
+    _contacto(4, '', 'ventas@otro.org'),
+]
+
+class NormalizarTest(unittest.TestCase):
+    def test_acentos_y_mayusculas(self):
+        self.assertEqual(normalizar('PEÑA José'), 'pena jose')
+        self.assertEqual(normalizar('Łódź Ørsted'), normalizar('Łodz Ørsted'))
+        self.assertEqual(normalizar(None), '')
+
+class BuscarTest(unittest.TestCase):
+    def setUp(self):
+        self.indice = IndiceContactos(CONTACTOS)
+
+    def test_trigramas_sin_acentos_ni_mayusculas(self):
+        self.assertEqual(self.indice.buscar('pena'), {2})
+        self.assertEqual(self.indice.buscar('PEÑA'), {2})
+        self.assertEqual(self.indice.buscar('núñez'), {3})
+        self.assertEqual(self.indice.buscar('NUNEZ'), {3})
+        # Cualquier parte del texto, incluido el dominio
+        self.assertEqual(self.indice.buscar('ana'), {1, 2})
+        self.assertEqual(self.indice.buscar('acme.com'), {1, 3})
+        self.assertEqual(self.indice.buscar('ventas'), {4})
+
+    def test_todas_las_palabras(self):
+        self.assertEqual(self.indice.buscar('ana acme'), {1})
+        self.assertEqual(self.indice.buscar('ana lo'), {1})
+        self.assertEqual(self.indice.buscar('ana zz'), set())
+
+    def test_prefijos_cortos(self):
+        # 1-2 letras sólo como comienzo de palabra: "an" no encuentra a Mariana
+        self.assertEqual(self.indice.buscar('an'), {1})
+        self.assertEqual(self.indice.buscar('ma'), {2})
+        self.assertEqual(self.indice.buscar('j'), {3})
+        self.assertEqual(self.indice.buscar('jn'), {3})
+        self.assertEqual(self.indice.buscar('Ñ'), {3})
+        self.assertEqual(self.indice.buscar('pe'), {2})
+
+    def test_consulta_vacia(self):
+        self.assertEqual(self.indice.buscar('  '), {1, 2, 3, 4})
+
+class AltasYBajasTest(unittest.TestCase):
+    def test_baja_perezosa_y_reconstruccion(self):
+        indice = IndiceContactos([_contacto(i, f'Cliente {i}', f'c{i}@x.com') for i in range(1, 11)])
+        indice.quitar([1, 2, 3])
+        self.assertEqual(len(indice), 7)
+        self.assertNotIn(1, indice.buscar('cliente'))
+        # Todavía en las listas: sólo se olvidó el texto
+        self.assertIn(1, indice._trigramas['cli'])
+        self.assertEqual(indice._borrados, 3)
+        # Más de la mitad borrada: se reconstruye sin los ids viejos
+        indice.quitar([4, 5, 6])
+        self.assertEqual(indice._borrados, 0)
+        self.assertEqual(sorted(indice._trigramas['cli']), [7, 8, 9, 10])
+        self.assertEqual(indice.buscar('cliente'), {7, 8, 9, 10})
+        self.assertEqual(indice.buscar('c'), {7, 8, 9, 10})
+
+    def test_umbral_de_compactado(self):
+        indice = IndiceContactos([_contacto(i, f'n{i}', f'c{i}@x.com') for i in range(1, 7)])
+        # 2 borrados sobre 4 vivos: justo en el límite, todavía no se reconstruye
+        indice.quitar([1, 2])
+        self.assertEqual(indice._borrados, 2)
+        indice.quitar([3])
+        self.assertEqual(indice._borrados, 0)
+        self.assertEqual(indice.buscar('n'), {4, 5, 6})
+
+    def test_modificar_y_reutilizar_id(self):
+        indice = IndiceContactos(CONTACTOS)
+        indice.agregar([_contacto(1, 'Ana Gómez', 'ana@acme.com')])
+        self.assertEqual(indice.buscar('lopez'), set())
+        self.assertEqual(indice.buscar('gomez'), {1})
+        # Id reutilizado: los prefijos del contacto anterior no cuentan
+        indice.quitar([3])
+        indice.agregar([_contacto(3, 'Zoe', 'zoe@z.com')])
+        self.assertEqual(indice.buscar('jo'), set())
+        self.assertEqual(indice.buscar('zo'), {3})
+
+class _Pausada(list):
+    # Lista que frena antes de entregar la segunda tanda, hasta que el test la libera
+    def __init__(self, contactos, tanda):
+        super().__init__(contactos)
+        self.tanda = tanda
+        self.en_pausa = threading.Event()
+        self.seguir = threading.Event()
+
+    def __getitem__(self, indice):
+        if isinstance(indice, slice) and indice.start == self.tanda:
+            self.en_pausa.set()
+            self.seguir.wait(5)
+        return super().__getitem__(indice)
+
+class ConstruirEnSegundoPlanoTest(unittest.TestCase):
+    def test_altas_y_bajas_durante_construir(self):
+        contactos = _Pausada([_contacto(i, f'Cliente {i}', f'c{i}@x.com') for i in range(1, 9)], tanda=4)
+        indice = IndiceContactos()
+        hilo = threading.Thread(target=indice.construir, args=(contactos, 4))
+        hilo.start()
+        self.assertTrue(contactos.en_pausa.wait(5))
+        self.assertFalse(indice.listo.is_set())
+        # Primera tanda indexada; la búsqueda ya responde con lo que hay
+        self.assertEqual(indice.buscar('cliente'), {1, 2, 3, 4})
+        indice.quitar([1, 6])                                    # una ya indexada y una por llegar
+        indice.agregar([_contacto(7, 'Proveedor', 'p7@x.com'),   # llega antes que su tanda
+                        _contacto(20, 'Nuevo', 'nuevo@x.com')])
+        indice.quitar([2, 3])
+        # Con construir en curso no se compacta aunque pase la proporción
+        self.assertEqual(indice._borrados, 3)
+        contactos.seguir.set()
+        hilo.join(5)
+        self.assertTrue(indice.listo.is_set())
+        self.assertEqual(indice.buscar('cliente'), {4, 5, 8})
+        self.assertEqual(indice.buscar('proveedor'), {7})
+        self.assertEqual(indice.buscar('nuevo'), {20})
+        self.assertEqual(len(indice), 5)
+
+if __name__ == '__main__':
+    unittest.main()
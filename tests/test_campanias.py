@@ -0,0 +1,65 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from enviador.campanias import ColaCampania
+
+class ColaCampaniaTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.ruta = os.path.join(self.dir.name, 'campanias.db')
+        self.cola = ColaCampania(self.ruta, lote_commit=1000, intervalo_commit=3600)
+        self.destinatarios = [f'd{n}@x.com' for n in range(6)]
+        self.id = self.cola.crear('migusto', 'Asunto', 'Hola', False, self.destinatarios)
+
+    def tearDown(self):
+        self.cola.cerrar()
+        self.dir.cleanup()
+
+    def _reabrir(self):
+        # Simula el próximo arranque: otra conexión sobre la misma base
+        self.cola.cerrar()
+        self.cola = ColaCampania(self.ruta, lote_commit=1000, intervalo_commit=3600)
+
+    def test_reanudar_devuelve_pendientes_y_enviando(self):
+        d = self.destinatarios
+        self.cola.marcar(self.id, d[:2], 'enviado')
+        self.cola.rebotar(self.id, {d[2]: (550, b'no existe')})
+        self.cola.marcar(self.id, d[3:5], 'enviando')
+        self._reabrir()
+        self.assertEqual(self.cola.pendientes(self.id), d[3:])
+        self.assertEqual(self.cola.resumen(self.id),
+                         {'pendiente': 3, 'enviando': 0, 'enviado': 2, 'fallido': 1, 'cancelado': 0})
+        self.assertEqual(self.cola.rebotados()[0][:3], (d[2], self.id, 550))
+
+    def test_descartar_cancela_y_sale_de_incompletas(self):
+        self.cola.marcar(self.id, self.destinatarios[:1], 'enviado')
+        self.cola.marcar(self.id, self.destinatarios[1:2], 'enviando')
+        self.assertEqual(self.cola.incompletas(), [(self.id, 5)])
+        self.assertEqual(self.cola.descartar(self.id), 5)
+        self.assertEqual(self.cola.incompletas(), [])
+        self.assertEqual(self.cola.pendientes(self.id), [])
+        resumen = self.cola.resumen(self.id)
+        self.assertEqual((resumen['enviado'], resumen['cancelado']), (1, 5))
+
+    def test_cerrar_confirma_lo_acumulado(self):
+        self.cola.marcar(self.id, self.destinatarios, 'enviado')
+        # Todavía en memoria: otra conexión no lo ve
+        otra = sqlite3.connect(self.ruta)
+        contar = "SELECT COUNT(*) FROM envios WHERE estado = 'enviado'"
+        self.assertEqual(otra.execute(contar).fetchone()[0], 0)
+        self.cola.cerrar()
+        self.assertEqual(otra.execute(contar).fetchone()[0], 6)
+        otra.close()
+        self.cola = ColaCampania(self.ruta)
+
+    def test_lote_commit_confirma_al_llenarse(self):
+        self.cola.lote_commit = 3
+        self.cola.marcar(self.id, self.destinatarios[:3], 'enviado')
+        otra = sqlite3.connect(self.ruta)
+        self.assertEqual(otra.execute("SELECT COUNT(*) FROM envios WHERE estado = 'enviado'").fetchone()[0], 3)
+        otra.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,23 @@
+import unittest
+
+from enviador.configuracion import RESPONDIDOS_DB, RESPONDIDOS_FILE
+from enviador.demonio import rutas_respondidos
+
+class RutasRespondidosTest(unittest.TestCase):
+    def test_cuenta_principal_conserva_los_archivos_de_siempre(self):
+        cuenta = {'email': ' Ventas@Ejemplo.com '}
+        self.assertEqual(rutas_respondidos(cuenta, 'ventas@ejemplo.com'),
+                         (RESPONDIDOS_DB, RESPONDIDOS_FILE))
+
+    def test_cuentas_extra_usan_su_propia_base(self):
+        cuenta = {'email': 'soporte@ejemplo.com'}
+        self.assertEqual(rutas_respondidos(cuenta, 'ventas@ejemplo.com'),
+                         ('respondidos-soporte_ejemplo_com.db', 'respondidos-soporte_ejemplo_com.txt'))
+        self.assertEqual(rutas_respondidos(cuenta)[0], 'respondidos-soporte_ejemplo_com.db')
+
+    def test_respondidos_explicito_manda(self):
+        cuenta = {'email': 'ventas@ejemplo.com', 'respondidos': 'otra.db'}
+        self.assertEqual(rutas_respondidos(cuenta, 'ventas@ejemplo.com'), ('otra.db', 'otra.txt'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from enviador.destinatarios import RegistroDestinatarios
+from enviador.importador import (ErrorImportacion, IMPORTAR_POR_TANDA, guardar_rechazos,
+                                 importar_destinatarios)
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+class ImportadorTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.registro = RegistroDestinatarios(os.path.join(self.dir.name, 'destinatarios.db'),
+                                              os.path.join(self.dir.name, 'no-existe.json'))
+
+    def tearDown(self):
+        self.registro.cerrar()
+        self.dir.cleanup()
+
+    def archivo(self, nombre, contenido, encoding='utf-8'):
+        ruta = os.path.join(self.dir.name, nombre)
+        with open(ruta, 'w', encoding=encoding, newline='') as f:
+            f.write(contenido)
+        return ruta
+
+    def importar(self, ruta, **kwargs):
+        return importar_destinatarios(ruta, registro=self.registro, **kwargs)
+
+    def test_encabezado_con_columnas_extra(self):
+        ruta = self.archivo('contactos.csv', "Nombre,Correo Electrónico,Empresa,Ciudad\n"
+                                             "Ana,ana@x.com,Acme,\n"
+                                             "Beto,beto@x.com,,Rosario\n")
+        resultado = self.importar(ruta)
+        self.assertEqual([(r['email'], r['nombre'], r['campos']) for r in resultado.agregados], [
+            ('ana@x.com', 'Ana', {'Empresa': 'Acme'}),
+            ('beto@x.com', 'Beto', {'Ciudad': 'Rosario'}),
+        ])
+        self.assertEqual(resultado.rechazados, [])
+
+    def test_encabezado_email(self):
+        ruta = self.archivo('contactos.csv', "E-mail,Name\nana@x.com,Ana\n")
+        self.assertEqual([(r['email'], r['nombre']) for r in self.importar(ruta).agregados], [('ana@x.com', 'Ana')])
+
+    def test_sin_encabezado(self):
+        ruta = self.archivo('contactos.csv', "ana@x.com,Ana\nBeto <beto@x.com>\n")
+        self.assertEqual([(r['email'], r['nombre']) for r in self.importar(ruta).agregados],
+                         [('ana@x.com', 'Ana'), ('beto@x.com', 'Beto')])
+
+    def test_detecta_el_delimitador(self):
+        for delimitador in (';', '\t', '|'):
+            with self.subTest(delimitador=repr(delimitador)):
+                filas = [['email', 'nombre', 'empresa'], ['a@x.com', 'Ana, la de ventas', 'Acme'], ['b@x.com', 'Beto', 'Otra']]
+                ruta = self.archivo(f'd{ord(delimitador)}.csv', ''.join(delimitador.join(f) + '\n' for f in filas))
+                registro = RegistroDestinatarios(os.path.join(self.dir.name, f'd{ord(delimitador)}.db'),
+                                                 os.path.join(self.dir.name, 'no-existe.json'))
+                try:
+                    resultado = importar_destinatarios(ruta, registro=registro)
+                finally:
+                    registro.cerrar()
+                self.assertEqual([(r['email'], r['nombre'], r['campos']) for r in resultado.agregados], [
+                    ('a@x.com', 'Ana, la de ventas', {'empresa': 'Acme'}),
+                    ('b@x.com', 'Beto', {'empresa': 'Otra'}),
+                ])
+
+    def test_excel_windows(self):
+        ruta = self.archivo('contactos.csv', "email;nombre\nnunez@x.com;Núñez\n", encoding='cp1252')
+        self.assertEqual(self.importar(ruta).agregados[0]['nombre'], 'Núñez')
+
+    def test_rechazos_en_el_informe(self):
+        self.registro.agregar('viejo@x.com')
+        ruta = self.archivo('contactos.txt', "ana@x.com\nno-es-un-mail\n,Sin Email\nANA@x.com\nviejo@x.com\nbeto@x.com\n")
+        resultado = self.importar(ruta)
+        self.assertEqual([r['email'] for r in resultado.agregados], ['ana@x.com', 'beto@x.com'])
+        self.assertEqual(resultado.filas, 6)
+        self.assertEqual(sorted(resultado.rechazados), [
+            (2, 'no-es-un-mail', 'email inválido'),
+            (3, ',Sin Email', 'sin email'),
+            (4, 'ANA@x.com', 'repetido en el archivo'),
+            (5, 'viejo@x.com', 'ya estaba en la lista'),
+        ])
+        informe = os.path.join(self.dir.name, 'rechazos.csv')
+        guardar_rechazos(resultado, informe)
+        with open(informe, encoding='utf-8-sig') as f:
+            lineas = f.read().splitlines()
+        self.assertEqual(lineas[0], 'fila,valor,motivo')
+        self.assertEqual(lineas[2], '3,",Sin Email",sin email')
+
+    def test_tandas(self):
+        total = IMPORTAR_POR_TANDA * 2 + 500
+        filas = [f'c{n}@x.com' for n in range(total)]
+        # Un repetido que cruza el límite de la primera tanda
+        filas.insert(IMPORTAR_POR_TANDA + 5, 'C3@x.com')
+        ruta = self.archivo('muchos.txt', '\n'.join(filas) + '\n')
+        tandas = []
+        agregar_varios = self.registro.agregar_varios
+
+        def contar(filas, *args, **kwargs):
+            tandas.append(len(filas))
+            return agregar_varios(filas, *args, **kwargs)
+
+        avisos = []
+        with mock.patch.object(self.registro, 'agregar_varios', contar):
+            resultado = self.importar(ruta, progreso=lambda fraccion, filas: avisos.append((fraccion, filas)))
+        self.assertEqual(tandas, [IMPORTAR_POR_TANDA, IMPORTAR_POR_TANDA, 500])
+        self.assertEqual(len(resultado.agregados), total)
+        self.assertEqual(len(self.registro), total)
+        self.assertEqual(resultado.rechazados, [(IMPORTAR_POR_TANDA + 6, 'C3@x.com', 'repetido en el archivo')])
+        self.assertEqual(avisos[-1], (1.0, total + 1))
+        self.assertEqual([filas for _, filas in avisos[:-1]], [2000])
+
+    def test_lista_incluye_los_ya_guardados(self):
+        viejo = self.registro.agregar('viejo@x.com')
+        ruta = self.archivo('contactos.csv', "email\nnuevo@x.com\nViejo@x.com\nmalo\n")
+        resultado = self.importar(ruta, lista='Clientes')
+        nuevo = resultado.agregados[0]
+        self.assertEqual(sorted(self.registro.miembros('Clientes')), sorted([nuevo['id'], viejo['id']]))
+        self.assertEqual(sorted(resultado.rechazados), [
+            (3, 'Viejo@x.com', "ya estaba guardado; agregado a 'Clientes'"),
+            (4, 'malo', 'email inválido'),
+        ])
+        self.assertEqual(len(self.registro), 2)
+
+    def test_formato_no_admitido(self):
+        ruta = self.archivo('contactos.json', '[]')
+        with self.assertRaises(ErrorImportacion):
+            self.importar(ruta)
+
+    def test_xlsx_sin_openpyxl(self):
+        ruta = self.archivo('contactos.xlsx', '')
+        with mock.patch.dict(sys.modules, {'openpyxl': None}):
+            with self.assertRaisesRegex(ErrorImportacion, 'openpyxl'):
+                self.importar(ruta)
+
+    @unittest.skipIf(openpyxl is None, "openpyxl no está instalado")
+    def test_xlsx(self):
+        libro = openpyxl.Workbook()
+        hoja = libro.active
+        hoja.append(['Correo', 'Nombre', 'Plan'])
+        hoja.append(['ana@x.com', 'Ana', 'Pro'])
+        hoja.append([None, None, None])
+        hoja.append(['beto@x.com', None, 3])
+        ruta = os.path.join(self.dir.name, 'contactos.xlsx')
+        libro.save(ruta)
+        resultado = self.importar(ruta)
+        self.assertEqual([(r['email'], r['nombre'], r['campos']) for r in resultado.agregados], [
+            ('ana@x.com', 'Ana', {'Plan': 'Pro'}),
+            ('beto@x.com', '', {'Plan': '3'}),
+        ])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import os
+import tempfile
+import unittest
+
+from enviador.destinatarios import RegistroDestinatarios
+from enviador.listas import ErrorListas, EvaluadorListas, ids_a_mapa, listas_de_expresion, mapa_a_ids
+
+class MapaTest(unittest.TestCase):
+    def test_ida_y_vuelta(self):
+        ids = [1, 2, 7, 8, 9, 64, 1000]
+        self.assertEqual(mapa_a_ids(ids_a_mapa(ids)), ids)
+        self.assertEqual(mapa_a_ids(ids_a_mapa([])), [])
+
+class EvaluadorListasTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.registro = RegistroDestinatarios(os.path.join(self.dir.name, 'destinatarios.db'),
+                                              os.path.join(self.dir.name, 'no-existe.json'))
+        contactos = self.registro.agregar_varios([(f'c{n}@x.com', f'C{n}') for n in range(1, 11)])
+        self.id = {n: c['id'] for n, c in enumerate(contactos, 1)}
+        listas = {
+            'A': [1, 2, 3, 4, 5, 6],
+            'B': [4, 5, 6, 7, 8, 9],
+            'C': [2, 4, 6, 8],
+            'Bajas-2024': [5],
+            'Clientes (2024)': [1, 2],
+        }
+        for nombre, numeros in listas.items():
+            self.registro.agregar_a_lista(nombre, [self.id[n] for n in numeros])
+        self.evaluador = EvaluadorListas(self.registro)
+
+    def tearDown(self):
+        self.registro.cerrar()
+        self.dir.cleanup()
+
+    def contactos(self, expresion):
+        numero = {i: n for n, i in self.id.items()}
+        return sorted(numero[i] for i in self.evaluador.ids(expresion))
+
+    def test_precedencia(self):
+        # ∩ liga más fuerte; ∪ y − de izquierda a derecha
+        self.assertEqual(self.contactos('A ∪ B ∩ C'), [1, 2, 3, 4, 5, 6, 8])
+        self.assertEqual(self.contactos('A − B ∪ C'), [1, 2, 3, 4, 6, 8])
+        self.assertEqual(self.contactos('A ∪ B − C'), [1, 3, 5, 7, 9])
+
+    def test_parentesis(self):
+        self.assertEqual(self.contactos('A − (B ∪ C)'), [1, 3])
+        self.assertEqual(self.contactos('(A ∪ B) ∩ C'), [2, 4, 6, 8])
+
+    def test_alias_ascii(self):
+        self.assertEqual(self.contactos('A + B & C'), self.contactos('A ∪ B ∩ C'))
+        self.assertEqual(self.contactos('A | B'), self.contactos('A ∪ B'))
+        self.assertEqual(self.contactos('A - B'), self.contactos('A − B'))
+        self.assertEqual(self.contactos('A \\ B'), self.contactos('A − B'))
+
+    def test_nombres_sin_distinguir_mayusculas(self):
+        self.assertEqual(self.contactos('a ∩ b'), [4, 5, 6])
+
+    def test_guion_dentro_del_nombre(self):
+        self.assertEqual(self.contactos('A - Bajas-2024'), [1, 2, 3, 4, 6])
+        self.assertEqual(listas_de_expresion('A - Bajas-2024'), ['A', 'Bajas-2024'])
+        # Sin espacios, el guión es parte del nombre
+        with self.assertRaises(ErrorListas):
+            self.evaluador.ids('A-B')
+
+    def test_comillas(self):
+        self.assertEqual(self.contactos('"Clientes (2024)" ∪ Bajas-2024'), [1, 2, 5])
+        self.assertEqual(self.contactos("'Clientes (2024)' ∩ A"), [1, 2])
+
+    def test_reservados(self):
+        self.assertEqual(self.contactos('todos − A'), [7, 8, 9, 10])
+        self.registro.seleccionar([self.id[n] for n in (1, 2, 3)], False)
+        self.assertEqual(self.contactos('tildados ∩ A'), [4, 5, 6])
+        # Tildar no cambia la versión: tildados se lee de nuevo cada vez
+        self.registro.seleccionar([self.id[4]], False)
+        self.assertEqual(self.contactos('tildados ∩ A'), [5, 6])
+
+    def test_cache_por_version(self):
+        self.assertEqual(self.contactos('C'), [2, 4, 6, 8])
+        # Un cambio que no pasa por el registro no se ve: la lista sigue en caché
+        with self.registro.conn:
+            self.registro.conn.execute("DELETE FROM miembros")
+        self.assertEqual(self.contactos('C'), [2, 4, 6, 8])
+        # Con el cambio de versión se vuelve a leer
+        self.registro.agregar_a_lista('C', [self.id[10]], reemplazar=True)
+        self.assertEqual(self.contactos('C'), [10])
+        self.assertEqual(self.contactos('A'), [])
+
+    def test_errores(self):
+        for expresion in ('', 'A ∪', 'Nadie', '(A ∪ B', 'A B )', '"A ∪ B', '∩ A'):
+            with self.subTest(expresion=expresion), self.assertRaises(ErrorListas):
+                self.evaluador.ids(expresion)
+
+    def test_emails_en_orden_de_la_lista(self):
+        self.assertEqual(self.evaluador.emails('C ∪ Bajas-2024'), ['c2@x.com', 'c4@x.com', 'c5@x.com', 'c6@x.com', 'c8@x.com'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import email
+import unittest
+from email import policy
+
+from enviador.mensajes import PlantillaMensaje, PlantillaPersonalizada
+
+ASUNTO_LARGO = "Invitación a la reunión anual de sucursales de la región Noroeste de la ciudad"
+
+def _sin_lf_sueltos(datos):
+    return b'\n' not in datos.replace(b'\r\n', b'')
+
+class EncabezadosTest(unittest.TestCase):
+    def test_asunto_largo_no_ascii_plantilla_fija(self):
+        datos = PlantillaMensaje('yo@dominio.com', ASUNTO_LARGO, 'Hola').renderizar('ana@dominio.com')
+        self.assertTrue(_sin_lf_sueltos(datos))
+
+    def test_asunto_largo_no_ascii_plantilla_personalizada(self):
+        contactos = {'ana@dominio.com': {'nombre': 'Ana', 'campos': {}}}
+        plantilla = PlantillaPersonalizada('yo@dominio.com', ASUNTO_LARGO, 'Hola {nombre}', contactos)
+        self.assertTrue(_sin_lf_sueltos(plantilla.renderizar('ana@dominio.com')))
+
+    def test_destinatario_con_nombre_no_ascii(self):
+        contactos = {}
+        plantilla = PlantillaPersonalizada('yo@dominio.com', 'Hola', 'Hola {email}', contactos)
+        destinatario = 'Señora María José Rodríguez de la Peña y Ñandubay <maria@dominio.com>'
+        self.assertTrue(_sin_lf_sueltos(plantilla.renderizar(destinatario)))
+
+class CuerpoPersonalizadoTest(unittest.TestCase):
+    CONTACTOS = {'ana@dominio.com': {'nombre': 'Ana Peña', 'campos': {'Ciudad': 'San Miguel de Tucumán'}}}
+
+    def _mensaje(self, cuerpo, is_html=False, destinatario='ana@dominio.com', contactos=None):
+        plantilla = PlantillaPersonalizada('yo@dominio.com', 'Hola', cuerpo, contactos or self.CONTACTOS, is_html)
+        return plantilla, plantilla.renderizar(destinatario)
+
+    def test_combina_y_decodifica_igual(self):
+        cuerpo = ("Hola {nombre},  \n.punto al inicio\n{ciudad}\n" + "línea larga con acentos áéíóú " * 10
+                  + "{nombre|cliente}.\n\tfin con espacio ")
+        _, datos = self._mensaje(cuerpo)
+        esperado = (cuerpo.replace('{nombre|cliente}', 'Ana Peña').replace('{nombre}', 'Ana Peña')
+                    .replace('{ciudad}', 'San Miguel de Tucumán'))
+        mensaje = email.message_from_bytes(datos, policy=policy.default)
+        # Los saltos de línea viajan como CRLF (forma canónica del texto MIME)
+        self.assertEqual(mensaje.get_content().replace('\r\n', '\n'), esperado)
+
+    def test_lineas_aptas_para_data(self):
+        _, datos = self._mensaje("{nombre}" + "x" * 300 + "\n.{ciudad}\n" + "é" * 100)
+        cuerpo = datos.split(b'\r\n\r\n', 1)[1]
+        self.assertTrue(_sin_lf_sueltos(datos))
+        for linea in cuerpo.split(b'\r\n'):
+            self.assertLessEqual(len(linea), 76)
+            self.assertFalse(linea.startswith(b'.'))
+
+    def test_partes_fijas_codificadas_una_vez(self):
+        plantilla, _ = self._mensaje("Texto fijo {nombre} más texto fijo")
+        fijas = [p for i, p in enumerate(plantilla.cuerpo.partes) if i not in {h[0] for h in plantilla.cuerpo.huecos}]
+        _, datos = self._mensaje("Texto fijo {nombre} más texto fijo", destinatario='otro@dominio.com')
+        for parte in fijas:
+            self.assertIn(parte, datos)
+
+    def test_html_escapa_valores(self):
+        contactos = {'b@dominio.com': {'nombre': 'Pérez & <Cía>', 'campos': {}}}
+        _, datos = self._mensaje('<b>{nombre}</b>', is_html=True, destinatario='b@dominio.com', contactos=contactos)
+        mensaje = email.message_from_bytes(datos, policy=policy.default)
+        self.assertEqual(mensaje.get_content(), '<b>Pérez &amp; &lt;Cía&gt;</b>')
+
+if __name__ == '__main__':
+    unittest.main()
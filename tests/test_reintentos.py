@@ -0,0 +1,85 @@
+import asyncio
+import smtplib
+import unittest
+from unittest import mock
+
+from enviador import reintentos
+from enviador.reintentos import ColaReintentos, clasificar_error, demora_reintento
+
+class ClasificarErrorTest(unittest.TestCase):
+    def test_conexion(self):
+        self.assertEqual(clasificar_error(smtplib.SMTPServerDisconnected('cortó')), 'conexion')
+        self.assertEqual(clasificar_error(smtplib.SMTPDataError(421, b'cerrando')), 'conexion')
+        self.assertEqual(clasificar_error(ConnectionResetError()), 'conexion')
+        self.assertEqual(clasificar_error(asyncio.TimeoutError()), 'conexion')
+
+    def test_transitorio(self):
+        self.assertEqual(clasificar_error(smtplib.SMTPDataError(451, b'despues')), 'transitorio')
+        self.assertEqual(clasificar_error(smtplib.SMTPSenderRefused(450, b'ocupado', 'yo@x.com')), 'transitorio')
+
+    def test_permanente(self):
+        self.assertEqual(clasificar_error(smtplib.SMTPDataError(550, b'no')), 'permanente')
+        self.assertEqual(clasificar_error(smtplib.SMTPSenderRefused(553, b'no', 'yo@x.com')), 'permanente')
+        self.assertEqual(clasificar_error(ValueError('mensaje roto')), 'permanente')
+
+class DemoraReintentoTest(unittest.TestCase):
+    def test_crece_hasta_el_tope(self):
+        with mock.patch('random.uniform', return_value=1.0):
+            demoras = [demora_reintento(n) for n in range(12)]
+        self.assertEqual(demoras[0], reintentos.REINTENTO_BASE)
+        self.assertEqual(demoras, sorted(demoras))
+        self.assertEqual(demoras[-1], reintentos.REINTENTO_MAXIMO)
+
+    def test_jitter_acotado(self):
+        for n in range(12):
+            demora = demora_reintento(n)
+            base = min(reintentos.REINTENTO_MAXIMO, reintentos.REINTENTO_BASE * 2 ** n)
+            self.assertGreaterEqual(demora, base * 0.5)
+            self.assertLessEqual(demora, reintentos.REINTENTO_MAXIMO * 1.5)
+
+class ColaReintentosTest(unittest.TestCase):
+    def test_entrega_por_vencimiento(self):
+        cola = ColaReintentos([])
+        cola.programar(['c'], 1, demora=0.06)
+        cola.programar(['a'], 1)
+        cola.programar(['b'], 2, demora=0.03)
+        orden = []
+        for _ in range(3):
+            lote, intentos = cola.tomar(timeout=1)
+            orden.append(lote[0])
+            cola.terminar()
+        self.assertEqual(orden, ['a', 'b', 'c'])
+        self.assertIsNone(cola.tomar())
+
+    def test_lotes_iniciales_en_orden_y_espera(self):
+        cola = ColaReintentos([['x'], ['y']])
+        self.assertEqual(cola.tomar(timeout=0), (['x'], 0))
+        self.assertEqual(cola.tomar(timeout=0), (['y'], 0))
+        # Hay lotes en curso: la cola no terminó, sólo espera
+        self.assertIs(cola.tomar(timeout=0.01), ColaReintentos.ESPERANDO)
+
+    def test_tomar_async(self):
+        cola = ColaReintentos([])
+        cola.programar(['tarde'], 1, demora=0.05)
+        cola.programar(['pronto'], 1)
+
+        async def tomar_todo():
+            lotes = []
+            while True:
+                item = await cola.tomar_async(timeout=1)
+                if item is None:
+                    return lotes
+                lotes.append(item[0][0])
+                cola.terminar()
+        self.assertEqual(asyncio.run(tomar_todo()), ['pronto', 'tarde'])
+
+    def test_sin_enviar_devuelve_lo_pendiente(self):
+        cola = ColaReintentos([['a@x.com', 'b@x.com'], ['c@x.com']])
+        lote, intentos = cola.tomar()
+        # El primer lote falla y se reprograma a futuro; la campaña se corta antes
+        cola.programar(lote, intentos + 1, demora=60)
+        cola.terminar()
+        self.assertEqual(sorted(cola.sin_enviar()), ['a@x.com', 'b@x.com', 'c@x.com'])
+
+if __name__ == '__main__':
+    unittest.main()
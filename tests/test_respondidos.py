@@ -0,0 +1,82 @@
+import os
+import tempfile
+import time
+import unittest
+
+from enviador.autoresponder import Respondedor
+from enviador.bitacora import obtener_bitacora
+from enviador.respondidos import RegistroRespondidos
+
+DIA = 86400
+
+class RegistroRespondidosTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.registro = RegistroRespondidos(os.path.join(self.dir.name, 'respondidos.db'),
+                                            os.path.join(self.dir.name, 'respondidos.txt'))
+
+    def tearDown(self):
+        obtener_bitacora(self.registro.bitacora).vaciar()
+        self.registro.cerrar()
+        self.dir.cleanup()
+
+    def respondido_hace(self, email, dias):
+        # Respuesta con fecha en el pasado, directo en la base (y fuera de la caché)
+        with self.registro.conn:
+            self.registro.conn.execute("INSERT OR REPLACE INTO respondidos (email, fecha) VALUES (?, ?)",
+                                       (email, time.time() - dias * DIA))
+        self.registro._cache.clear()
+
+    def test_ventana_por_consulta(self):
+        self.respondido_hace('viejo@x.com', 10)
+        self.registro.agregar('Nuevo@x.com')
+        self.assertTrue(self.registro.respondido('viejo@x.com'))
+        self.assertTrue(self.registro.respondido('viejo@x.com', 30))
+        self.assertFalse(self.registro.respondido('viejo@x.com', 7))
+        self.assertTrue(self.registro.respondido('nuevo@x.com', 7))
+        self.assertFalse(self.registro.respondido('nadie@x.com'))
+        self.assertIn('NUEVO@x.com', self.registro)
+
+    def test_purga_respeta_la_ventana_mas_larga(self):
+        self.respondido_hace('a@x.com', 5)
+        self.respondido_hace('b@x.com', 20)
+        # Declarar la primera ventana no purga: la segunda todavía no se conoce
+        self.registro.usar_ventana(7)
+        self.registro.usar_ventana(30)
+        self.assertEqual(self.registro.purgar(), 0)
+        self.assertTrue(self.registro.respondido('b@x.com'))
+        self.registro.soltar_ventana(30)
+        self.assertEqual(self.registro.purgar(), 1)
+        self.assertTrue(self.registro.respondido('a@x.com'))
+        self.assertFalse(self.registro.respondido('b@x.com'))
+
+    def test_con_una_permanente_no_se_purga(self):
+        self.respondido_hace('a@x.com', 400)
+        self.registro.usar_ventana(None)
+        self.registro.usar_ventana(1)
+        self.assertEqual(self.registro.purgar(), 0)
+        self.registro.soltar_ventana(None)
+        self.assertEqual(self.registro.purgar(), 1)
+
+    def test_sin_ventanas_declaradas_no_se_purga(self):
+        self.respondido_hace('a@x.com', 400)
+        self.assertEqual(self.registro.purgar(), 0)
+
+    def test_respondedores_comparten_el_registro(self):
+        self.respondido_hace('cliente@x.com', 3)
+        semanal = Respondedor('ventas@x.com', 'clave', 'Asunto', 'Hola', 'migusto', lambda msg: None,
+                              supresion_dias=7, respondidos=self.registro)
+        diario = Respondedor('soporte@x.com', 'clave', 'Asunto', 'Hola', 'migusto', lambda msg: None,
+                             supresion_dias=1, respondidos=self.registro)
+        try:
+            # Crear el segundo no le cambia la ventana al primero
+            self.assertTrue(self.registro.respondido('cliente@x.com', semanal.supresion_dias))
+            self.assertFalse(self.registro.respondido('cliente@x.com', diario.supresion_dias))
+            self.assertEqual(self.registro.purgar(), 0)
+        finally:
+            semanal.cerrar()
+            diario.cerrar()
+        self.assertEqual(self.registro._ventanas, {})
+
+if __name__ == '__main__':
+    unittest.main()
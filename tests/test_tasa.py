@@ -0,0 +1,99 @@
+import smtplib
+import unittest
+
+from enviador.envio import _resultado_error, _resultado_lote
+from enviador.tasa import ControlTasa
+
+class Reloj:
+    # Reloj manual: el tiempo sólo avanza cuando el test lo pide
+    def __init__(self):
+        self.ahora = 0.0
+
+    def __call__(self):
+        return self.ahora
+
+class GCRATest(unittest.TestCase):
+    def test_espaciado(self):
+        reloj = Reloj()
+        control = ControlTasa(2, reloj=reloj)
+        self.assertEqual([control.reservar() for _ in range(4)], [0, 0.5, 1.0, 1.5])
+
+    def test_respeta_el_ritmo_cuando_se_espera(self):
+        reloj = Reloj()
+        control = ControlTasa(4, reloj=reloj)
+        for _ in range(5):
+            reloj.ahora += control.reservar()
+        self.assertAlmostEqual(reloj.ahora, 1.0)
+        # Un hueco largo no acumula crédito más allá de la ráfaga
+        reloj.ahora += 10
+        self.assertEqual(control.reservar(), 0)
+        self.assertAlmostEqual(control.reservar(), 0.25)
+
+    def test_rafaga(self):
+        control = ControlTasa(1, rafaga=3, reloj=Reloj())
+        self.assertEqual([control.reservar() for _ in range(5)], [0, 0, 0, 1, 2])
+
+class CupoPorHoraTest(unittest.TestCase):
+    def test_cupo(self):
+        reloj = Reloj()
+        control = ControlTasa(None, max_por_hora=3, reloj=reloj)
+        self.assertEqual([control.reservar() for _ in range(3)], [0, 0, 0])
+        reloj.ahora = 10
+        self.assertEqual(control.reservar(), 3590)
+
+    def test_lote_cuenta_cada_destinatario(self):
+        reloj = Reloj()
+        control = ControlTasa(None, max_por_hora=3, reloj=reloj)
+        self.assertEqual(control.reservar(2), 0)
+        reloj.ahora = 100
+        self.assertEqual(control.reservar(2), 3500)
+
+    def test_la_ventana_se_libera(self):
+        reloj = Reloj()
+        control = ControlTasa(None, max_por_hora=2, reloj=reloj)
+        control.reservar(2)
+        reloj.ahora = 3600
+        self.assertEqual(control.reservar(2), 0)
+
+class AIMDTest(unittest.TestCase):
+    def test_limite_reduce_y_pausa(self):
+        reloj = Reloj()
+        control = ControlTasa(10, reloj=reloj)
+        control.limite()
+        self.assertEqual(control.tasa, 5)
+        self.assertEqual(control.reservar(), 2)
+        control.limite()
+        self.assertEqual(control.tasa, 2.5)
+        # Las pausas crecen con los límites seguidos
+        self.assertEqual(control.reservar(), 4)
+
+    def test_piso(self):
+        control = ControlTasa(1, minimo_por_segundo=0.2, reloj=Reloj())
+        for _ in range(10):
+            control.limite()
+        self.assertEqual(control.tasa, 0.2)
+
+    def test_recuperacion(self):
+        reloj = Reloj()
+        control = ControlTasa(1, incremento=0.25, reloj=reloj)
+        control.limite()
+        self.assertEqual(control.tasa, 0.5)
+        for _ in range(3):
+            control.exito()
+        self.assertEqual(control.tasa, 1)
+        # Un éxito reinicia la cuenta de límites seguidos: la próxima pausa vuelve a 2 s
+        reloj.ahora = 100
+        control.limite()
+        self.assertEqual(control.reservar(), 2)
+
+    def test_codigos_de_limite(self):
+        for codigo in (421, 450, 451):
+            with self.subTest(codigo=codigo):
+                self.assertTrue(_resultado_error(['a@x.com'], smtplib.SMTPDataError(codigo, b'despacio')).limite)
+                self.assertTrue(_resultado_lote(['a@x.com', 'b@x.com'], {'a@x.com': (codigo, b'despacio')}).limite)
+        for codigo in (452, 550):
+            with self.subTest(codigo=codigo):
+                self.assertFalse(_resultado_error(['a@x.com'], smtplib.SMTPDataError(codigo, b'no')).limite)
+
+if __name__ == '__main__':
+    unittest.main()
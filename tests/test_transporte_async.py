@@ -0,0 +1,81 @@
+import asyncio
+import smtplib
+import unittest
+
+from enviador.reintentos import clasificar_error
+from enviador.transporte_async import SesionSMTPAsync
+
+class _Escritor:
+    # Stub del StreamWriter: guarda lo escrito; con cortado, escribir falla como un socket cerrado
+    def __init__(self):
+        self.escrito = []
+        self.cortado = False
+
+    def write(self, datos):
+        if self.cortado:
+            raise ConnectionResetError("conexión cerrada")
+        self.escrito.append(datos)
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        pass
+
+def _correr(respuestas, accion, cortar_tras=None):
+    # respuestas: líneas del servidor; cortar_tras: después de cuántas escrituras se corta.
+    # El StreamReader se crea dentro del loop que lo va a leer
+    async def correr():
+        return await accion(_sesion(respuestas, cortar_tras))
+    return asyncio.run(correr())
+
+def _sesion(respuestas, cortar_tras=None):
+    sesion = SesionSMTPAsync('localhost', 465, None)
+    lector = asyncio.StreamReader()
+    lector.feed_data(b''.join(r + b'\r\n' for r in respuestas))
+    lector.feed_eof()
+    escritor = _Escritor()
+    if cortar_tras is not None:
+        original = escritor.write
+
+        def write(datos):
+            if len(escritor.escrito) >= cortar_tras:
+                escritor.cortado = True
+            original(datos)
+        escritor.write = write
+    sesion.reader, sesion.writer = lector, escritor
+    return sesion
+
+class EnviarTest(unittest.TestCase):
+    def test_rechazo_5xx_con_servidor_caido_sigue_siendo_permanente(self):
+        # 550 al final de DATA y el servidor corta antes del RSET
+        with self.assertRaises(smtplib.SMTPDataError) as ctx:
+            _correr([b'250 ok', b'250 ok', b'354 go', b'550 rechazado'],
+                    lambda s: s.enviar('yo@x.com', ['a@x.com'], b'Subject: x\r\n\r\nhola\r\n'),
+                    cortar_tras=4)
+        self.assertEqual(ctx.exception.smtp_code, 550)
+        self.assertEqual(clasificar_error(ctx.exception), 'permanente')
+
+    def test_remitente_rechazado_sin_respuesta_al_rset(self):
+        # MAIL FROM rechazado y EOF en lugar de la respuesta al RSET
+        with self.assertRaises(smtplib.SMTPSenderRefused) as ctx:
+            _correr([b'553 remitente no permitido'],
+                    lambda s: s.enviar('yo@x.com', ['a@x.com'], b'x\r\n'))
+        self.assertEqual(ctx.exception.smtp_code, 553)
+
+    def test_todos_los_rcpt_rechazados(self):
+        with self.assertRaises(smtplib.SMTPRecipientsRefused) as ctx:
+            _correr([b'250 ok', b'550 no existe'],
+                    lambda s: s.enviar('yo@x.com', ['a@x.com'], b'x\r\n'))
+        self.assertEqual(ctx.exception.recipients['a@x.com'][0], 550)
+
+class LoginTest(unittest.TestCase):
+    def test_235_autentica(self):
+        _correr([b'235 ok'], lambda s: s.login('yo', 'clave'))
+
+    def test_503_no_cuenta_como_login(self):
+        with self.assertRaises(smtplib.SMTPAuthenticationError):
+            _correr([b'503 secuencia incorrecta'], lambda s: s.login('yo', 'clave'))
+
+if __name__ == '__main__':
+    unittest.main()